@@ -0,0 +1,92 @@
+"""
+Measures how SpatialCsvData.from_csv throughput scales with the number of worker processes.
+
+A synthetic On/Off,X,Y,Timestamp recording is generated when no CSV is given.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from typing import List
+
+import numpy as np
+
+from plotting_utils.get_plotting_data import DataStorage, SpatialCsvData
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("aedat_csv_file", nargs="?", help="CSV to read. A synthetic one is generated if omitted")
+    parser.add_argument("--events", "-e", type=int, default=20_000_000, help="Number of events to generate")
+    parser.add_argument("--workers", "-w", type=int, nargs="+", help="Worker counts to test (default: 1, 2, 4, ...)")
+    parser.add_argument("--repeat", "-r", type=int, default=3, help="Runs per worker count. The fastest is reported")
+
+    return parser.parse_args()
+
+
+def write_synthetic_csv(csv_file: str, n_events: int):
+    rng = np.random.default_rng(0)
+    chunk_size = 1_000_000
+    timestamp = 478504058
+
+    with open(csv_file, "w") as f:
+        f.write("On/Off,X,Y,Timestamp\n")
+
+        for start in range(0, n_events, chunk_size):
+            n = min(chunk_size, n_events - start)
+            timestamps = timestamp + np.cumsum(rng.integers(0, 4, n))
+            timestamp = int(timestamps[-1])
+
+            rows = np.column_stack(
+                (rng.choice([-1, 1], n), rng.integers(0, 128, n), rng.integers(0, 128, n), timestamps)
+            )
+            np.savetxt(f, rows, fmt="%d", delimiter=",")
+
+
+def default_worker_counts() -> List[int]:
+    cpu_count = os.cpu_count() or 1
+    counts = [1]
+
+    while counts[-1] * 2 <= cpu_count:
+        counts.append(counts[-1] * 2)
+
+    if counts[-1] != cpu_count:
+        counts.append(cpu_count)
+
+    return counts
+
+
+def main():
+    args = get_args()
+
+    if args.aedat_csv_file is not None:
+        csv_file = args.aedat_csv_file
+    else:
+        csv_file = os.path.join(tempfile.mkdtemp(), "synthetic.csv")
+        print(f"Generating {args.events} events in {csv_file}...")
+        write_synthetic_csv(csv_file, args.events)
+
+    file_size_mb = os.path.getsize(csv_file) / 1e6
+    print(f"File size: {file_size_mb:.1f} MB")
+    print(f"{'Workers':>8} {'Seconds':>9} {'MB/s':>9} {'Events/s':>12} {'Speedup':>8}")
+
+    baseline = None
+    for workers in args.workers or default_worker_counts():
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            events = SpatialCsvData.from_csv(csv_file, DataStorage.BOOL, workers=workers)
+            times.append(time.perf_counter() - start)
+
+        best = min(times)
+        baseline = baseline or best
+        throughput = f"{file_size_mb / best:>9.1f} {len(events) / best:>12.3e}"
+        print(f"{workers:>8} {best:>9.3f} {throughput} {baseline / best:>7.2f}x")
+
+    if args.aedat_csv_file is None:
+        shutil.rmtree(os.path.dirname(csv_file))
+
+
+if __name__ == "__main__":
+    main()
@@ -23,7 +23,7 @@ set_variable() {
   fi
 }
 
-unset RECURSIVE_SEARCH VIEW_ANGLE FILES_DIR FILES_STRING TIME_LIMIT
+unset RECURSIVE_SEARCH VIEW_ANGLE FILES_DIR TIME_LIMIT
 VIEW_ANGLES=("default" "top" "side" "all")
 
 # Get args
@@ -67,20 +67,6 @@ if [ -z "${FILES_DIR+set}" ] || [ -z "${VIEW_ANGLE+set}" ]; then
   print_usage
 fi
 
-if [ ! -z "${RECURSIVE_SEARCH+set}" ]; then
-  FILES_STRING=$(find $FILES_DIR -name "*.csv")
-else
-  FILES_STRING=$(find $FILES_DIR -maxdepth 1 -name "*.csv")
-fi
-
-FILES_ARRAY=($(echo $FILES_STRING | tr " " "\n"))
-
-for file_path in "${FILES_ARRAY[@]}"; do
-  if [ ! -z "${TIME_LIMIT+set}" ]; then
-    echo $file_path
-    python src/plotting/3dplot.py $file_path -v $VIEW_ANGLE -t=$TIME_LIMIT
-  else
-    echo $file_path
-    python src/plotting/3dplot.py $file_path -v $VIEW_ANGLE
-  fi
-done
+# Plot every file from one Python process pool. Set JOBS to limit the number of files plotted at the same time
+python src/plotting/batch_plot.py "$FILES_DIR" ${RECURSIVE_SEARCH:+-r} --jobs "${JOBS:-0}" \
+  3d -v "$VIEW_ANGLE" ${TIME_LIMIT:+-t=$TIME_LIMIT}
@@ -2,10 +2,12 @@
 set -euo pipefail
 
 print_usage() {
-    echo -e "usage: $0 [-d csv_directory] [-x x_lim] [-r]\n" >&2
+    echo -e "usage: $0 [-d csv_directory] [-w reconstruction_window] [-x x_lim] [-r]\n" >&2
     echo -e "required arguments:"
     echo "  -d        Directory containing csv files to plot"
     echo -e "optional arguments:"
+    echo "  -w        Reconstruction window used to generate the files: int or path to config file"
+    echo "            (default: src/plotting/config.json)"
     echo "  -x        X-Limit for the plot"
     echo "  -r        Recursively search through csv_directory"
     exit 2
@@ -22,10 +24,10 @@ set_variable() {
   fi
 }
 
-unset RECURSIVE_SEARCH X_LIM FILES_DIR FILES_STRING
+unset RECURSIVE_SEARCH X_LIM FILES_DIR RECONSTRUCTION_WINDOW
 
 # Get args
-while getopts 'rx:d:?h' option; do
+while getopts 'rx:w:d:?h' option; do
   case "$option" in
     r) set_variable RECURSIVE_SEARCH true ;;
     d)
@@ -37,6 +39,7 @@ while getopts 'rx:d:?h' option; do
         exit 1
       fi
     ;;
+    w) set_variable RECONSTRUCTION_WINDOW $OPTARG ;;
     x)
       # Make sure the arg is int or float
       if [[ $OPTARG =~ ^[+-]?[0-9]*\.?[0-9]+$ ]]; then
@@ -57,20 +60,10 @@ if [ -z "${FILES_DIR+set}" ]; then
   print_usage
 fi
 
-if [ ! -z "${RECURSIVE_SEARCH+set}" ]; then
-  FILES_STRING=$(find $FILES_DIR -name "*.csv")
-else
-  FILES_STRING=$(find $FILES_DIR -maxdepth 1 -name "*.csv")
+if [ -z "${RECONSTRUCTION_WINDOW+set}" ]; then
+  RECONSTRUCTION_WINDOW="src/plotting/config.json"
 fi
 
-FILES_ARRAY=($(echo $FILES_STRING | tr " " "\n"))
-
-for file_path in "${FILES_ARRAY[@]}"; do
-  if [ ! -z "${X_LIM+set}" ]; then
-    echo $file_path
-    python src/plotting/fingerprintGraph.py $file_path -x $X_LIM
-  else
-    echo $file_path
-    python src/plotting/fingerprintGraph.py $file_path
-  fi
-done
+# Plot every file from one Python process pool. Set JOBS to limit the number of files plotted at the same time
+python src/plotting/batch_plot.py "$FILES_DIR" ${RECURSIVE_SEARCH:+-r} --jobs "${JOBS:-0}" \
+  fingerprint "$RECONSTRUCTION_WINDOW" ${X_LIM:+-x $X_LIM}
@@ -25,7 +25,7 @@ set_variable() {
   fi
 }
 
-unset RECURSIVE_SEARCH FILES_DIR FILES_STRING PIXEL_X PIXEL_Y AREA_SIZE TIME_LIMIT
+unset RECURSIVE_SEARCH FILES_DIR PIXEL_X PIXEL_Y AREA_SIZE TIME_LIMIT
 
 # Get args
 while getopts 'rt:x:y:a:d:?h' option; do
@@ -87,21 +87,6 @@ if [ -z "${FILES_DIR+set}" ] || [ -z "${PIXEL_X+set}" ] || [ -z "${PIXEL_Y+set}"
   print_usage
 fi
 
-if [ -z "${TIME_LIMIT+set}" ]; then
-  TIME_LIMIT=""
-else
-  TIME_LIMIT="-t=$TIME_LIMIT"
-fi
-
-if [ ! -z "${RECURSIVE_SEARCH+set}" ]; then
-  FILES_STRING=$(find $FILES_DIR -name "*.csv")
-else
-  FILES_STRING=$(find $FILES_DIR -maxdepth 1 -name "*.csv")
-fi
-
-FILES_ARRAY=($(echo $FILES_STRING | tr " " "\n"))
-
-for file_path in "${FILES_ARRAY[@]}"; do
-  echo $file_path
-  python src/plotting/spikeGraph.py $file_path -x=$PIXEL_X -y=$PIXEL_Y -a=$AREA_SIZE $TIME_LIMIT
-done
+# Plot every file from one Python process pool. Set JOBS to limit the number of files plotted at the same time
+python src/plotting/batch_plot.py "$FILES_DIR" ${RECURSIVE_SEARCH:+-r} --jobs "${JOBS:-0}" \
+  spike -x=$PIXEL_X -y=$PIXEL_Y -a=$AREA_SIZE ${TIME_LIMIT:+-t=$TIME_LIMIT}
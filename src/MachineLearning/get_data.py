@@ -1,18 +1,55 @@
-import csv
 import os
 from os import listdir
 from os.path import isfile, join
 import glob
+from typing import Dict, Optional
 import numpy as np
 import sklearn.model_selection as sk
 from natsort import natsorted, ns
 
-from plotting_utils import filename_regex
+from plotting_utils import event_csv, filename_regex
 from plotting_utils.plotting_helper import check_aedat_csv_format
+from plotting_utils.result_cache import ResultCache
+
+
+def read_frame_groups(csv_path: str, num_frames: int, cache: Optional[ResultCache] = None) -> np.ndarray:
+    """Reads the On, Off and Combined counts of an event chunk CSV in groups of num_frames rows
+
+    Rows after the last complete group are dropped.
+
+    Args:
+        csv_path (str): Path to the CSV file
+        num_frames (int): Number of rows in each group
+        cache (Optional[ResultCache], optional): Cache to load the groups from or save them to. None to always read
+                                                 the CSV
+
+    Returns:
+        np.ndarray: int64 array with shape (number of groups, num_frames, 3)
+    """
+    if num_frames <= 0:
+        raise ValueError(f"The number of frames per group must be positive, not {num_frames}")
+
+    def read_groups() -> Dict[str, np.ndarray]:
+        header, data_start = event_csv.read_csv_header(csv_path)
+        rows = np.concatenate(
+            [np.empty((0, 3), dtype=np.int64)]
+            + [
+                event_csv.parse_int_rows(block, len(header))[:, :3]
+                for block in event_csv.iter_row_blocks(csv_path, data_start)
+            ]
+        )
+
+        group_count = len(rows) // num_frames
+        return {"groups": rows[: group_count * num_frames].reshape(group_count, num_frames, 3)}
+
+    if cache is None:
+        return read_groups()["groups"]
+
+    return cache.get_or_compute(csv_path, "read_frame_groups", {"num_frames": int(num_frames)}, read_groups)["groups"]
 
 
 # TODO: cleanup
-def getMachineLearningData(num_frames: int, base_folder: str):
+def getMachineLearningData(num_frames: int, base_folder: str, cache: Optional[ResultCache] = None):
     all_input_data = []  # numberOfFrames x 3
     all_output_data = []  # frequency
 
@@ -27,46 +64,37 @@ def getMachineLearningData(num_frames: int, base_folder: str):
         ]
 
         for data_file in only_files:
-            with open(f"data/{base_folder}/{folder_name}/{data_file}", "r") as csvfile:
-                reader = csv.reader(csvfile, delimiter=",")
-
-                # Waveform files
-                if "burst" in folder_name:
-                    file_class = 0
-                elif "sine" in folder_name:
-                    file_class = 1
-                elif "square" in folder_name:
-                    file_class = 2
-                elif "triangle" in folder_name:
-                    file_class = 3
-                elif "dc" in folder_name:
-                    file_class = 4
-                elif "noise" in folder_name:
-                    file_class = 5
-                # This must be a frequency file. Use the frequency as the class
-                else:
-                    file_class = (
-                        folder_name.lower()
-                        .replace("nopol", "")
-                        .replace("no pol", "")
-                        .replace("30deg", "")
-                        .replace("30 deg", "")
-                        .replace("hz", "")
-                        .replace(" ", "")
-                        .replace("eventchunks", "")
-                        .replace("foam", "")
-                    )
-
-                print(file_class)
-                input_group = []
-                for i, row in enumerate(reader):
-                    if i != 0:
-                        input_group.append((int(row[0]), int(row[1]), int(row[2])))
-
-                        if i % num_frames == 0:
-                            all_input_data.append(np.array(input_group))
-                            all_output_data.append(file_class)
-                            input_group = []
+            # Waveform files
+            if "burst" in folder_name:
+                file_class = 0
+            elif "sine" in folder_name:
+                file_class = 1
+            elif "square" in folder_name:
+                file_class = 2
+            elif "triangle" in folder_name:
+                file_class = 3
+            elif "dc" in folder_name:
+                file_class = 4
+            elif "noise" in folder_name:
+                file_class = 5
+            # This must be a frequency file. Use the frequency as the class
+            else:
+                file_class = (
+                    folder_name.lower()
+                    .replace("nopol", "")
+                    .replace("no pol", "")
+                    .replace("30deg", "")
+                    .replace("30 deg", "")
+                    .replace("hz", "")
+                    .replace(" ", "")
+                    .replace("eventchunks", "")
+                    .replace("foam", "")
+                )
+
+            print(file_class)
+            groups = read_frame_groups(f"data/{base_folder}/{folder_name}/{data_file}", num_frames, cache)
+            all_input_data.extend(groups)
+            all_output_data.extend([file_class] * len(groups))
     return np.array(all_input_data), np.array(all_output_data)
 
 
@@ -74,7 +102,7 @@ class WaveAndFreqData:
     waveform_id_dict = {"burst": 0, "sine": 1, "square": 2, "triangle": 3, "dc": 4, "noise": 5}
     frequency_id_dict = {"500mv": 0, "400mv": 1, "300mv": 2, "200mv": 3}
 
-    def __init__(self, num_frames: int, base_folder: str):
+    def __init__(self, num_frames: int, base_folder: str, cache: Optional[ResultCache] = None):
         all_input_data = []
         all_output_data = []
 
@@ -82,44 +110,34 @@ class WaveAndFreqData:
         data_files = natsorted(glob.glob(f"{base_folder}/**/*.csv", recursive=True), alg=ns.IGNORECASE)
 
         for data_file in data_files:
-            with open(data_file) as csv_file:
-                basename = os.path.basename(data_file).lower()
-
-                # Determine the file's waveform
-                waveform = filename_regex.parse_waveform(basename)
-                if waveform not in self.waveform_id_dict:
-                    print(f"Could not identify waveform type. Skipping file '{data_file}'...")
-                    continue
-                waveform_id = self.waveform_id_dict[waveform]
-
-                # Determine the file's frequency
-                frequency_id = -1
-                for freq in self.frequency_id_dict:
-                    if freq in basename:
-                        frequency_id = self.frequency_id_dict[freq]
-                        break
-                if frequency_id == -1:
-                    print(f"Could not identify frequency. Skipping file '{data_file}'...")
-                    continue
-
-                reader = csv.reader(csv_file, delimiter=",")
-
-                # Ensure csv file contains the correct data, as specified by the header
-                header = next(reader, None)
-                if not check_aedat_csv_format(header, ["On Count", "Off Count", "Combined Count"]):
-                    print(f"CSV file '{data_file}' appears to be of an incorrect format. Header is '{header}'")
-                    continue
-
-                input_data_group = []
-                for row in reader:
-                    # Convert each row of the csv into a list of ints
-                    input_data_group.append((int(row[0]), int(row[1]), int(row[2])))
-
-                    # Append data to ML data lists once input_data_group reaches desired size
-                    if len(input_data_group) == num_frames:
-                        all_input_data.append(input_data_group)
-                        all_output_data.append([waveform_id, frequency_id])
-                        input_data_group = []
+            basename = os.path.basename(data_file).lower()
+
+            # Determine the file's waveform
+            waveform = filename_regex.parse_waveform(basename)
+            if waveform not in self.waveform_id_dict:
+                print(f"Could not identify waveform type. Skipping file '{data_file}'...")
+                continue
+            waveform_id = self.waveform_id_dict[waveform]
+
+            # Determine the file's frequency
+            frequency_id = -1
+            for freq in self.frequency_id_dict:
+                if freq in basename:
+                    frequency_id = self.frequency_id_dict[freq]
+                    break
+            if frequency_id == -1:
+                print(f"Could not identify frequency. Skipping file '{data_file}'...")
+                continue
+
+            # Ensure csv file contains the correct data, as specified by the header
+            header, _ = event_csv.read_csv_header(data_file)
+            if not check_aedat_csv_format(header, ["On Count", "Off Count", "Combined Count"]):
+                print(f"CSV file '{data_file}' appears to be of an incorrect format. Header is '{header}'")
+                continue
+
+            groups = read_frame_groups(data_file, num_frames, cache)
+            all_input_data.extend(groups)
+            all_output_data.extend([[waveform_id, frequency_id]] * len(groups))
 
         # Split data into train/test sets
         train_input, test_input, train_output, test_output = sk.train_test_split(
@@ -1,12 +1,15 @@
+import argparse
+
 import tensorflow as tf
 from tensorflow import keras
 import get_data
 from tensorflow.keras.models import Model
 from tensorflow.keras.layers import Input
 import saveWaveformsAndFreqResult
+from plotting_utils.result_cache import add_cache_args, cache_from_args, check_cache_args, format_counters
 
 
-def trainAndSave(model, frame_count, num_epochs, learning_rate):
+def trainAndSave(model, frame_count, num_epochs, learning_rate, cache=None):
 
     # (
     #     waveformTrainOutput,
@@ -20,8 +23,10 @@ def trainAndSave(model, frame_count, num_epochs, learning_rate):
     # Object test
     # wf_data = getData.WaveAndFreqData(frame_count, "waveformsAndFrequency")
     print("Preparing data...")
-    wf_data = get_data.WaveAndFreqData(frame_count, "data")
+    wf_data = get_data.WaveAndFreqData(frame_count, "data", cache)
     print("Data preparation complete")
+    if cache is not None:
+        print(format_counters(cache))
 
     model.compile(
         optimizer=tf.optimizers.Adamax(learning_rate=learning_rate),
@@ -53,6 +58,11 @@ def trainAndSave(model, frame_count, num_epochs, learning_rate):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trains a model that identifies waveforms and frequencies")
+    add_cache_args(parser)
+    args = parser.parse_args()
+    check_cache_args(parser, args)
+
     frameCount = 1000
     input_1 = Input(
         shape=(
@@ -107,4 +117,4 @@ if __name__ == "__main__":
     output_freq = keras.layers.Dense(4, activation=tf.nn.sigmoid, name="Frequency")(frequencyModel)
     model2 = Model(inputs=input_1, outputs=[output_wave, output_freq])
 
-    trainAndSave(model2, frameCount, 500, 0.001)
+    trainAndSave(model2, frameCount, 500, 0.001, cache_from_args(args))
@@ -0,0 +1,394 @@
+"""
+Runs one of the image processing algorithms on every image in a directory or matching a glob.
+
+The images are spread over a pool of worker processes instead of starting a new interpreter for every image, as lazy.sh
+did. Each image is decoded and converted to grayscale once, and the workers running its stages read it from shared
+memory. The results of all images are written to a single CSV in the save directory once they are done. An image that
+fails is reported without stopping the others.
+
+Example: python batch_process.py "wheel_pictures/*.png" --jobs 4 o_mss_le -b 11
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+
+from decoded_image import DecodedImage, SharedDecodedImage, SharedImageHandle
+import fusion
+import local_entropy
+import mean_shift_segmentation
+import otsu
+
+IMAGE_EXTENSIONS = (".png", ".jpeg", ".jpg")
+RESULTS_FILE = "batch_results.csv"
+
+ImageResult = Tuple[str, float, Optional[float], Optional[str]]
+"""Image file, seconds spent processing it, the algorithm's value for it (if any) and the error message if it failed"""
+
+VALUE_NAMES = {"entropy": "Local Entropy"}
+"""Name of the CSV column for the algorithms that compute a value per image"""
+
+Stage = Callable[[DecodedImage], Any]
+"""Part of an algorithm that only needs the decoded image, so it can run in parallel with the other stages"""
+
+StageResults = Dict[str, Any]
+
+Finish = Callable[[str, DecodedImage, StageResults, str], Optional[float]]
+"""Combines the stage results of an image and saves the output. Called with the image name, the decoded image, the
+stage results and the save directory. Returns the value recorded for the image, if any"""
+
+Algorithm = Tuple[Dict[str, Stage], Finish]
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "image_path", help="Directory containing images to be processed or a glob matching them", type=str
+    )
+    parser.add_argument("--save_directory", "-d", help="Save files to directory", type=str, default="")
+    parser.add_argument(
+        "--jobs", "-j", help="Number of images processed at the same time (default: all CPUs)", type=int, default=0
+    )
+
+    algorithms = parser.add_subparsers(dest="algorithm", required=True, help="Algorithm to run on each image")
+
+    otsu_args = algorithms.add_parser("otsu", help="Gaussian blur and otsu thresholding (otsu.py)")
+    o_mss_le_args = algorithms.add_parser(
+        "o_mss_le", help="Otsu/mean shift segmentation/local entropy fusion (fusion.py o_mss_le)"
+    )
+    for blur_args in (otsu_args, o_mss_le_args):
+        blur_args.add_argument(
+            "--blur_amount", "-b", help="The amount the image will be gaussian blurred (odd)", type=int, default=11
+        )
+        blur_args.add_argument(
+            "--otsu_threshold", "-t", help="The minimum threshold for the otsu algorithm.", type=int, default=125
+        )
+
+    mss_args = algorithms.add_parser("mss", help="Mean shift segmentation (mean_shift_segmentation.py)")
+    mss_args.add_argument("--min_density", "-m", help="Minimum density of a segment", type=int, default=5)
+
+    entropy_args = algorithms.add_parser("entropy", help="Local entropy (local_entropy.py)")
+    entropy_args.add_argument("--radius", "-r", help="Size of the window around each pixel", type=int, default=5)
+
+    algorithms.add_parser("canny", help="Canny edge detection (canny.py)")
+    wavelet_args = algorithms.add_parser("wavelet", help="Wavelet decomposition fusion (fusion.py wavelet)")
+    wavelet_args.add_argument("--levels", "-l", help="Number of wavelet decomposition levels", type=int, default=1)
+
+    args = parser.parse_args()
+
+    if args.save_directory and not os.path.isdir(args.save_directory):
+        sys.exit(f'Error: Specified path "{args.save_directory}" does not exist')
+
+    if args.jobs < 0:
+        sys.exit("Error: --jobs cannot be negative")
+
+    if args.algorithm in ("otsu", "o_mss_le"):
+        if args.blur_amount <= 0 or args.blur_amount % 2 == 0:
+            sys.exit("Error: arg '--blur_amount' must be odd and positive")
+        if not 0 <= args.otsu_threshold <= 255:
+            sys.exit("Error: arg '--otsu_threshold' must be between 0 and 255")
+
+    if args.algorithm == "entropy" and args.radius < 1:
+        sys.exit("Error: arg '--radius' must be at least 1")
+
+    if args.algorithm == "wavelet" and args.levels < 1:
+        sys.exit("Error: arg '--levels' must be at least 1")
+
+    return args
+
+
+def find_images(image_path: str) -> List[str]:
+    """Finds the images in a directory, or the images matching a glob (a path to a single image matches itself)"""
+    if os.path.isdir(image_path):
+        image_path = os.path.join(image_path, "*")
+
+    return sorted(
+        path
+        for path in glob.glob(image_path)
+        if os.path.isfile(path) and os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+    )
+
+
+def finish_otsu(image_name: str, image: DecodedImage, _, save_directory: str, blur_amount: int, otsu_threshold: int):
+    otsu_image = otsu.otsu_and_blur_gray(image.gray, blur_amount, otsu_threshold)
+    cv2.imwrite(os.path.join(save_directory, f"{image_name}_blur.png"), otsu_image)
+
+
+def finish_mss(image_name: str, image: DecodedImage, _, save_directory: str, min_density: int):
+    segmented_image = mean_shift_segmentation.mss(image.bgr, False, min_density)
+    cv2.imwrite(os.path.join(save_directory, f"{image_name}_mss_d{min_density}.png"), segmented_image)
+
+
+def finish_entropy(image_name: str, image: DecodedImage, _, save_directory: str, radius: int) -> float:
+    # local_entropy.py converts the RGB image, cv2 decodes images as BGR
+    gray_image = local_entropy.rgb2gray(image.bgr[..., ::-1])
+    entropy_image = local_entropy.get_entropy_image(gray_image, convert_to_gray=False, radius=radius)
+    plt.imsave(os.path.join(save_directory, f"LocalEntropy_img_{image_name}.png"), entropy_image, cmap="viridis")
+
+    return float(entropy_image.sum())
+
+
+def finish_canny(image_name: str, image: DecodedImage, _, save_directory: str):
+    edges = cv2.Canny(image.gray, 100, 200)
+    cv2.imwrite(os.path.join(save_directory, f"Canny-{image_name}.png"), edges)
+
+
+def finish_o_mss_le(
+    image_name: str,
+    image: DecodedImage,
+    stage_results: StageResults,
+    save_directory: str,
+    blur_amount: int,
+    otsu_threshold: int,
+):
+    otsu_image, mss_image, entropy_image = stage_results["otsu"], stage_results["mss"], stage_results["entropy"]
+    result_image = fusion.mask_to_image(fusion.o_mss_le_mask(otsu_image, mss_image, entropy_image), image.bgr)
+    fusion.plot_o_mss_le(
+        image_name,
+        image.bgr,
+        result_image,
+        otsu_image,
+        mss_image,
+        entropy_image,
+        blur_amount,
+        otsu_threshold,
+        save_directory,
+    )
+
+
+def finish_wavelet(image_name: str, image: DecodedImage, stage_results: StageResults, save_directory: str):
+    mss_image, bands = stage_results["mss"], stage_results["wavelet"]
+    result_images = fusion.wavelet_fusion(image.bgr, mss_image[np.newaxis], bands[np.newaxis])[0]
+    fusion.plot_wavelet(image_name, image.bgr, mss_image, bands, result_images, save_directory)
+
+
+def get_algorithm(args: argparse.Namespace) -> Algorithm:
+    """Builds picklable stage and finish functions for the selected algorithm"""
+    if args.algorithm == "otsu":
+        return {}, partial(finish_otsu, blur_amount=args.blur_amount, otsu_threshold=args.otsu_threshold)
+    elif args.algorithm == "o_mss_le":
+        stages: Dict[str, Stage] = {
+            "otsu": partial(fusion.otsu_stage, blur_amount=args.blur_amount, otsu_min_threshold=args.otsu_threshold),
+            "mss": fusion.mss_stage,
+            "entropy": fusion.entropy_stage,
+        }
+        return stages, partial(finish_o_mss_le, blur_amount=args.blur_amount, otsu_threshold=args.otsu_threshold)
+    elif args.algorithm == "mss":
+        return {}, partial(finish_mss, min_density=args.min_density)
+    elif args.algorithm == "entropy":
+        return {}, partial(finish_entropy, radius=args.radius)
+    elif args.algorithm == "canny":
+        return {}, finish_canny
+    else:
+        return {"mss": fusion.mss_stage, "wavelet": partial(fusion.wavelet_stage, levels=args.levels)}, finish_wavelet
+
+
+def image_name_of(image_path: str) -> str:
+    return os.path.splitext(os.path.basename(image_path))[0]
+
+
+def error_message(e: BaseException) -> str:
+    return f"{type(e).__name__}: {e}".replace("\n", " ")
+
+
+def process_image(algorithm: Algorithm, image_path: str, save_directory: str) -> ImageResult:
+    """Runs every stage of the algorithm on an image in this process, catching any error so other images keep going"""
+    stages, finish = algorithm
+
+    start = time.perf_counter()
+    try:
+        image = DecodedImage.read(image_path)
+        stage_results = {name: stage(image) for name, stage in stages.items()}
+        value = finish(image_name_of(image_path), image, stage_results, save_directory)
+        error = None
+    except Exception as e:
+        value = None
+        error = error_message(e)
+
+    return image_path, time.perf_counter() - start, value, error
+
+
+def run_stage(stage: Stage, handle: SharedImageHandle) -> Tuple[Any, float]:
+    """Runs a stage in a worker on zero-copy views of the shared image"""
+    start = time.perf_counter()
+    with SharedDecodedImage.attach(handle) as shared:
+        assert shared.image is not None
+        result = stage(shared.image)
+
+    return result, time.perf_counter() - start
+
+
+def run_finish(
+    finish: Finish, image_name: str, handle: SharedImageHandle, stage_results: StageResults, save_directory: str
+) -> Tuple[Optional[float], float]:
+    start = time.perf_counter()
+    with SharedDecodedImage.attach(handle) as shared:
+        assert shared.image is not None
+        value = finish(image_name, shared.image, stage_results, save_directory)
+
+    return value, time.perf_counter() - start
+
+
+class PendingImage:
+    """An image being processed by the pool"""
+
+    def __init__(self, shared: SharedDecodedImage, seconds: float):
+        self.shared = shared
+        self.seconds = seconds
+        """Time spent on the image so far, in this process and in the workers"""
+        self.stage_results: StageResults = {}
+        self.error: Optional[str] = None
+
+
+def process_images(
+    algorithm: Algorithm, image_paths: List[str], save_directory: str, jobs: int
+) -> List[ImageResult]:
+    """Processes every image, using a pool of jobs worker processes when jobs is more than 1
+
+    Each image is decoded once in this process and placed in shared memory. Its stages run as separate tasks, so the
+    stages of one image can run at the same time, and once they are all done a last task combines their results. At
+    most jobs images are kept in shared memory at a time.
+    """
+    if jobs == 1:
+        return [process_image(algorithm, image_path, save_directory) for image_path in image_paths]
+
+    stages, finish = algorithm
+    results = []
+    pending: Dict[str, PendingImage] = {}
+    # Image and stage of each running task. The stage is None for the finish task
+    tasks: Dict[Future[Any], Tuple[str, Optional[str]]] = {}
+    remaining = iter(image_paths)
+
+    def record(image_path: str, seconds: float, value: Optional[float], error: Optional[str]):
+        results.append((image_path, seconds, value, error))
+        print(f"{'FAILED' if error else 'Done'}: {image_path}")
+
+    def submit_finish(image_path: str):
+        image = pending[image_path]
+        future = executor.submit(
+            run_finish, finish, image_name_of(image_path), image.shared.handle, image.stage_results, save_directory
+        )
+        tasks[future] = (image_path, None)
+
+    def start_next_image() -> bool:
+        """Decodes the next image and submits its stages. Returns False once every image was started"""
+        for image_path in remaining:
+            start = time.perf_counter()
+            try:
+                shared = SharedDecodedImage.create(DecodedImage.read(image_path))
+            except Exception as e:
+                record(image_path, time.perf_counter() - start, None, error_message(e))
+                continue
+
+            pending[image_path] = PendingImage(shared, time.perf_counter() - start)
+            for name, stage in stages.items():
+                tasks[executor.submit(run_stage, stage, shared.handle)] = (image_path, name)
+
+            if len(stages) == 0:
+                submit_finish(image_path)
+
+            return True
+
+        return False
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=matplotlib.use, initargs=("Agg",)) as executor:
+        try:
+            while True:
+                while len(pending) < jobs and start_next_image():
+                    pass
+
+                if len(tasks) == 0:
+                    break
+
+                done, _ = wait(tasks, return_when=FIRST_COMPLETED)
+                for future in done:
+                    image_path, stage_name = tasks.pop(future)
+                    image = pending[image_path]
+
+                    try:
+                        value, seconds = future.result()
+                        image.seconds += seconds
+                    except Exception as e:  # The stage failed or the worker itself died
+                        value = None
+                        image.error = image.error or error_message(e)
+
+                    if stage_name is not None:
+                        image.stage_results[stage_name] = value
+                        if len(image.stage_results) < len(stages):
+                            continue
+
+                        if image.error is None:
+                            submit_finish(image_path)
+                            continue
+
+                    record(image_path, image.seconds, value if image.error is None else None, image.error)
+                    pending.pop(image_path).shared.unlink()
+        finally:
+            for image in pending.values():
+                image.shared.unlink()
+
+    # Report in the same order as the images were found
+    image_order = {image_path: i for i, image_path in enumerate(image_paths)}
+    return sorted(results, key=lambda result: image_order[result[0]])
+
+
+def save_results(results: List[ImageResult], results_path: str, value_name: Optional[str]):
+    """Writes one row per image to a CSV, replacing the file only once it is complete"""
+    header = ["File Name", "Seconds", "Status"] + ([value_name] if value_name is not None else []) + ["Error"]
+    lines = [",".join(header)]
+
+    for image_path, seconds, value, error in results:
+        row = [os.path.normpath(image_path), f"{seconds:.3f}", "FAILED" if error else "ok"]
+        if value_name is not None:
+            row.append("" if value is None else str(value))
+        row.append(f'"{error}"' if error else "")
+        lines.append(",".join(row))
+
+    results_directory = os.path.dirname(results_path) or "."
+    fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".csv", dir=results_directory)
+    try:
+        with os.fdopen(fd, "w", newline="") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, results_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def main():
+    args = get_args()
+    matplotlib.use("Agg")
+
+    image_paths = find_images(args.image_path)
+    if not image_paths:
+        sys.exit(f"No images found at '{args.image_path}'")
+
+    algorithm = get_algorithm(args)
+    jobs = min(args.jobs or os.cpu_count() or 1, len(image_paths) * max(len(algorithm[0]), 1))
+
+    start = time.perf_counter()
+    results = process_images(algorithm, image_paths, args.save_directory, jobs)
+    wall_time = time.perf_counter() - start
+
+    results_path = os.path.join(args.save_directory, RESULTS_FILE)
+    save_results(results, results_path, VALUE_NAMES.get(args.algorithm))
+
+    failures = sum(error is not None for _, _, _, error in results)
+    print(f"Processed {len(results) - failures} of {len(results)} images in {wall_time:.2f}s. Results: {results_path}")
+
+    if failures > 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
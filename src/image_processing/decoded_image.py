@@ -0,0 +1,132 @@
+"""
+Decoded images shared by the stages of the image processing algorithms.
+
+An image is decoded once and converted to grayscale once. The otsu, mean shift, entropy and wavelet stages all read the
+version they need from the same DecodedImage instead of decoding the file or converting its colors again.
+
+For parallel runs the arrays are placed in shared memory. Worker processes attach to the blocks by name and get
+zero-copy views, instead of decoding the image themselves or receiving pickled copies.
+"""
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+import local_entropy
+
+ARRAY_NAMES = ("bgr", "gray", "gray_float")
+
+SharedImageHandle = Tuple[Tuple[str, Tuple[int, ...], str], ...]
+"""Shared memory block name, shape and dtype of each array, in ARRAY_NAMES order. Small enough to send to workers"""
+
+
+class DecodedImage:
+    """An image with the color conversions the stages use"""
+
+    bgr: np.ndarray
+    """(H, W, 3) uint8 image as cv2.imread decodes it"""
+
+    gray: np.ndarray
+    """(H, W) uint8 cv2 grayscale conversion, used by otsu and the wavelet decomposition"""
+
+    gray_float: np.ndarray
+    """(H, W) float64 grayscale conversion from local_entropy.rgb2gray, used by the entropy stage"""
+
+    def __init__(self, bgr: np.ndarray, gray: np.ndarray, gray_float: np.ndarray):
+        self.bgr = bgr
+        self.gray = gray
+        self.gray_float = gray_float
+
+    @staticmethod
+    def from_bgr(bgr: np.ndarray) -> "DecodedImage":
+        return DecodedImage(bgr, cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY), local_entropy.rgb2gray(bgr))
+
+    @staticmethod
+    def read(image_path: str) -> "DecodedImage":
+        bgr = cv2.imread(image_path)
+        if bgr is None:
+            raise ValueError(f"'{image_path}' could not be decoded as an image")
+
+        return DecodedImage.from_bgr(bgr)
+
+
+class SharedDecodedImage:
+    """A DecodedImage whose arrays are views of shared memory blocks
+
+    The process that creates it owns the blocks and frees them with unlink once no worker needs them anymore. Workers
+    attach with the handle and close their views when they are done.
+    """
+
+    image: Optional[DecodedImage]
+    blocks: List[SharedMemory]
+
+    def __init__(self, image: DecodedImage, blocks: List[SharedMemory]):
+        self.image = image
+        self.blocks = blocks
+
+    @staticmethod
+    def create(image: DecodedImage) -> "SharedDecodedImage":
+        """Copies the arrays of an image into new shared memory blocks"""
+        arrays: List[np.ndarray] = []
+        blocks: List[SharedMemory] = []
+        shared_array: Optional[np.ndarray] = None
+        try:
+            for name in ARRAY_NAMES:
+                array = getattr(image, name)
+                block = SharedMemory(create=True, size=max(array.nbytes, 1))
+                blocks.append(block)
+
+                shared_array = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+                shared_array[...] = array
+                arrays.append(shared_array)
+        except BaseException:
+            # Drop the views first, a block can not be closed while an array refers to it
+            arrays.clear()
+            shared_array = None
+            for block in blocks:
+                block.close()
+                block.unlink()
+            raise
+
+        return SharedDecodedImage(DecodedImage(*arrays), blocks)
+
+    @staticmethod
+    def attach(handle: SharedImageHandle) -> "SharedDecodedImage":
+        """Maps the blocks created by another process without copying them"""
+        blocks = [SharedMemory(name=name) for name, _, _ in handle]
+        arrays: List[np.ndarray] = [
+            np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+            for (_, shape, dtype), block in zip(handle, blocks)
+        ]
+
+        return SharedDecodedImage(DecodedImage(*arrays), blocks)
+
+    @property
+    def handle(self) -> SharedImageHandle:
+        if self.image is None:
+            raise ValueError("The shared image was already closed")
+
+        return tuple(
+            (block.name, getattr(self.image, name).shape, getattr(self.image, name).dtype.str)
+            for name, block in zip(ARRAY_NAMES, self.blocks)
+        )
+
+    def close(self):
+        """Releases this process's views. Arrays taken from image must not be used afterwards"""
+        # The blocks can only be closed once no array refers to their memory
+        self.image = None
+        for block in self.blocks:
+            block.close()
+
+    def unlink(self):
+        """Closes the views and frees the blocks. Only the process that created them should call this"""
+        self.close()
+        for block in self.blocks:
+            block.unlink()
+
+    def __enter__(self) -> "SharedDecodedImage":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
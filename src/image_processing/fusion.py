@@ -2,11 +2,14 @@ import argparse
 import os
 import sys
 import math
+from typing import Iterator, List, Tuple
 import numpy as np
 import cv2
 import matplotlib.pyplot as plt
 import matplotlib
+from plotting_utils import event_frames
 
+from decoded_image import DecodedImage
 import mean_shift_segmentation
 import otsu
 import local_entropy
@@ -15,42 +18,71 @@ import wavelet_decomposition
 path_arg: str = ''
 blur_amount_arg: int = 11
 otsu_min_threshold_arg: int = 125
+window_arg: int = 100000
+frame_kind_arg: str = "counts"
+batch_size_arg: int = 32
+levels_arg: int = 1
 
 
 def get_args():
-    global path_arg, blur_amount_arg, otsu_min_threshold_arg
+    global path_arg, blur_amount_arg, otsu_min_threshold_arg, window_arg, frame_kind_arg, batch_size_arg, levels_arg
     parser = argparse.ArgumentParser()
 
+    # Recordings are accumulated into one frame per window instead of reading exported images
+    frame_args = argparse.ArgumentParser(add_help=False)
+    frame_args.add_argument(
+        "--window", "-w", help="Frame length in microseconds when processing a CSV recording", type=int, default=100000
+    )
+    frame_args.add_argument(
+        "--frame_kind",
+        "-f",
+        help="Image built from each frame of a CSV recording",
+        choices=event_frames.FRAME_KINDS,
+        default="counts",
+    )
+    frame_args.add_argument("--batch_size", "-n", help="Number of images or frames fused at once", type=int, default=32)
+
     subparsers = parser.add_subparsers(help="Subcommands", dest="subcommand")
 
     o_mss_le = subparsers.add_parser(
-        "o_mss_le", help="Subcommand for otsu/mean shift segmentation/ local entropy fusion"
+        "o_mss_le", help="Subcommand for otsu/mean shift segmentation/ local entropy fusion", parents=[frame_args]
     )
     o_mss_le.add_argument(
-        "image_path", help="Directory containing images to be processed or a path to an image to be processed", type=str
+        "image_path", help="Path to an image or to a CSV recording (On/Off,X,Y,Timestamp) to be processed", type=str
     )
     o_mss_le.add_argument(
         "--blur_amount", "-b", help="The amount the image will be gaussian blurred. (Must be an odd number) ", type=int
     )
     o_mss_le.add_argument("--otsu_threshold", "-t", help="The minimum threshold for the otsu algorithm.", type=int)
 
-    wavelet_parser = subparsers.add_parser("wavelet", help="Subcommand for wavelet decomposition fusion")
+    wavelet_parser = subparsers.add_parser(
+        "wavelet", help="Subcommand for wavelet decomposition fusion", parents=[frame_args]
+    )
     wavelet_parser.add_argument(
-        "image_path", help="Directory containing images to be processed or a path to an image to be processed", type=str
+        "image_path", help="Path to an image or to a CSV recording (On/Off,X,Y,Timestamp) to be processed", type=str
     )
+    wavelet_parser.add_argument("--levels", "-l", help="Number of wavelet decomposition levels", type=int, default=1)
 
     args = parser.parse_args()
     subcommand = args.subcommand
 
     # Check if image path exists and is an image file type
     if os.path.exists(args.image_path):
-        if not os.path.splitext(args.image_path)[1] in [".png", ".jpeg", ".jpg"]:
-            sys.exit(f"ERROR: '{args.image_path}' is not an image.")
+        if not os.path.splitext(args.image_path)[1] in [".png", ".jpeg", ".jpg", ".csv"]:
+            sys.exit(f"ERROR: '{args.image_path}' is not an image or a CSV recording.")
         else:
             path_arg = args.image_path
     else:
         sys.exit(f"ERROR: '{args.image_path}' does not exist")
 
+    if args.window <= 0:
+        sys.exit("ERROR: arg '--window' must be positive")
+    window_arg = args.window
+    if args.batch_size <= 0:
+        sys.exit("ERROR: arg '--batch_size' must be positive")
+    batch_size_arg = args.batch_size
+    frame_kind_arg = args.frame_kind
+
     if subcommand == "o_mss_le":
         # Ensure that the blur amount arg is valid
         if args.blur_amount is not None:
@@ -68,53 +100,164 @@ def get_args():
 
         process_subcommand_o_mss_le()
     elif subcommand == "wavelet":
+        if args.levels < 1:
+            sys.exit("ERROR: arg '--levels' must be at least 1")
+        levels_arg = args.levels
+
         process_subcommand_wavelet()
 
 
+def load_images(path: str) -> Iterator[Tuple[str, DecodedImage]]:
+    """Reads the images to be processed
+
+    An image file gives a single image. A CSV recording is accumulated into one frame per window and each frame with
+    events is passed on as an in-memory image, without writing it to disk.
+
+    Returns:
+        Iterator[Tuple[str, DecodedImage]]: Name and decoded image
+    """
+    name = os.path.splitext(os.path.basename(os.path.normpath(path)))[0]
+
+    if os.path.splitext(path)[1] != ".csv":
+        yield name, DecodedImage.read(path)
+        return
+
+    for frame in event_frames.iter_frames(path, window_arg):
+        if frame.counts.any():
+            yield f"{name}-frame_{frame.index}", DecodedImage.from_bgr(frame.image(frame_kind_arg))
+
+
+def iter_batches(images: Iterator[Tuple[str, DecodedImage]]) -> Iterator[List[Tuple[str, DecodedImage]]]:
+    """Groups the images from load_images into lists of up to batch_size_arg images of the same size"""
+    batch: List[Tuple[str, DecodedImage]] = []
+    for image_name, image in images:
+        if len(batch) == batch_size_arg or (len(batch) > 0 and batch[0][1].bgr.shape != image.bgr.shape):
+            yield batch
+            batch = []
+
+        batch.append((image_name, image))
+
+    if len(batch) > 0:
+        yield batch
+
+
 def process_subcommand_o_mss_le():
-    otsu_fusion_threshold: int = 255
-    mss_fusion_threshold: int = 100
-    entropy_fusion_threshold: float = 0.7
+    for batch in iter_batches(load_images(path_arg)):
+        fuse_o_mss_le(batch, blur_amount_arg, otsu_min_threshold_arg)
+
+
+def o_mss_le_mask(
+    otsu_image: np.ndarray,
+    mss_image: np.ndarray,
+    entropy_image: np.ndarray,
+    otsu_threshold: int = 255,
+    mss_threshold: int = 100,
+    entropy_threshold: float = 0.7,
+) -> np.ndarray:
+    """Finds the pixels where the otsu, mean shift and entropy images all match
+
+    The images are compared as whole arrays, so stacks of N images with shape (N, H, W) are fused in a single call.
+
+    Returns:
+        np.ndarray: bool mask with the shape of the images
+    """
+    return (otsu_image == otsu_threshold) & (mss_image > mss_threshold) & (entropy_image > entropy_threshold)
+
+
+def mask_to_image(mask: np.ndarray, like: np.ndarray) -> np.ndarray:
+    """White pixels where mask is set and black pixels elsewhere
+
+    Args:
+        mask (np.ndarray): (H, W) mask or (N, H, W) stack of masks
+        like (np.ndarray): One of the original (H, W, channels) images, giving the channels and type of the result
+
+    Returns:
+        np.ndarray: Image or stack of images with the shape of mask plus the channels of like
+    """
+    result_image = np.zeros(mask.shape + like.shape[2:], dtype=like.dtype)
+    result_image[mask] = 255
+
+    return result_image
+
+
+def otsu_stage(image: DecodedImage, blur_amount: int, otsu_min_threshold: int) -> np.ndarray:
+    return otsu.otsu_and_blur_gray(image.gray, blur_amount, otsu_min_threshold)
+
+
+def mss_stage(image: DecodedImage) -> np.ndarray:
+    return cv2.cvtColor(mean_shift_segmentation.mss(image.bgr, False, 5), cv2.COLOR_RGB2GRAY)
 
-    result_image = cv2.imread(path_arg)
-    original_image = cv2.imread(path_arg)
+
+def entropy_stage(image: DecodedImage) -> np.ndarray:
+    return local_entropy.get_entropy_image(image.gray_float, convert_to_gray=False)
+
+
+def fuse_o_mss_le(
+    batch: List[Tuple[str, DecodedImage]],
+    blur_amount: int = 11,
+    otsu_min_threshold: int = 125,
+    save_directory: str = "",
+):
+    """Runs the otsu/mean shift segmentation/local entropy fusion on a batch of images of the same size"""
+    images = [image for _, image in batch]
 
     # Perform different types of image processing
-    otsu_image = otsu.otsu_and_blur(result_image, blur_amount_arg, otsu_min_threshold_arg)
-    mss_image = cv2.cvtColor(mean_shift_segmentation.mss(result_image, False, 5), cv2.COLOR_RGB2GRAY)
-    entropy_image = local_entropy.get_entropy_image(result_image)
-
-    # Iterate over the processed images. Place white pixels where the images match and black pixels elsewhere
-    for (i, row) in enumerate(result_image):
-        for (j, pix) in enumerate(row):
-            if (
-                (otsu_image[i][j] == otsu_fusion_threshold)
-                and (mss_image[i][j] > mss_fusion_threshold)
-                and (entropy_image[i][j] > entropy_fusion_threshold)
-            ):
-                result_image[i][j] = np.array([255, 255, 255])
-            else:
-                result_image[i][j] = np.array([0, 0, 0])
+    otsu_images = np.stack([otsu_stage(image, blur_amount, otsu_min_threshold) for image in images])
+    mss_images = np.stack([mss_stage(image) for image in images])
+    entropy_images = local_entropy.get_entropy_image(
+        np.stack([image.gray_float for image in images]), convert_to_gray=False
+    )
 
-    fig_title: str = os.path.splitext(os.path.basename(os.path.normpath(path_arg)))[0]
-    save_name: str = f"{fig_title}-blur_{blur_amount_arg}-otsu_threhsold_{otsu_min_threshold_arg}-fusion"
+    # Place white pixels where the processed images match and black pixels elsewhere, for the whole batch at once
+    result_images = mask_to_image(o_mss_le_mask(otsu_images, mss_images, entropy_images), images[0].bgr)
+
+    for (image_name, image), result_image, otsu_image, mss_image, entropy_image in zip(
+        batch, result_images, otsu_images, mss_images, entropy_images
+    ):
+        plot_o_mss_le(
+            image_name,
+            image.bgr,
+            result_image,
+            otsu_image,
+            mss_image,
+            entropy_image,
+            blur_amount,
+            otsu_min_threshold,
+            save_directory,
+        )
+
+
+def plot_o_mss_le(
+    image_name: str,
+    original_image: np.ndarray,
+    result_image: np.ndarray,
+    otsu_image: np.ndarray,
+    mss_image: np.ndarray,
+    entropy_image: np.ndarray,
+    blur_amount: int,
+    otsu_min_threshold: int,
+    save_directory: str = "",
+):
+    fig_title: str = image_name
+    save_name: str = f"{fig_title}-blur_{blur_amount}-otsu_threhsold_{otsu_min_threshold}-fusion"
     create_fusion_plot(
         fig_title,
-        save_name,
+        os.path.join(save_directory, save_name),
         [original_image, result_image, [], otsu_image, mss_image, entropy_image],
         ["Orignal", "Fusion Image", "", "Gaussian Blur Otsu", "Mean Shift", "Entropy"],
     )
 
 
+def wavelet_mask(mss, decomp, low_thresh, high_thresh, mss_thresh) -> np.ndarray:
+    """Finds the pixels inside of the mean shift segments with a wavelet coefficient outside of the thresholds
+
+    mss and decomp broadcast against each other, so a stack of decompositions can be fused with one mean shift image.
+    """
+    return (mss > mss_thresh) & ((decomp > high_thresh) | (decomp < low_thresh))
+
+
 def wavelet_combine(original, mss, decomp, low_thresh, high_thresh, mss_thresh) -> np.ndarray:
-    result_image = np.copy(original)
-    for (i, row) in enumerate(result_image):
-        for (j, pix) in enumerate(row):
-            if (mss[i][j] > mss_thresh) and (decomp[i][j] > high_thresh or decomp[i][j] < low_thresh):
-                result_image[i][j] = np.array([255, 255, 255])
-            else:
-                result_image[i][j] = np.array([0, 0, 0])
-    return result_image
+    return mask_to_image(wavelet_mask(mss, decomp, low_thresh, high_thresh, mss_thresh), original)
 
 
 def create_fusion_plot(fig_title: str, save_name: str, images: list, titles: list):
@@ -145,52 +288,91 @@ def create_fusion_plot(fig_title: str, save_name: str, images: list, titles: lis
                 axes[i, j].axis("off")
 
     plt.savefig(save_name)
-    plt.close
+    plt.close(f)
 
 
 def process_subcommand_wavelet():
-    mss_fusion_threshold: int = 100
-    wavelet_threshold_low: int = -100
-    wavelet_threshold_high: int = 100
-    wavelet_type: str = "db1"
+    for batch in iter_batches(load_images(path_arg)):
+        fuse_wavelet(batch, levels=levels_arg)
 
-    original_image = cv2.imread(path_arg)
-    result_image = np.copy(original_image)
 
-    mss_image = cv2.cvtColor(mean_shift_segmentation.mss(result_image, False, 5), cv2.COLOR_RGB2GRAY)
-    LL, LH, HL, HH = wavelet_decomposition.wavelet_decomposition(
-        cv2.cvtColor(original_image, cv2.COLOR_RGB2GRAY), wavelet_type
-    )
+def wavelet_stage(image: DecodedImage, wavelet_type: str = "db1", levels: int = 1) -> np.ndarray:
+    """Detail bands of the grayscale image
 
-    # Resize decomposed images to orignal size
-    LL = cv2.resize(LL, (128, 128), interpolation=cv2.INTER_NEAREST)
-    LH = cv2.resize(LH, (128, 128), interpolation=cv2.INTER_NEAREST)
-    HL = cv2.resize(HL, (128, 128), interpolation=cv2.INTER_NEAREST)
-    HH = cv2.resize(HH, (128, 128), interpolation=cv2.INTER_NEAREST)
+    Returns:
+        np.ndarray: (levels, 3, H, W) LH, HL and HH bands of each level, resized to the size of the image
+    """
+    return wavelet_decomposition.detail_bands(image.gray[np.newaxis], wavelet_type, levels)[0]
 
-    # Iterate over the processed images. Place white pixels where the images match and black pixels elsewhere
-    HH_result = wavelet_combine(
-        original_image, mss_image, HH, wavelet_threshold_low, wavelet_threshold_high, mss_fusion_threshold
-    )
-    LH_result = wavelet_combine(
-        original_image, mss_image, LH, wavelet_threshold_low, wavelet_threshold_high, mss_fusion_threshold
-    )
-    HL_result = wavelet_combine(
-        original_image, mss_image, HL, wavelet_threshold_low, wavelet_threshold_high, mss_fusion_threshold
-    )
 
-    image_name: str = os.path.basename(os.path.normpath(path_arg))
-    image_name = os.path.splitext(image_name)[0]
-    save_name = f"{image_name}_wavelet_fusion_{wavelet_type}"
+def fuse_wavelet(
+    batch: List[Tuple[str, DecodedImage]], save_directory: str = "", wavelet_type: str = "db1", levels: int = 1
+):
+    """Runs the wavelet decomposition fusion on a batch of images of the same size
 
-    create_fusion_plot(
-        image_name,
-        save_name,
-        [original_image, mss_image, HH, HH_result, LH, LH_result, HL, HL_result],
-        ["Orignal", "Mean Shift", "HH", "HH_result", "LH", "LH_result", "HL", "HL_result"],
+    The whole batch is decomposed at once and every detail band of every level and image is fused in a single call.
+    """
+    images = [image for _, image in batch]
+
+    mss_images = np.stack([mss_stage(image) for image in images])
+    bands = wavelet_decomposition.detail_bands(np.stack([image.gray for image in images]), wavelet_type, levels)
+
+    result_images = wavelet_fusion(images[0].bgr, mss_images, bands)
+
+    for (image_name, image), mss_image, image_bands, image_results in zip(batch, mss_images, bands, result_images):
+        plot_wavelet(image_name, image.bgr, mss_image, image_bands, image_results, save_directory, wavelet_type)
+
+
+def wavelet_fusion(like: np.ndarray, mss_images: np.ndarray, bands: np.ndarray) -> np.ndarray:
+    """Fuses every detail band with the mean shift image of its frame
+
+    Args:
+        like (np.ndarray): One of the original images, giving the channels and type of the results
+        mss_images (np.ndarray): (N, H, W) mean shift images
+        bands (np.ndarray): (N, levels, 3, H, W) detail bands from wavelet_decomposition.detail_bands
+
+    Returns:
+        np.ndarray: (N, levels, 3, H, W, channels) fusion images
+    """
+    mss_fusion_threshold: int = 100
+    wavelet_threshold_low: int = -100
+    wavelet_threshold_high: int = 100
+
+    return wavelet_combine(
+        like,
+        mss_images[:, np.newaxis, np.newaxis],
+        bands,
+        wavelet_threshold_low,
+        wavelet_threshold_high,
+        mss_fusion_threshold,
     )
 
 
+def plot_wavelet(
+    image_name: str,
+    original_image: np.ndarray,
+    mss_image: np.ndarray,
+    bands: np.ndarray,
+    result_images: np.ndarray,
+    save_directory: str = "",
+    wavelet_type: str = "db1",
+):
+    """Plots the HH, LH and HL bands of each level next to their fusion images"""
+    images = [original_image, mss_image]
+    titles = ["Orignal", "Mean Shift"]
+
+    for level, (level_bands, level_results) in enumerate(zip(bands, result_images), start=1):
+        # Bands are stored LH, HL, HH and plotted HH, LH, HL
+        for band_name, band_index in (("HH", 2), ("LH", 0), ("HL", 1)):
+            label = band_name if len(bands) == 1 else f"{band_name}{level}"
+            images += [level_bands[band_index], level_results[band_index]]
+            titles += [label, f"{label}_result"]
+
+    save_name = os.path.join(save_directory, f"{image_name}_wavelet_fusion_{wavelet_type}")
+
+    create_fusion_plot(image_name, save_name, images, titles)
+
+
 if __name__ == "__main__":
     matplotlib.use("TkAgg")  # Use TkAgg rendering backend for matplotlib
     get_args()
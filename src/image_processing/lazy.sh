@@ -1,4 +1 @@
-for file in wheel_pictures/*; do
-    python3 fusion.py $file;
-done
-
+python3 batch_process.py wheel_pictures o_mss_le
@@ -2,6 +2,7 @@
 
 import matplotlib.pyplot as plt
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import os
 import sys
 import argparse
@@ -57,24 +58,130 @@ def entropy(signal):
     return ent
 
 
-def get_entropy_image(img: np.ndarray, convert_to_gray=True) -> np.ndarray:
-    if convert_to_gray:
-        img = rgb2gray(img)
+HISTOGRAM_BUDGET = 1 << 21
+"""Most histogram bins kept at once by get_entropy_image. Rows are processed in chunks that stay within it"""
+
+
+def slide_windows(
+    window_columns: np.ndarray, n_symbols: int, width: int, count_information: np.ndarray
+) -> np.ndarray:
+    """Slides a window along each row and sums c * log2(c) over the counts c of the symbols in it
+
+    Args:
+        window_columns (np.ndarray): (rows, padded width, diameter) symbols of the window column of each row at every
+                                     padded column
+        n_symbols (int): Symbols are 0 to n_symbols - 1
+        width (int): Number of window positions along each row
+        count_information (np.ndarray): c * log2(c) for every count c a window can hold
+
+    Returns:
+        np.ndarray: (rows, width) sum for each window position
+    """
+    rows, _, diameter = window_columns.shape
+    row_index = np.arange(rows)
+    histogram = np.zeros((rows, n_symbols), dtype=np.int32)
+    information_sum = np.zeros(rows)
+    information = np.empty((rows, width))
+
+    def slide(column: int, step: int):
+        """Adds (step 1) or removes (step -1) one padded column of every window"""
+        # One symbol per row at a time, so no bin is updated twice by the same assignment
+        for symbol in window_columns[:, column].T:
+            old = histogram[row_index, symbol]
+            histogram[row_index, symbol] = old + step
+            information_sum[...] += count_information[old + step] - count_information[old]
+
+    for column in range(diameter):
+        slide(column, 1)
+    information[:, 0] = information_sum
+
+    for column in range(1, width):
+        slide(column - 1, -1)
+        slide(column + diameter - 1, 1)
+        information[:, column] = information_sum
 
-    N = 5
-    S = img.shape
-    E = np.array(img)
+    return information
 
-    for row in range(S[0]):
-        for col in range(S[1]):
-            Lx = np.max([0, col - N])
-            Ux = np.min([S[1], col + N])
-            Ly = np.max([0, row - N])
-            Uy = np.min([S[0], row + N])
-            region = img[Ly:Uy, Lx:Ux].flatten()
-            E[row, col] = entropy(region)
 
-    return E
+def get_entropy_image(img: np.ndarray, convert_to_gray=True, radius: int = 5) -> np.ndarray:
+    """Entropy of the values in the window around every pixel
+
+    The window spans [row - radius, row + radius) x [col - radius, col + radius), clipped at the image edges. Every
+    distinct value is a symbol, the same as entropy() counts them. Each row keeps a histogram of the symbols in its
+    window that is updated as the window slides one column to the right, together with the sum of c * log2(c) over the
+    symbol counts c. The entropy then follows from log2(n) - sum(c * log2(c)) / n for window size n.
+
+    The windows of all rows, and of all frames of a batch, slide together. Rows are split into chunks so that no more
+    than HISTOGRAM_BUDGET bins are kept at once. Images with more distinct values than one row of windows can hold
+    number the symbols of each row separately, so a histogram never needs more bins than that.
+
+    Args:
+        img (np.ndarray): (H, W, 3) RGB image, or an (N, H, W, 3) stack of them to process a batch of frames at once.
+                          (H, W) or (N, H, W) when convert_to_gray is False
+        convert_to_gray (bool, optional): Convert the image with rgb2gray first
+        radius (int, optional): Size of the window around each pixel
+
+    Returns:
+        np.ndarray: Local entropy with the shape and type of the grayscale image
+    """
+    if radius < 1:
+        raise ValueError(f"Entropy window radius must be at least 1, not {radius}")
+
+    if convert_to_gray:
+        img = rgb2gray(img)
+
+    height, width = img.shape[-2:]
+    diameter = 2 * radius
+
+    # Number the symbols. The area outside of the image is one more symbol, so every window holds diameter^2 of them
+    symbols, symbol_ids = np.unique(img, return_inverse=True)
+    outside = len(symbols)
+    symbol_ids = symbol_ids.reshape((-1, height, width)).astype(np.int32)
+    padded = np.pad(symbol_ids, ((0, 0), (radius, radius - 1), (radius, radius - 1)), constant_values=outside)
+
+    # (rows, padded width, diameter) view of the window column of each row at every padded column. The padded frames
+    # are stacked into one tall image, so the windows of every row of every frame are a single view.
+    # The windows that overlap two frames are computed along with the others and dropped at the end
+    padded_height = padded.shape[1]
+    window_columns = sliding_window_view(padded.reshape(-1, padded.shape[2]), diameter, axis=0)
+    rows = len(window_columns)
+
+    # c * log2(c) for every count a window can hold
+    counts = np.arange(diameter * diameter + 1)
+    count_information = counts * np.log2(np.maximum(counts, 1))
+
+    # Window sizes inside of the image, from the clipped row and column spans
+    row_positions, column_positions = np.arange(height), np.arange(width)
+    row_spans = np.minimum(row_positions + radius, height) - np.maximum(row_positions - radius, 0)
+    column_spans = np.minimum(column_positions + radius, width) - np.maximum(column_positions - radius, 0)
+    window_size = np.outer(row_spans, column_spans)
+
+    # With more symbols than a row's windows can hold, the symbols are numbered again for each row
+    n_symbols = outside + 1
+    renumber = n_symbols > window_columns[0].size
+    bins = window_columns[0].size if renumber else n_symbols
+    chunk_rows = max(1, HISTOGRAM_BUDGET // bins)
+
+    information = np.empty((rows, width))
+    for start in range(0, rows, chunk_rows):
+        columns = window_columns[start:start + chunk_rows]
+
+        if renumber:
+            # Keys sort by row first, so the symbols of each row get consecutive numbers
+            keys = np.arange(len(columns), dtype=np.int64)[:, np.newaxis, np.newaxis] * n_symbols + columns
+            columns = np.unique(keys, return_inverse=True)[1].reshape(keys.shape)
+            columns -= columns.min(axis=(1, 2), keepdims=True)
+
+        information[start:start + chunk_rows] = slide_windows(columns, bins, width, count_information)
+
+    # Back to (frames, height, width), without the windows that overlap two frames
+    information = np.pad(information, ((0, diameter - 1), (0, 0))).reshape(-1, padded_height, width)[:, :height]
+
+    # The area outside of the image is not a symbol of the window, so its share is taken out again
+    information -= count_information[diameter * diameter - window_size]
+    E = np.log2(window_size) - information / window_size
+
+    return E.reshape(img.shape).astype(img.dtype)
 
 
 if __name__ == "__main__":
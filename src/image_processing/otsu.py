@@ -16,7 +16,7 @@ def get_args():
 
     parser = argparse.ArgumentParser()
     parser.add_argument(
-        "image_path", help="Directory containing images to be processed or a path to an image to be processed", type=str
+        "image_path", help="Path to an image to be processed. Use batch_process.py for directories", type=str
     )
     parser.add_argument(
         "--blur_amount",
@@ -55,6 +55,11 @@ def otsu_and_blur(img: np.ndarray, blur_amount: int, otsu_min_threshold: int) ->
     # Convert image to grayscale
     img_bw = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
+    return otsu_and_blur_gray(img_bw, blur_amount, otsu_min_threshold)
+
+
+def otsu_and_blur_gray(img_bw: np.ndarray, blur_amount: int, otsu_min_threshold: int) -> np.ndarray:
+    """Same as otsu_and_blur for an image that is already grayscale"""
     # apply guassian blur on src image
     img_blur = cv2.GaussianBlur(img_bw, (blur_amount, blur_amount), cv2.BORDER_DEFAULT)
 
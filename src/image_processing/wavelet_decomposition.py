@@ -1,3 +1,5 @@
+from typing import Tuple
+
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib
@@ -14,6 +16,46 @@ def wavelet_decomposition(img: np.ndarray, wavelet_type: str = "db4"):
     return LL, LH, HL, HH
 
 
+def nearest_indices(size: int, source_size: int) -> np.ndarray:
+    """Source index of each of size resized positions, computed in doubles the same way cv2.INTER_NEAREST does"""
+    indices = np.floor(np.arange(size) * (1.0 / (size / source_size))).astype(np.intp)
+    return np.minimum(indices, source_size - 1)
+
+
+def upsample_nearest(bands: np.ndarray, shape: Tuple[int, int]) -> np.ndarray:
+    """Resizes the last two axes of a stack of bands to shape with nearest neighbor sampling, like cv2.INTER_NEAREST"""
+    rows = nearest_indices(shape[0], bands.shape[-2])
+    columns = nearest_indices(shape[1], bands.shape[-1])
+
+    return bands[..., rows[:, np.newaxis], columns]
+
+
+def detail_bands(frames: np.ndarray, wavelet_type: str = "db1", levels: int = 1) -> np.ndarray:
+    """Multi-level wavelet decomposition of a stack of frames
+
+    Every frame of the stack is decomposed by a single pywt.wavedec2 call and each detail band is resized back to the
+    frame size, so the bands of all levels and frames line up with the frames pixel by pixel.
+
+    Args:
+        frames (np.ndarray): (N, H, W) grayscale frames of any size
+        wavelet_type (str, optional): pywt wavelet name
+        levels (int, optional): Number of decomposition levels
+
+    Returns:
+        np.ndarray: (N, levels, 3, H, W) LH, HL and HH bands of each level, starting at the finest level
+    """
+    if levels < 1:
+        raise ValueError(f"At least one decomposition level is needed, not {levels}")
+
+    coefficients = pywt.wavedec2(frames, wavelet_type, level=levels, axes=(-2, -1))
+
+    # wavedec2 lists the coarsest level first
+    frame_shape = frames.shape[-2:]
+    bands = [upsample_nearest(np.stack(level_bands, axis=1), frame_shape) for level_bands in coefficients[:0:-1]]
+
+    return np.stack(bands, axis=1)
+
+
 if __name__ == "__main__":
     matplotlib.use("TkAgg")
 
@@ -15,15 +15,18 @@ import matplotlib.pyplot as plt
 
 import plotting_utils.get_plotting_data as get_plotting_data
 from plotting_utils.get_plotting_data import DataStorage
+import plotting_utils.plotting_helper as plotting_helper
 
 file_to_plot = ""
 view = ""
 time_limit = -1
+start_time = 0.0
 save_directory = ""
+workers = 1
 
 
 def get_args():
-    global file_to_plot, view, time_limit, save_directory
+    global file_to_plot, view, time_limit, start_time, save_directory, workers
 
     parser = argparse.ArgumentParser()
 
@@ -34,7 +37,13 @@ def get_args():
     parser.add_argument(
         "--time_limit", "-t", help="Time limit for the Z-axis (seconds)", type=float, default=sys.maxsize
     )
+    parser.add_argument(
+        "--start_time", "-s", help="Skip events before this point in the recording (seconds)", type=float, default=0.0
+    )
     parser.add_argument("--save_directory", "-d", help="Save file to directory", type=str)
+    parser.add_argument(
+        "--workers", "-w", help="Number of processes used to read the CSV (0 = all CPUs)", type=int, default=1
+    )
 
     args = parser.parse_args()
 
@@ -57,12 +66,26 @@ def get_args():
 
     time_limit = args.time_limit
 
-
-if __name__ == "__main__":
-    get_args()
-    matplotlib.use("Qt5Agg")
-
-    events = get_plotting_data.SpatialCsvData.from_csv(file_to_plot, DataStorage.COLOR, time_limit)
+    if args.start_time < 0:
+        sys.exit("Error: --start_time cannot be negative")
+    start_time = args.start_time
+
+    if args.workers < 0:
+        sys.exit("Error: --workers cannot be negative")
+    workers = args.workers
+
+
+def plot_3d(
+    file_to_plot: str,
+    view: str,
+    time_limit: float = sys.maxsize,
+    save_directory: str = "",
+    workers: int = 1,
+    start_time: float = 0,
+):
+    events = get_plotting_data.SpatialCsvData.from_event_store(
+        file_to_plot, DataStorage.BOOL, time_limit, workers=workers, start_time=start_time
+    )
 
     fig = plt.figure()
     fig.set_size_inches(12, 10)
@@ -79,7 +102,7 @@ if __name__ == "__main__":
             events.x_positions,
             events.y_positions,
             events.timestamps,
-            c=events.polarities_color,
+            **plotting_helper.polarity_color_args(events.polarities),
             marker=".",
             s=4,
             depthshade=False,
@@ -92,7 +115,7 @@ if __name__ == "__main__":
             events.x_positions,
             events.y_positions,
             events.timestamps,
-            c=events.polarities_color,
+            **plotting_helper.polarity_color_args(events.polarities),
             marker="H",
             s=4,
             depthshade=False,
@@ -106,7 +129,7 @@ if __name__ == "__main__":
             events.x_positions,
             events.y_positions,
             events.timestamps,
-            c=events.polarities_color,
+            **plotting_helper.polarity_color_args(events.polarities),
             marker="H",
             s=4,
             depthshade=False,
@@ -116,4 +139,11 @@ if __name__ == "__main__":
 
         fig.savefig(os.path.join(save_directory, f"3D_Plot-{file_name}-top.png"), bbox_inches="tight", pad_inches=0)
 
-    plt.clf()
+    plt.close(fig)
+
+
+if __name__ == "__main__":
+    get_args()
+    matplotlib.use("Qt5Agg")
+
+    plot_3d(file_to_plot, view, time_limit, save_directory, workers, start_time)
@@ -0,0 +1,205 @@
+"""
+Runs one of the plotting scripts on every CSV in a directory.
+
+The scripts are imported once per worker process and the files are spread over a pool of workers, instead of starting
+a new interpreter for every file. A file that fails to plot is reported in the summary without stopping the others.
+
+Example: python src/plotting/batch_plot.py data/waveforms -r --jobs 4 spike -x 64 -y 64 -a 3
+"""
+import argparse
+import glob
+import importlib
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from typing import Callable, List, Optional, Tuple
+
+import matplotlib
+
+import event_density
+import fingerprint_graph
+import spike_graph
+
+plot_3d = importlib.import_module("3dplot")  # Not a valid module name for an import statement
+
+PlotResult = Tuple[str, float, Optional[str]]
+"""CSV file, seconds spent plotting it and the error message if it failed"""
+
+
+def get_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("csv_directory", help="Directory containing csv files to plot", type=str)
+    parser.add_argument("--recursive", "-r", help="Recursively search through csv_directory", action="store_true")
+    parser.add_argument("--save_directory", "-d", help="Save files to directory", type=str, default="")
+    parser.add_argument(
+        "--jobs", "-j", help="Number of files plotted at the same time (default: all CPUs)", type=int, default=0
+    )
+
+    plots = parser.add_subparsers(dest="plot", required=True, help="Plot to make for each file")
+
+    plot_3d_args = plots.add_parser("3d", help="3D plots (3dplot.py)")
+    plot_3d_args.add_argument(
+        "--view_angle", "-v", help="Plot viewing angle", choices=["default", "top", "side", "all"], required=True
+    )
+    plot_3d_args.add_argument("--time_limit", "-t", help="Time limit for the Z-axis (seconds)", type=float)
+    plot_3d_args.add_argument("--start_time", "-s", help="Skip events before this point (seconds)", type=float)
+
+    fingerprint_args = plots.add_parser("fingerprint", help="Event count fingerprints (fingerprint_graph.py)")
+    fingerprint_args.add_argument(
+        "reconstruction_window", help="Reconstruction window used to generate the files: int or path to config file"
+    )
+    fingerprint_args.add_argument("--plot_xlim", "-x", help="Limit on the X-axis (seconds)", type=float)
+
+    spike_args = plots.add_parser("spike", help="Spike plots (spike_graph.py)")
+    spike_args.add_argument("--pixel_x", "-x", help="X coordinate of the pixel to examine", type=int)
+    spike_args.add_argument("--pixel_y", "-y", help="Y coordinate of the pixel to examine", type=int)
+    spike_args.add_argument("--area_size", "-a", help="Size of area to plot", type=int)
+    spike_args.add_argument("--global_area", "-g", help="Plot the activity of every pixel", action="store_true")
+    spike_args.add_argument("--time_limit", "-t", help="Time limit for the X-axis (seconds)", type=float)
+    spike_args.add_argument("--start_time", "-s", help="Skip events before this point (seconds)", type=float)
+
+    density_args = plots.add_parser("density", help="Event density plots (event_density.py)")
+    density_args.add_argument("--pixel_x", "-x", help="x coordinate of desired pixel", type=int, required=True)
+    density_args.add_argument("--pixel_y", "-y", help="y coordinate of desired pixel", type=int, required=True)
+    density_args.add_argument("--area_size", "-a", help="size of box around pixel to observe", type=int, required=True)
+    density_args.add_argument("--max_plot_points", "-m", help="max number of points to plot", type=int)
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.csv_directory):
+        sys.exit(f"'{args.csv_directory}' is not a directory")
+
+    if args.save_directory and not os.path.exists(args.save_directory):
+        sys.exit(f'Error: Specified path "{args.save_directory}" does not exist')
+
+    if args.jobs < 0:
+        sys.exit("Error: --jobs cannot be negative")
+
+    if args.plot == "spike":
+        local_area = (args.pixel_x, args.pixel_y, args.area_size)
+        if args.global_area and any(arg is not None for arg in local_area):
+            sys.exit(f"{sys.argv[0]}: error: --global_area conflicts with pixel_x, pixel_y, and area_size")
+        elif not args.global_area and any(arg is None for arg in local_area):
+            sys.exit(f"{sys.argv[0]}: error: pixel_x, pixel_y, and area_size must all be set without --global_area")
+
+    return args
+
+
+def get_plot_function(args: argparse.Namespace) -> Callable[[str], None]:
+    """Binds the plot arguments to the plot function of the selected script. The result only takes the CSV path"""
+    if args.plot == "3d":
+        return partial(
+            plot_3d.plot_3d,
+            view=args.view_angle,
+            time_limit=args.time_limit if args.time_limit is not None else sys.maxsize,
+            save_directory=args.save_directory,
+            start_time=args.start_time or 0,
+        )
+    elif args.plot == "fingerprint":
+        return partial(
+            fingerprint_graph.plot_fingerprint,
+            reconstruction_window=fingerprint_graph.parse_reconstruction_window(args.reconstruction_window),
+            x_lim=args.plot_xlim,
+            save_directory=args.save_directory,
+        )
+    elif args.plot == "spike":
+        return partial(
+            spike_graph.plot_spikes,
+            pixel_x=args.pixel_x,
+            pixel_y=args.pixel_y,
+            area_size=args.area_size,
+            use_global_area=args.global_area,
+            time_limit=args.time_limit if args.time_limit is not None else math.inf,
+            start_time=args.start_time or 0,
+            save_directory=args.save_directory,
+        )
+    else:
+        return partial(
+            event_density.plot_event_density,
+            pixel_x=args.pixel_x,
+            pixel_y=args.pixel_y,
+            area_size=args.area_size,
+            max_plot_points=args.max_plot_points if args.max_plot_points else float("inf"),
+            save_directory=args.save_directory,
+        )
+
+
+def find_csv_files(csv_directory: str, recursive: bool) -> List[str]:
+    pattern = os.path.join(csv_directory, "**", "*.csv") if recursive else os.path.join(csv_directory, "*.csv")
+    return sorted(glob.glob(pattern, recursive=recursive))
+
+
+def plot_file(plot: Callable[[str], None], csv_file: str) -> PlotResult:
+    """Plots one file. Errors are returned instead of raised so one bad file does not stop the batch"""
+    start = time.perf_counter()
+
+    try:
+        plot(csv_file)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}".replace("\n", " ")
+
+    return csv_file, time.perf_counter() - start, error
+
+
+def plot_files(plot: Callable[[str], None], csv_files: List[str], jobs: int) -> List[PlotResult]:
+    """Plots every file, using a pool of jobs worker processes when jobs is more than 1"""
+    if jobs == 1:
+        return [plot_file(plot, csv_file) for csv_file in csv_files]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=jobs, initializer=matplotlib.use, initargs=("Agg",)) as executor:
+        futures = {executor.submit(plot_file, plot, csv_file): csv_file for csv_file in csv_files}
+
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:  # The worker itself died, e.g. it ran out of memory
+                results.append((futures[future], math.nan, f"{type(e).__name__}: {e}"))
+
+            print(f"{'FAILED' if results[-1][2] else 'Done'}: {futures[future]}")
+
+    # Report in the same order as the files were found
+    file_order = {csv_file: i for i, csv_file in enumerate(csv_files)}
+    return sorted(results, key=lambda result: file_order[result[0]])
+
+
+def print_summary(results: List[PlotResult], wall_time: float):
+    print(f"\n{'Seconds':>9}  {'Status':<6}  File")
+    for csv_file, seconds, error in results:
+        print(f"{seconds:>9.2f}  {'FAILED' if error else 'ok':<6}  {csv_file}")
+        if error:
+            print(f"{'':>17}  {error}")
+
+    failures = sum(error is not None for _, _, error in results)
+    plot_time = sum(seconds for _, seconds, _ in results if not math.isnan(seconds))
+    print(
+        f"\nPlotted {len(results) - failures} of {len(results)} files in {wall_time:.2f}s "
+        f"({plot_time:.2f}s spent plotting)"
+    )
+
+
+def main():
+    args = get_args()
+    matplotlib.use("Agg")
+
+    csv_files = find_csv_files(args.csv_directory, args.recursive)
+    if not csv_files:
+        sys.exit(f"No csv files found in '{args.csv_directory}'")
+
+    jobs = min(args.jobs or os.cpu_count() or 1, len(csv_files))
+    plot = get_plot_function(args)
+
+    start = time.perf_counter()
+    results = plot_files(plot, csv_files, jobs)
+    print_summary(results, time.perf_counter() - start)
+
+    if any(error is not None for _, _, error in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,12 @@
 import os
 import re
-import math
 import glob
 import argparse
+import hashlib
 import sys
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import matplotlib.pyplot as plt
@@ -13,11 +15,28 @@ from natsort import natsorted, ns
 
 import plotting_utils.get_plotting_data as get_plotting_data
 from plotting_utils.get_plotting_data import CsvData
+from plotting_utils.gaussian_fit import GaussianFit
+from plotting_utils.result_cache import (
+    ResultCache,
+    add_cache_args,
+    cache_from_args,
+    call_counted,
+    check_cache_args,
+    format_counters,
+)
+from plotting_utils.run_manifest import RunManifest
 
 import plotting_utils.plotting_helper as plotting_helper
 
+EVENT_TYPES = ("on", "off", "both")
+MANIFEST_PATH = os.path.join("results", "EventChunkGraphs", "manifest.json")
+FILE_RESULTS_DIR = os.path.join("results", "EventChunkGraphs", "FileResults")
+"""Per-file results kept so the combined figures can be rebuilt without processing unchanged files again"""
 
-def get_args() -> get_plotting_data.EventChunkConfig:
+BAR_TITLES = ["Off Events", "On Events", "Both Events", "Off Events Not", "On Events Not", "Both Events Not"]
+
+
+def get_args() -> Tuple[get_plotting_data.EventChunkConfig, argparse.Namespace]:
     parser = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter)
 
     required_args = parser.add_argument_group("required unless using a config file")
@@ -74,6 +93,10 @@ def get_args() -> get_plotting_data.EventChunkConfig:
         "--max_event_count", "-mc", type=int, default=sys.maxsize, help="The maximum event count to read from the file"
     )
 
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=0, help="Number of files processed at the same time (0 = all CPUs)"
+    )
+
     parser.add_argument(
         "--gaussian_min_y",
         "-gmin",
@@ -92,6 +115,16 @@ def get_args() -> get_plotting_data.EventChunkConfig:
         help="Maximum value on the gaussian y axis",
     )
 
+    flags.add_argument(
+        "--rebuild", action="store_true", help="Process every file again instead of only new or changed files"
+    )
+
+    flags.add_argument(
+        "--stream", action="store_true", help="Count raw event CSVs block by block instead of through an event store"
+    )
+
+    add_cache_args(parser)
+
     args = parser.parse_args()
 
     # Make sure the data folder exists
@@ -114,12 +147,17 @@ def get_args() -> get_plotting_data.EventChunkConfig:
             "--data_set_type/-d, --plot_constant/-pc, and --reconstruction_window/-rw"
         )
 
+    if args.jobs < 0:
+        parser.error(f"argument --jobs/-j: invalid value: {args.jobs} (must not be negative)")
+
+    check_cache_args(parser, args)
+
     if args.config:
         # Make sure the config file exists
         if not os.path.isfile(args.config):
             parser.error(f"argument --config/-c: provided file {args.config} does not exist")
 
-        return get_plotting_data.parseConfig(args.config, args.data_folder)
+        return get_plotting_data.parseConfig(args.config, args.data_folder), args
 
     # TODO: custom type like with gaussian min and max?
     if args.max_event_count <= 0:
@@ -127,7 +165,7 @@ def get_args() -> get_plotting_data.EventChunkConfig:
             f"argument --max_event_count/-mc: invalid value: {args.max_event_count} " "(must be greater than 0)"
         )
 
-    return get_plotting_data.EventChunkConfig(
+    config = get_plotting_data.EventChunkConfig(
         args.graph_type,
         args.data_folder,
         not args.show_figures,
@@ -143,6 +181,8 @@ def get_args() -> get_plotting_data.EventChunkConfig:
         args.gaussian_max_y,
     )
 
+    return config, args
+
 
 def clean_file_name(file_name: str, data_set_type: str) -> str:
     # Regex for name changes
@@ -194,8 +234,8 @@ def plot_bars(ax_var: np.ndarray, event_lists: List, labels: List, titles: List,
     for i in range(2):
         for j in range(3):
             ax_var[j][i].tick_params(axis="x", which="major", labelsize=10, labelrotation=35)
-            axesVar[j][i].bar(next(labels_iter), next(event_lists_iter), color=next(colors_iter))
-            axesVar[j][i].set_title(next(titles_iter) + title_extra)
+            ax_var[j][i].bar(next(labels_iter), next(event_lists_iter), color=next(colors_iter))
+            ax_var[j][i].set_title(next(titles_iter) + title_extra)
 
     return ax_var
 
@@ -273,83 +313,140 @@ class WaveformsNumbers:
         return [self.sine[i].both, self.square[i].both, self.burst[i].both, self.triangle[i].both]
 
 
-# Make results directory if it doesn't exist
-if not os.path.exists(os.path.join("results", "EventChunkGraphs")):
-    os.makedirs(os.path.join("results", "EventChunkGraphs"))
-    os.makedirs(os.path.join("results", "EventChunkGraphs", "Dots"))
-elif not os.path.exists(os.path.join("results", "EventChunkGraphs", "Dots")):
-    os.makedirs(os.path.join("results", "EventChunkGraphs", "Dots"))
-
-offFrequencies = []
-onFrequencies = []
-bothFrequencies = []
-
-offGuas = []
-offLabel = []
-
-onGuas = []
-onLabel = []
-
-bothGuas = []
-bothLabel = []
-
-saveFigures = True
-
-# Variance Arrays
-allOffVarPol: List[float] = []
-allOnVarPol: List[float] = []
-allBothVarPol: List[float] = []
-allOffVarNoPol: List[float] = []
-allOnVarNoPol: List[float] = []
-allBothVarNoPol: List[float] = []
-polLabels: List[float] = []
-noPolLabels: List[float] = []
-
-# FWHM Arrays
-allOffFWHMPol = []
-allOnFWHMPol = []
-allBothFWHMPol = []
-allOffFWHMNoPol = []
-allOnFWHMNoPol = []
-allBothFWHMNoPol = []
-
-waveforms = WaveformsLines()
-waveformsNoPolLines = WaveformsLines()
-waveformsPolVariance = WaveformsNumbers()
-waveformsNoPolVariance = WaveformsNumbers()
-waveformsFWHM = WaveformsNumbers()
-waveformsNoPolFWHM = WaveformsNumbers()
-
-config = get_args()
-
-# Get all csv files inside of the data folder
-csv_paths = glob.glob(os.path.join("data", config.dataFolder, "**/*.csv"), recursive=True)
-csv_paths = natsorted(csv_paths, alg=ns.IGNORECASE)
-
-for csv_path in csv_paths:
-    d: CsvData = get_plotting_data.read_aedat_csv(csv_path, config.reconstructionWindow, config.maxEventCount)
-
-    if config.logValues:
-        onAvg = np.array(d.y_on).mean()
-        offAvg = np.array(d.y_off).mean()
-        allAvg = np.array(d.y_all).mean()
-
-        y_zip = zip(d.y_on, d.y_off, d.y_all)
-        for i, (on_count, off_count, all_count) in enumerate(y_zip):
-            if on_count == 0:
-                d.y_on[i] = math.log10(onAvg)
-            else:
-                d.y_on[i] = math.log10(on_count)
+class OnOffBothCurves:
+    """Gaussian fitted to each event type"""
 
-            if off_count == 0:
-                d.y_off[i] = math.log10(offAvg)
-            else:
-                d.y_off[i] = math.log10(off_count)
+    on: GaussianFit
+    off: GaussianFit
+    both: GaussianFit
 
-            if all_count == 0:
-                d.y_all[i] = math.log10(allAvg)
-            else:
-                d.y_all[i] = math.log10(all_count)
+    def to_lines(self) -> OnOffBothLines:
+        lines = OnOffBothLines()
+        lines.on = matplotlib.lines.Line2D(self.on.x, self.on.y)
+        lines.off = matplotlib.lines.Line2D(self.off.x, self.off.y)
+        lines.both = matplotlib.lines.Line2D(self.both.x, self.both.y)
+
+        return lines
+
+
+class ChunkHistResult:
+    """Results of the per-file stage. Only holds plain data so it can be sent back from a worker process"""
+
+    csv_filename: str
+    """Cleaned file name used for labels and saved figures"""
+
+    gaussians: OnOffBothCurves
+    variance: Optional[OnOffBothFloat]
+    fwhm: Optional[OnOffBothFloat]
+    """FWHM or standard deviation depending on config.FWHMMultiplier"""
+
+    def __init__(
+        self,
+        csv_filename: str,
+        gaussians: OnOffBothCurves,
+        variance: Optional[OnOffBothFloat] = None,
+        fwhm: Optional[OnOffBothFloat] = None,
+    ):
+        self.csv_filename = csv_filename
+        self.gaussians = gaussians
+        self.variance = variance
+        self.fwhm = fwhm
+
+    def save(self, result_path: str):
+        arrays = {"csv_filename": np.array(self.csv_filename)}
+
+        for event_type in EVENT_TYPES:
+            fit: GaussianFit = getattr(self.gaussians, event_type)
+            arrays[f"{event_type}_mu_sigma"] = np.array([fit.mu, fit.sigma])
+            arrays[f"{event_type}_x"] = fit.x
+            arrays[f"{event_type}_y"] = fit.y
+
+        for name in ("variance", "fwhm"):
+            values: Optional[OnOffBothFloat] = getattr(self, name)
+            if values is not None:
+                arrays[name] = np.array([getattr(values, event_type) for event_type in EVENT_TYPES])
+
+        with open(result_path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @staticmethod
+    def load(result_path: str) -> "ChunkHistResult":
+        with np.load(result_path, allow_pickle=False) as arrays:
+            gaussians = OnOffBothCurves()
+            for event_type in EVENT_TYPES:
+                mu, sigma = arrays[f"{event_type}_mu_sigma"]
+                fit = GaussianFit(mu, sigma, arrays[f"{event_type}_x"], arrays[f"{event_type}_y"])
+                setattr(gaussians, event_type, fit)
+
+            result = ChunkHistResult(str(arrays["csv_filename"]), gaussians)
+
+            for name in ("variance", "fwhm"):
+                if name in arrays.files:
+                    values = OnOffBothFloat()
+                    for event_type, value in zip(EVENT_TYPES, arrays[name]):
+                        setattr(values, event_type, value)
+                    setattr(result, name, values)
+
+        return result
+
+
+def add_by_waveform(waveform_lists, csv_filename: str, value):
+    """Appends value to the list of the waveform found in csv_filename (WaveformsLines or WaveformsNumbers)"""
+    for waveform in ("sine", "square", "triangle", "burst"):
+        if waveform in csv_filename:
+            getattr(waveform_lists, waveform).append(value)
+            return
+
+
+def find_csv_paths(config: get_plotting_data.EventChunkConfig) -> List[str]:
+    # Get all csv files inside of the data folder
+    csv_paths = glob.glob(os.path.join("data", config.dataFolder, "**/*.csv"), recursive=True)
+    return natsorted(csv_paths, alg=ns.IGNORECASE)
+
+
+def make_results_dirs():
+    os.makedirs(os.path.join("results", "EventChunkGraphs", "Dots"), exist_ok=True)
+    os.makedirs(FILE_RESULTS_DIR, exist_ok=True)
+
+
+def dots_path(csv_filename: str) -> str:
+    return os.path.join("results", "EventChunkGraphs", "Dots", f"{csv_filename}Dots.png")
+
+
+def file_result_path(csv_path: str) -> str:
+    """Where the result of the per-file stage is kept. Named after the CSV path since cleaned file names can collide"""
+    path_hash = hashlib.sha256(os.path.abspath(csv_path).encode()).hexdigest()[:16]
+    return os.path.join(FILE_RESULTS_DIR, f"{path_hash}.npz")
+
+
+def manifest_params(config: get_plotting_data.EventChunkConfig) -> Dict[str, Any]:
+    """Settings that change the result of the per-file stage"""
+    return {
+        "reconstructionWindow": config.reconstructionWindow,
+        "maxEventCount": config.maxEventCount,
+        "logValues": config.logValues,
+        "FWHMMultiplier": config.FWHMMultiplier,
+        "plotVariance": config.plotVariance,
+        "plotFWHM": config.plotFWHM,
+        "dataSetType": config.dataSetType,
+    }
+
+
+def process_csv(
+    csv_path: str,
+    config: get_plotting_data.EventChunkConfig,
+    cache: Optional[ResultCache] = None,
+    stream: bool = False,
+) -> ChunkHistResult:
+    """Per-file stage: reads a CSV, fits the histograms and computes the variance/FWHM
+
+    The scatter and histogram figure of the file is saved to results/EventChunkGraphs/Dots when config.saveFigures is
+    set and left open otherwise. The counts read from the CSV are kept in cache when it is given. With stream, a raw
+    event CSV is counted one block at a time instead of through an event store.
+    """
+    d: CsvData = get_plotting_data.read_chunk_data(
+        csv_path, config.reconstructionWindow, config.maxEventCount, config.logValues, cache, stream
+    )
 
     # Strip path and extension from the csv file. Will be used to name/save figures
     csv_filename = os.path.basename(csv_path)
@@ -362,49 +459,10 @@ for csv_path in csv_paths:
     f.set_size_inches(15, 9.5)
     f.tight_layout()
 
-    lines = OnOffBothLines()
-
-    # Off events
-    current_line = plotting_helper.plot_hist(d.y_off, axes, 1, 0, "red", config.logValues)
-    current_line.remove()
-    offGuas.append(current_line)
-    lines.off = current_line
-
-    # On Events
-    current_line = plotting_helper.plot_hist(d.y_on, axes, 1, 1, "green", config.logValues)
-    current_line.remove()
-    onGuas.append(current_line)
-    lines.on = current_line
-
-    # On & Off Events
-    current_line = plotting_helper.plot_hist(d.y_all, axes, 1, 2, "blue", config.logValues)
-    current_line.remove()
-    bothGuas.append(current_line)
-    lines.both = current_line
-
-    if config.dataSetType == "waveformsAndFrequency":
-        if "NoPolarizer" in csv_filename:
-            if "sine" in csv_filename:
-                waveformsNoPolLines.sine.append(lines)
-            elif "square" in csv_filename:
-                waveformsNoPolLines.square.append(lines)
-            elif "triangle" in csv_filename:
-                waveformsNoPolLines.triangle.append(lines)
-            elif "burst" in csv_filename:
-                waveformsNoPolLines.burst.append(lines)
-        else:
-            if "sine" in csv_filename:
-                waveforms.sine.append(lines)
-            elif "square" in csv_filename:
-                waveforms.square.append(lines)
-            elif "triangle" in csv_filename:
-                waveforms.triangle.append(lines)
-            elif "burst" in csv_filename:
-                waveforms.burst.append(lines)
-
-    offLabel.append(csv_filename + " Off Events")
-    onLabel.append(csv_filename + " On Events")
-    bothLabel.append(csv_filename + " All Events")
+    gaussians = OnOffBothCurves()
+    gaussians.off = plotting_helper.hist_gaussian(d.y_off, axes, 1, 0, "red", config.logValues)
+    gaussians.on = plotting_helper.hist_gaussian(d.y_on, axes, 1, 1, "green", config.logValues)
+    gaussians.both = plotting_helper.hist_gaussian(d.y_all, axes, 1, 2, "blue", config.logValues)
 
     # Format & add data to scatter sub-plots
     axes[0][0].scatter(d.time_windows, d.y_off, c="red", picker=True, s=1)
@@ -415,302 +473,434 @@ for csv_path in csv_paths:
 
     plt.title(csv_filename + " All Events")
 
-    if "NoPolarizer" in csv_filename:
-        noPolLabels.append(csv_filename.replace("NoPolarizer", ""))
-    else:
-        polLabels.append(csv_filename)
+    result = ChunkHistResult(csv_filename, gaussians)
 
     if config.plotVariance:
-        onOffBoth = OnOffBothFloat()
-        onOffBoth.off = np.var(d.y_off)
-        onOffBoth.on = np.var(d.y_on)
-        onOffBoth.both = np.var(d.y_all)
-
-        if "NoPolarizer" in csv_filename:
-            if config.dataSetType == "waveformsAndFrequency":
-                if "sine" in csv_filename:
-                    waveformsNoPolVariance.sine.append(onOffBoth)
-                elif "square" in csv_filename:
-                    waveformsNoPolVariance.square.append(onOffBoth)
-                elif "triangle" in csv_filename:
-                    waveformsNoPolVariance.triangle.append(onOffBoth)
-                elif "burst" in csv_filename:
-                    waveformsNoPolVariance.burst.append(onOffBoth)
-            else:
-                allOffVarNoPol.append(np.var(d.y_off))
-                allOnVarNoPol.append(np.var(d.y_on))
-                allBothVarNoPol.append(np.var(d.y_all))
-        else:
-            if config.dataSetType == "waveformsAndFrequency":
-                if "sine" in csv_filename:
-                    waveformsPolVariance.sine.append(onOffBoth)
-                elif "square" in csv_filename:
-                    waveformsPolVariance.square.append(onOffBoth)
-                elif "triangle" in csv_filename:
-                    waveformsPolVariance.triangle.append(onOffBoth)
-                elif "burst" in csv_filename:
-                    waveformsPolVariance.burst.append(onOffBoth)
-            else:
-                allOffVarPol.append(np.var(d.y_off))
-                allOnVarPol.append(np.var(d.y_on))
-                allBothVarPol.append(np.var(d.y_all))
+        result.variance = OnOffBothFloat()
+        result.variance.off = np.var(d.y_off)
+        result.variance.on = np.var(d.y_on)
+        result.variance.both = np.var(d.y_all)
 
     if config.plotFWHM:
         # if FWHMmultiplier is 2.355 it will polt the FWHM
         # if is 1 it will plot the standard deviation
-        onOffBoth = OnOffBothFloat()
-        onOffBoth.off = config.FWHMMultiplier * np.std(d.y_off)
-        onOffBoth.on = config.FWHMMultiplier * np.std(d.y_on)
-        onOffBoth.both = config.FWHMMultiplier * np.std(d.y_all)
+        result.fwhm = OnOffBothFloat()
+        result.fwhm.off = config.FWHMMultiplier * np.std(d.y_off)
+        result.fwhm.on = config.FWHMMultiplier * np.std(d.y_on)
+        result.fwhm.both = config.FWHMMultiplier * np.std(d.y_all)
+
+    if config.saveFigures:
+        plt.savefig(dots_path(csv_filename))
+        plt.close()
+
+    return result
+
+
+def process_csvs(
+    csv_paths: List[str],
+    config: get_plotting_data.EventChunkConfig,
+    jobs: int = 0,
+    cache: Optional[ResultCache] = None,
+    stream: bool = False,
+) -> List[ChunkHistResult]:
+    """Runs the per-file stage on every CSV. Files are processed by a pool of jobs worker processes (0 = all CPUs)
+
+    Figures can only be shown from this process, so the files are processed here when config.saveFigures is not set.
+    """
+    jobs = min(jobs or os.cpu_count() or 1, len(csv_paths))
+    process = partial(process_csv, config=config, cache=cache, stream=stream)
+
+    if jobs <= 1 or not config.saveFigures:
+        return [process(csv_path) for csv_path in csv_paths]
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=matplotlib.use, initargs=("Agg",)) as executor:
+        if cache is None:
+            return list(executor.map(process, csv_paths))
+
+        results = []
+        for result, counters in executor.map(partial(call_counted, cache, process), csv_paths):
+            results.append(result)
+            cache.add_counters(counters)
+
+        return results
+
+
+def process_changed_csvs(
+    csv_paths: List[str],
+    config: get_plotting_data.EventChunkConfig,
+    manifest: RunManifest,
+    jobs: int = 0,
+    cache: Optional[ResultCache] = None,
+    stream: bool = False,
+) -> List[ChunkHistResult]:
+    """process_csvs, but only for the CSVs that are new or changed since they were recorded in manifest
+
+    The results of the other CSVs are loaded from the files saved by an earlier run. The manifest is updated and
+    saved, and entries of CSVs that no longer exist are removed.
+    """
+    params = manifest_params(config)
+    results: List[Optional[ChunkHistResult]] = [None] * len(csv_paths)
+    changed = []
+
+    for i, csv_path in enumerate(csv_paths):
+        if manifest.is_current(csv_path, params):
+            try:
+                results[i] = ChunkHistResult.load(manifest.artifacts(csv_path)["result"])
+                continue
+            except (OSError, ValueError, KeyError):
+                pass
+
+        changed.append(i)
+
+    print(f"Processing {len(changed)} new or changed of {len(csv_paths)} files")
+
+    changed_results = process_csvs([csv_paths[i] for i in changed], config, jobs, cache, stream)
+
+    for i, result in zip(changed, changed_results):
+        result_path = file_result_path(csv_paths[i])
+        result.save(result_path)
+        manifest.record(csv_paths[i], params, {"dots": dots_path(result.csv_filename), "result": result_path})
+        results[i] = result
+
+    manifest.prune(csv_paths)
+    manifest.save()
+
+    return [result for result in results if result is not None]
+
+
+def plot_summary(results: List[ChunkHistResult], config: get_plotting_data.EventChunkConfig):
+    """Reduce stage: plots the Gaussians, variance and FWHM of every file together"""
+    offGuas = []
+    offLabel = []
+
+    onGuas = []
+    onLabel = []
+
+    bothGuas = []
+    bothLabel = []
+
+    # Variance Arrays
+    allOffVarPol: List[float] = []
+    allOnVarPol: List[float] = []
+    allBothVarPol: List[float] = []
+    allOffVarNoPol: List[float] = []
+    allOnVarNoPol: List[float] = []
+    allBothVarNoPol: List[float] = []
+    polLabels: List[str] = []
+    noPolLabels: List[str] = []
+
+    # FWHM Arrays
+    allOffFWHMPol = []
+    allOnFWHMPol = []
+    allBothFWHMPol = []
+    allOffFWHMNoPol = []
+    allOnFWHMNoPol = []
+    allBothFWHMNoPol = []
+
+    waveforms = WaveformsLines()
+    waveformsNoPolLines = WaveformsLines()
+    waveformsPolVariance = WaveformsNumbers()
+    waveformsNoPolVariance = WaveformsNumbers()
+    waveformsFWHM = WaveformsNumbers()
+    waveformsNoPolFWHM = WaveformsNumbers()
+
+    for result in results:
+        csv_filename = result.csv_filename
+        no_polarizer = "NoPolarizer" in csv_filename
+
+        # The Gaussians of a file are shared between the figures below, just like the original lines were
+        lines = result.gaussians.to_lines()
+        offGuas.append(lines.off)
+        onGuas.append(lines.on)
+        bothGuas.append(lines.both)
+
+        if config.dataSetType == "waveformsAndFrequency":
+            add_by_waveform(waveformsNoPolLines if no_polarizer else waveforms, csv_filename, lines)
+
+        offLabel.append(csv_filename + " Off Events")
+        onLabel.append(csv_filename + " On Events")
+        bothLabel.append(csv_filename + " All Events")
+
+        if no_polarizer:
+            noPolLabels.append(csv_filename.replace("NoPolarizer", ""))
+        else:
+            polLabels.append(csv_filename)
 
-        if "NoPolarizer" in csv_filename:
+        if result.variance is not None:
             if config.dataSetType == "waveformsAndFrequency":
-                if "sine" in csv_filename:
-                    waveformsNoPolFWHM.sine.append(onOffBoth)
-                elif "square" in csv_filename:
-                    waveformsNoPolFWHM.square.append(onOffBoth)
-                elif "triangle" in csv_filename:
-                    waveformsNoPolFWHM.triangle.append(onOffBoth)
-                elif "burst" in csv_filename:
-                    waveformsNoPolFWHM.burst.append(onOffBoth)
+                add_by_waveform(
+                    waveformsNoPolVariance if no_polarizer else waveformsPolVariance, csv_filename, result.variance
+                )
+            elif no_polarizer:
+                allOffVarNoPol.append(result.variance.off)
+                allOnVarNoPol.append(result.variance.on)
+                allBothVarNoPol.append(result.variance.both)
             else:
-                allOffFWHMNoPol.append(config.FWHMMultiplier * np.std(d.y_off))
-                allOnFWHMNoPol.append(config.FWHMMultiplier * np.std(d.y_on))
-                allBothFWHMNoPol.append(config.FWHMMultiplier * np.std(d.y_all))
-        else:
+                allOffVarPol.append(result.variance.off)
+                allOnVarPol.append(result.variance.on)
+                allBothVarPol.append(result.variance.both)
+
+        if result.fwhm is not None:
             if config.dataSetType == "waveformsAndFrequency":
-                if "sine" in csv_filename:
-                    waveformsFWHM.sine.append(onOffBoth)
-                elif "square" in csv_filename:
-                    waveformsFWHM.square.append(onOffBoth)
-                elif "triangle" in csv_filename:
-                    waveformsFWHM.triangle.append(onOffBoth)
-                elif "burst" in csv_filename:
-                    waveformsFWHM.burst.append(onOffBoth)
+                add_by_waveform(waveformsNoPolFWHM if no_polarizer else waveformsFWHM, csv_filename, result.fwhm)
+            elif no_polarizer:
+                allOffFWHMNoPol.append(result.fwhm.off)
+                allOnFWHMNoPol.append(result.fwhm.on)
+                allBothFWHMNoPol.append(result.fwhm.both)
             else:
-                allOffFWHMPol.append(config.FWHMMultiplier * np.std(d.y_off))
-                allOnFWHMPol.append(config.FWHMMultiplier * np.std(d.y_on))
-                allBothFWHMPol.append(config.FWHMMultiplier * np.std(d.y_all))
+                allOffFWHMPol.append(result.fwhm.off)
+                allOnFWHMPol.append(result.fwhm.on)
+                allBothFWHMPol.append(result.fwhm.both)
 
-    if saveFigures:
-        plt.savefig(os.path.join("results", "EventChunkGraphs", "Dots", f"{csv_filename}Dots.png"))
-        plt.close()
+    if not config.saveFigures:
+        plt.show()
+
+    if config.dataSetType == "waveformsAndFrequency":
+        if config.plotConstant == "waveforms":
+            labels = ["Sine", "Square", "Burst", "Triangle"]
+            labelsNoPol = ["Sine NoPolarizer", "Square NoPolarizer", "Burst NoPolarizer", "Triangle NoPolarizer"]
+            speeds = ["200mV"]
 
+            for i, speed in enumerate(speeds):
+                f, axes = plt.subplots(nrows=3, ncols=2, sharex=False, sharey=False)
+                f.set_size_inches(10, 15)
 
-if not saveFigures:
-    plt.show()
+                offEvents = waveforms.waveform_off_events_to_list(i)
+                onEvents = waveforms.waveform_on_events_to_list(i)
+                bothEvents = waveforms.waveform_both_events_to_list(i)
 
-if config.dataSetType == "waveformsAndFrequency":
-    if config.plotConstant == "waveforms":
-        labels = ["Sine", "Square", "Burst", "Triangle"]
-        labelsNoPol = ["Sine NoPolarizer", "Square NoPolarizer", "Burst NoPolarizer", "Triangle NoPolarizer"]
-        speeds = ["200mV"]
+                # FIXME: crashes if no unpol data in folder (too bad!)
+                offEventsNoPol = waveformsNoPolLines.waveform_off_events_to_list(i)
+                onEventsNoPol = waveformsNoPolLines.waveform_on_events_to_list(i)
+                bothEventsNoPol = waveformsNoPolLines.waveform_both_events_to_list(i)
 
-        for i, speed in enumerate(speeds):
-            f, axes = plt.subplots(nrows=3, ncols=2, sharex=False, sharey=False)
-            f.set_size_inches(10, 15)
+                plotting_helper.showAllGuas(offEvents, labels, 0, f"Off Events {speed}", axes, config)
+                plotting_helper.showAllGuas(onEvents, labels, 1, f"On Events {speed}", axes, config)
+                plotting_helper.showAllGuas(bothEvents, labels, 2, f"Combined Events {speed}", axes, config)
 
-            offEvents = waveforms.waveform_off_events_to_list(i)
-            onEvents = waveforms.waveform_on_events_to_list(i)
-            bothEvents = waveforms.waveform_both_events_to_list(i)
+                plotting_helper.showAllGuas(offEventsNoPol, labelsNoPol, 0, f"Off Events {speed}", axes, config)
+                plotting_helper.showAllGuas(onEventsNoPol, labelsNoPol, 1, f"On Events {speed}", axes, config)
+                plotting_helper.showAllGuas(bothEventsNoPol, labelsNoPol, 2, f"Combined Events {speed}", axes, config)
 
-            # FIXME: crashes if no unpol data in folder (too bad!)
-            offEventsNoPol = waveformsNoPolLines.waveform_off_events_to_list(i)
-            onEventsNoPol = waveformsNoPolLines.waveform_on_events_to_list(i)
-            bothEventsNoPol = waveformsNoPolLines.waveform_both_events_to_list(i)
+                if config.saveFigures:
+                    plt.savefig(os.path.join("results", "EventChunkGraphs", f"showAllGuasWaveforms{speed}.png"))
+                    plt.close()
+                else:
+                    plt.show()
 
-            plotting_helper.showAllGuas(offEvents, labels, 0, f"Off Events {speed}", axes, config)
-            plotting_helper.showAllGuas(onEvents, labels, 1, f"On Events {speed}", axes, config)
-            plotting_helper.showAllGuas(bothEvents, labels, 2, f"Combined Events {speed}", axes, config)
+                f, axes = plt.subplots(nrows=3, ncols=2, sharex=False, sharey=False)
+                f.set_size_inches(10, 15)
 
-            plotting_helper.showAllGuas(offEventsNoPol, labelsNoPol, 0, f"Off Events {speed}", axes, config)
-            plotting_helper.showAllGuas(onEventsNoPol, labelsNoPol, 1, f"On Events {speed}", axes, config)
-            plotting_helper.showAllGuas(bothEventsNoPol, labelsNoPol, 2, f"Combined Events {speed}", axes, config)
+                plotting_helper.centerAllGuas(offEvents, 0, labels, "Off Events", axes, config)
+                plotting_helper.centerAllGuas(onEvents, 1, labels, "On Events", axes, config)
+                plotting_helper.centerAllGuas(bothEvents, 2, labels, "Both Events", axes, config)
 
-            if saveFigures:
-                plt.savefig(os.path.join("results", "EventChunkGraphs", f"showAllGuasWaveforms{speed}.png"))
-                plt.close()
-            else:
-                plt.show()
+                plotting_helper.centerAllGuas(offEventsNoPol, 0, labelsNoPol, "Off Events", axes, config)
+                plotting_helper.centerAllGuas(onEventsNoPol, 1, labelsNoPol, "On Events", axes, config)
+                plotting_helper.centerAllGuas(bothEventsNoPol, 2, labelsNoPol, "Both Events", axes, config)
 
+                if config.saveFigures:
+                    plt.savefig(os.path.join("results", "EventChunkGraphs", "CenterGaus.png"))
+                    plt.close()
+                else:
+                    plt.show()
+        else:
+            labels = ["200mV", "300mV", "400mV", "500mV"]
+            labelsNoPol = ["200mV NoPolarizer", "300mV NoPolarizer", "400mV NoPolarizer", "500mV NoPolarizer"]
             f, axes = plt.subplots(nrows=3, ncols=2, sharex=False, sharey=False)
             f.set_size_inches(10, 15)
 
-            plotting_helper.centerAllGuas(offEvents, 0, labels, "Off Events", axes, config)
-            plotting_helper.centerAllGuas(onEvents, 1, labels, "On Events", axes, config)
-            plotting_helper.centerAllGuas(bothEvents, 2, labels, "Both Events", axes, config)
+            offEvents = waveforms.single_motion_to_list("sine", "off")
+            onEvents = waveforms.single_motion_to_list("sine", "on")
+            bothEvents = waveforms.single_motion_to_list("sine", "both")
+
+            offEventsNoPol = waveformsNoPolLines.single_motion_to_list("sine", "off")
+            onEventsNoPol = waveformsNoPolLines.single_motion_to_list("sine", "on")
+            bothEventsNoPol = waveformsNoPolLines.single_motion_to_list("sine", "both")
 
-            plotting_helper.centerAllGuas(offEventsNoPol, 0, labelsNoPol, "Off Events", axes, config)
-            plotting_helper.centerAllGuas(onEventsNoPol, 1, labelsNoPol, "On Events", axes, config)
-            plotting_helper.centerAllGuas(bothEventsNoPol, 2, labelsNoPol, "Both Events", axes, config)
+            plotting_helper.showAllGuas(offEvents, labels, 0, "Off Events " + "Sine", axes, config)
+            plotting_helper.showAllGuas(onEvents, labels, 1, "On Events " + "Sine", axes, config)
+            plotting_helper.showAllGuas(bothEvents, labels, 2, "Combined Events " + "Sine", axes, config)
 
-            if saveFigures:
-                plt.savefig(os.path.join("results", "EventChunkGraphs", "CenterGaus.png"))
+            plotting_helper.showAllGuas(offEventsNoPol, labelsNoPol, 0, "Off Events " + "Sine", axes, config)
+            plotting_helper.showAllGuas(onEventsNoPol, labelsNoPol, 1, "On Events " + "Sine", axes, config)
+            plotting_helper.showAllGuas(bothEventsNoPol, labelsNoPol, 2, "Combined Events " + "Sine", axes, config)
+
+            if config.saveFigures:
+                plt.savefig(os.path.join("results", "EventChunkGraphs", "showAllGuasFrequencySine.png"))
                 plt.close()
             else:
                 plt.show()
     else:
-        labels = ["200mV", "300mV", "400mV", "500mV"]
-        labelsNoPol = ["200mV NoPolarizer", "300mV NoPolarizer", "400mV NoPolarizer", "500mV NoPolarizer"]
         f, axes = plt.subplots(nrows=3, ncols=2, sharex=False, sharey=False)
         f.set_size_inches(10, 15)
 
-        offEvents = waveforms.single_motion_to_list("sine", "off")
-        onEvents = waveforms.single_motion_to_list("sine", "on")
-        bothEvents = waveforms.single_motion_to_list("sine", "both")
-
-        offEventsNoPol = waveformsNoPolLines.single_motion_to_list("sine", "off")
-        onEventsNoPol = waveformsNoPolLines.single_motion_to_list("sine", "on")
-        bothEventsNoPol = waveformsNoPolLines.single_motion_to_list("sine", "both")
-
-        plotting_helper.showAllGuas(offEvents, labels, 0, "Off Events " + "Sine", axes, config)
-        plotting_helper.showAllGuas(onEvents, labels, 1, "On Events " + "Sine", axes, config)
-        plotting_helper.showAllGuas(bothEvents, labels, 2, "Combined Events " + "Sine", axes, config)
-
-        plotting_helper.showAllGuas(offEventsNoPol, labelsNoPol, 0, "Off Events " + "Sine", axes, config)
-        plotting_helper.showAllGuas(onEventsNoPol, labelsNoPol, 1, "On Events " + "Sine", axes, config)
-        plotting_helper.showAllGuas(bothEventsNoPol, labelsNoPol, 2, "Combined Events " + "Sine", axes, config)
+        plotting_helper.showAllGuas(offGuas, offLabel, 0, "Off Events", axes, config)
+        plotting_helper.showAllGuas(onGuas, onLabel, 1, "On Events", axes, config)
+        plotting_helper.showAllGuas(bothGuas, bothLabel, 2, "Both Events", axes, config)
 
-        if saveFigures:
-            plt.savefig(os.path.join("results", "EventChunkGraphs", "showAllGuasFrequencySine.png"))
+        if config.saveFigures:
+            plt.savefig(os.path.join("results", "EventChunkGraphs", "Gaus.png"))
             plt.close()
         else:
             plt.show()
-else:
-    f, axes = plt.subplots(nrows=3, ncols=2, sharex=False, sharey=False)
-    f.set_size_inches(10, 15)
 
-    plotting_helper.showAllGuas(offGuas, offLabel, 0, "Off Events", axes, config)
-    plotting_helper.showAllGuas(onGuas, onLabel, 1, "On Events", axes, config)
-    plotting_helper.showAllGuas(bothGuas, bothLabel, 2, "Both Events", axes, config)
-
-    if saveFigures:
-        plt.savefig(os.path.join("results", "EventChunkGraphs", "Gaus.png"))
-        plt.close()
-    else:
-        plt.show()
-
-    f, axes = plt.subplots(nrows=3, ncols=2, sharex=False, sharey=False)
-    f.set_size_inches(10, 15)
-
-    plotting_helper.centerAllGuas(offGuas, 0, offLabel, "Off Events", axes, config)
-    plotting_helper.centerAllGuas(onGuas, 1, onLabel, "On Events", axes, config)
-    plotting_helper.centerAllGuas(bothGuas, 2, bothLabel, "Both Events", axes, config)
+        f, axes = plt.subplots(nrows=3, ncols=2, sharex=False, sharey=False)
+        f.set_size_inches(10, 15)
 
-    if saveFigures:
-        plt.savefig(os.path.join("results", "EventChunkGraphs", "CenterGaus.png"))
-        plt.close()
-    else:
-        plt.show()
+        plotting_helper.centerAllGuas(offGuas, 0, offLabel, "Off Events", axes, config)
+        plotting_helper.centerAllGuas(onGuas, 1, onLabel, "On Events", axes, config)
+        plotting_helper.centerAllGuas(bothGuas, 2, bothLabel, "Both Events", axes, config)
 
-if config.plotVariance:
-    if config.dataSetType == "waveformsAndFrequency":
-        if config.plotConstant == "waveforms":
-            labels = ["Sine", "Square", "Burst", "Triangle"]
-            speeds = ["200mV"]
-            for i, speed in enumerate(speeds):
-                figureVar, axesVar = plt.subplots(nrows=3, ncols=2, sharex=False, sharey=False)
-                figureVar.set_size_inches(10, 15)
+        if config.saveFigures:
+            plt.savefig(os.path.join("results", "EventChunkGraphs", "CenterGaus.png"))
+            plt.close()
+        else:
+            plt.show()
 
-                offEventsPol: List[float] = waveformsPolVariance.waveform_off_to_list(i)
-                onEventsPol: List[float] = waveformsPolVariance.waveform_on_to_list(i)
-                bothEventsPol: List[float] = waveformsPolVariance.waveform_both_to_list(i)
+    if config.plotVariance:
+        if config.dataSetType == "waveformsAndFrequency":
+            if config.plotConstant == "waveforms":
+                labels = ["Sine", "Square", "Burst", "Triangle"]
+                speeds = ["200mV"]
+                for i, speed in enumerate(speeds):
+                    figureVar, axesVar = plt.subplots(nrows=3, ncols=2, sharex=False, sharey=False)
+                    figureVar.set_size_inches(10, 15)
+
+                    offEventsPol: List[float] = waveformsPolVariance.waveform_off_to_list(i)
+                    onEventsPol: List[float] = waveformsPolVariance.waveform_on_to_list(i)
+                    bothEventsPol: List[float] = waveformsPolVariance.waveform_both_to_list(i)
+
+                    offEventsNoPol: List[float] = waveformsNoPolVariance.waveform_off_to_list(i)
+                    onEventsNoPol: List[float] = waveformsNoPolVariance.waveform_on_to_list(i)
+                    bothEventsNoPol: List[float] = waveformsNoPolVariance.waveform_both_to_list(i)
+
+                    using_log_values = "Log" if config.logValues else ""
+
+                    axesVar = plot_bars(
+                        axesVar,
+                        [offEventsPol, onEventsPol, bothEventsPol, offEventsNoPol, onEventsNoPol, bothEventsNoPol],
+                        [labels],
+                        BAR_TITLES,
+                        f" Polarized Variance {speed} {using_log_values}",
+                    )
+
+                    plt.subplots_adjust(left=0.125, bottom=0.1, right=0.91, top=0.9, wspace=0.3, hspace=0.4)
+
+                    if config.saveFigures:
+                        plt.savefig(os.path.join("results", "EventChunkGraphs", f"variance {speed}.png"))
+                        plt.close()
+                    else:
+                        plt.show()
+        else:
+            figureVar, axesVar = plt.subplots(nrows=3, ncols=2, sharex=False, sharey=False)
+            figureVar.set_size_inches(10, 15)
 
-                offEventsNoPol: List[float] = waveformsNoPolVariance.waveform_off_to_list(i)
-                onEventsNoPol: List[float] = waveformsNoPolVariance.waveform_on_to_list(i)
-                bothEventsNoPol: List[float] = waveformsNoPolVariance.waveform_both_to_list(i)
+            using_log_values = "Log" if config.logValues else ""
 
-                using_log_values = "Log" if config.logValues else ""
+            axesVar = plot_bars(
+                axesVar,
+                [allOffVarPol, allOnVarPol, allBothVarPol, allOffVarNoPol, allOnVarNoPol, allBothVarNoPol],
+                [polLabels, noPolLabels],
+                BAR_TITLES,
+                f" Polarized Variance {using_log_values}",
+            )
 
-                axesVar = plot_bars(
-                    axesVar,
-                    [offEventsPol, onEventsPol, bothEventsPol, offEventsNoPol, onEventsNoPol, bothEventsNoPol],
-                    [labels],
-                    ["Off Events", "On Events", "Both Events", "Off Events Not", "On Events Not", "Both Events Not"],
-                    f" Polarized Variance {speed} {using_log_values}",
-                )
+            plt.subplots_adjust(left=0.125, bottom=0.1, right=0.91, top=0.9, wspace=0.3, hspace=0.4)
 
-                plt.subplots_adjust(left=0.125, bottom=0.1, right=0.91, top=0.9, wspace=0.3, hspace=0.4)
+            if config.saveFigures:
+                plt.savefig(os.path.join("results", "EventChunkGraphs", "variance.png"))
+                plt.close()
+            else:
+                plt.show()
 
-                if saveFigures:
-                    plt.savefig(os.path.join("results", "EventChunkGraphs", f"variance {speed}.png"))
-                    plt.close()
-                else:
-                    plt.show()
-    else:
+    if config.plotFWHM:
         figureVar, axesVar = plt.subplots(nrows=3, ncols=2, sharex=False, sharey=False)
         figureVar.set_size_inches(10, 15)
 
-        using_log_values = "Log" if config.logValues else ""
-
-        axesVar = plot_bars(
-            axesVar,
-            [allOffVarPol, allOnVarPol, allBothVarPol, allOffVarNoPol, allOnVarNoPol, allBothVarNoPol],
-            [polLabels, noPolLabels],
-            ["Off Events", "On Events", "Both Events", "Off Events Not", "On Events Not", "Both Events Not"],
-            f" Polarized Variance {using_log_values}",
+        logOrStandardDeviation = ("FWHM" if config.FWHMMultiplier == 2.355 else "Standard Deviation") + (
+            " Log" if config.logValues else ""
         )
 
-        plt.subplots_adjust(left=0.125, bottom=0.1, right=0.91, top=0.9, wspace=0.3, hspace=0.4)
-
-        if saveFigures:
-            plt.savefig(os.path.join("results", "EventChunkGraphs", "variance.png"))
-            plt.close()
+        if config.dataSetType == "waveformsAndFrequency":
+            if config.plotConstant == "waveforms":
+                speeds = ["200mV"]
+                for i, speed in enumerate(speeds):
+                    labels = ["Sine", "Square", "Burst", "Triangle"]
+                    offEventsPol: List[float] = waveformsFWHM.waveform_off_to_list(i)
+                    onEventsPol: List[float] = waveformsFWHM.waveform_on_to_list(i)
+                    bothEventsPol: List[float] = waveformsFWHM.waveform_both_to_list(i)
+
+                    offEventsNoPol: List[float] = waveformsNoPolFWHM.waveform_off_to_list(i)
+                    onEventsNoPol: List[float] = waveformsNoPolFWHM.waveform_on_to_list(i)
+                    bothEventsNoPol: List[float] = waveformsNoPolFWHM.waveform_both_to_list(i)
+
+                    axesVar = plot_bars(
+                        axesVar,
+                        [offEventsPol, onEventsPol, bothEventsPol, offEventsNoPol, onEventsNoPol, bothEventsNoPol],
+                        [labels],
+                        BAR_TITLES,
+                        f" Polarized {logOrStandardDeviation}",
+                    )
+
+                    plt.subplots_adjust(left=0.125, bottom=0.1, right=0.91, top=0.9, wspace=0.3, hspace=0.4)
+
+                    if config.saveFigures:
+                        plt.savefig(os.path.join("results", "EventChunkGraphs", f"{logOrStandardDeviation}{speed}.png"))
+                        plt.close()
+                    else:
+                        plt.show()
         else:
-            plt.show()
+            axesVar = plot_bars(
+                axesVar,
+                [allOffFWHMPol, allOnFWHMPol, allBothFWHMPol, allOffFWHMNoPol, allOnFWHMNoPol, allBothFWHMNoPol],
+                [polLabels, noPolLabels],
+                BAR_TITLES,
+                f" Polarized {logOrStandardDeviation}",
+            )
+
+            plt.subplots_adjust(left=0.125, bottom=0.1, right=0.91, top=0.9, wspace=0.3, hspace=0.4)
+
+            if config.saveFigures:
+                plt.savefig(os.path.join("results", "EventChunkGraphs", f"{logOrStandardDeviation}.png"))
+                plt.close()
+            else:
+                plt.show()
 
-if config.plotFWHM:
-    figureVar, axesVar = plt.subplots(nrows=3, ncols=2, sharex=False, sharey=False)
-    figureVar.set_size_inches(10, 15)
 
-    logOrStandardDeviation = ("FWHM" if config.FWHMMultiplier == 2.355 else "Standard Deviation") + (
-        " Log" if config.logValues else ""
-    )
+def run(
+    config: get_plotting_data.EventChunkConfig,
+    jobs: int = 0,
+    cache: Optional[ResultCache] = None,
+    rebuild: bool = False,
+    stream: bool = False,
+) -> List[ChunkHistResult]:
+    """Runs the per-file stage on every CSV in the data folder, then plots the combined figures
+
+    When the figures are saved, only the CSVs that changed since the last run are processed unless rebuild is set.
+    Shown figures are always created from scratch.
+    """
+    make_results_dirs()
+    csv_paths = find_csv_paths(config)
+
+    if config.saveFigures:
+        manifest = RunManifest(MANIFEST_PATH) if rebuild else RunManifest.load(MANIFEST_PATH)
+        results = process_changed_csvs(csv_paths, config, manifest, jobs, cache, stream)
+    else:
+        results = process_csvs(csv_paths, config, jobs, cache, stream)
+    plot_summary(results, config)
 
-    if config.dataSetType == "waveformsAndFrequency":
-        if config.plotConstant == "waveforms":
-            speeds = ["200mV"]
-            for i, speed in enumerate(speeds):
-                labels = ["Sine", "Square", "Burst", "Triangle"]
-                offEventsPol: List[float] = waveformsFWHM.waveform_off_to_list(i)
-                onEventsPol: List[float] = waveformsFWHM.waveform_on_to_list(i)
-                bothEventsPol: List[float] = waveformsFWHM.waveform_both_to_list(i)
-
-                offEventsNoPol: List[float] = waveformsNoPolFWHM.waveform_off_to_list(i)
-                onEventsNoPol: List[float] = waveformsNoPolFWHM.waveform_on_to_list(i)
-                bothEventsNoPol: List[float] = waveformsNoPolFWHM.waveform_both_to_list(i)
-
-                axesVar = plot_bars(
-                    axesVar,
-                    [offEventsPol, onEventsPol, bothEventsPol, offEventsNoPol, onEventsNoPol, bothEventsNoPol],
-                    [labels],
-                    ["Off Events", "On Events", "Both Events", "Off Events Not", "On Events Not", "Both Events Not"],
-                    f" Polarized {logOrStandardDeviation}",
-                )
+    return results
 
-                plt.subplots_adjust(left=0.125, bottom=0.1, right=0.91, top=0.9, wspace=0.3, hspace=0.4)
 
-                if saveFigures:
-                    plt.savefig(os.path.join("results", "EventChunkGraphs", f"{logOrStandardDeviation}{speed}.png"))
-                    plt.close()
-                else:
-                    plt.show()
-    else:
-        axesVar = plot_bars(
-            axesVar,
-            [allOffFWHMPol, allOnFWHMPol, allBothFWHMPol, allOffFWHMNoPol, allOnFWHMNoPol, allBothFWHMNoPol],
-            [polLabels, noPolLabels],
-            ["Off Events", "On Events", "Both Events", "Off Events Not", "On Events Not", "Both Events Not"],
-            f" Polarized {logOrStandardDeviation}",
-        )
+if __name__ == "__main__":
+    config, args = get_args()
+    cache = cache_from_args(args)
 
-        plt.subplots_adjust(left=0.125, bottom=0.1, right=0.91, top=0.9, wspace=0.3, hspace=0.4)
+    run(config, args.jobs, cache, args.rebuild, args.stream)
 
-        if saveFigures:
-            plt.savefig(os.path.join("results", "EventChunkGraphs", f"{logOrStandardDeviation}.png"))
-            plt.close()
-        else:
-            plt.show()
+    if cache is not None:
+        print(format_counters(cache))
 
-if not saveFigures:
-    input()
+    if not config.saveFigures:
+        input()
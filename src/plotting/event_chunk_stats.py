@@ -0,0 +1,165 @@
+"""
+Headless version of event_chunk_graph_hist.py that only computes the stats.
+
+Writes the Gaussian mu/sigma, variance and FWHM of every event chunk CSV in a folder to a CSV or JSON table keyed by
+the metadata in the file names. No figures are created and matplotlib is never imported.
+
+Example: python src/plotting/event_chunk_stats.py data/waveforms -rw 500 -o results/waveform_stats.json
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import List, Optional, Tuple
+
+from natsort import natsorted, ns
+
+import plotting_utils.get_plotting_data as get_plotting_data
+from plotting_utils.chunk_stats import ChunkStats, write_stats
+from plotting_utils.result_cache import (
+    ResultCache,
+    add_cache_args,
+    cache_from_args,
+    call_counted,
+    check_cache_args,
+    format_counters,
+)
+
+
+def get_args() -> Tuple[get_plotting_data.EventChunkConfig, argparse.Namespace]:
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument("data_folder", type=str, help="Directory containing event chunk CSVs")
+
+    parser.add_argument("--config", "-c", type=str, help="Path to a config file")
+
+    parser.add_argument(
+        "--reconstruction_window", "-rw", type=int, help="The reconstruction window used to generate the csv files (µs)"
+    )
+
+    parser.add_argument("--log_values", "-l", action="store_true", help="Takes the log of all values")
+
+    parser.add_argument(
+        "--fwhm_multiplier",
+        "-fm",
+        type=float,
+        default=2.355,
+        help="Used to change FHWM(2.355) to standard deviation(1)",
+    )
+
+    parser.add_argument(
+        "--max_event_count", "-mc", type=int, default=sys.maxsize, help="The maximum event count to read from the file"
+    )
+
+    parser.add_argument(
+        "--output",
+        "-o",
+        type=str,
+        default=os.path.join("results", "EventChunkGraphs", "stats.csv"),
+        help="File to write the stats to (.csv or .json)",
+    )
+
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=0, help="Number of files processed at the same time (0 = all CPUs)"
+    )
+
+    parser.add_argument(
+        "--stream", action="store_true", help="Count raw event CSVs block by block instead of through an event store"
+    )
+
+    add_cache_args(parser)
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.data_folder):
+        parser.error(f'argument data_folder: provided directory "{args.data_folder}" does not exist')
+
+    if os.path.splitext(args.output)[1].lower() not in (".csv", ".json"):
+        parser.error(f"argument --output/-o: {args.output} must be a .csv or .json file")
+
+    if args.jobs < 0:
+        parser.error(f"argument --jobs/-j: invalid value: {args.jobs} (must not be negative)")
+
+    check_cache_args(parser, args)
+
+    if args.config and (args.reconstruction_window or args.log_values):
+        parser.error("the argument --config/-c conflicts with --reconstruction_window/-rw and --log_values/-l")
+
+    if args.config:
+        if not os.path.isfile(args.config):
+            parser.error(f"argument --config/-c: provided file {args.config} does not exist")
+
+        return get_plotting_data.parseConfig(args.config, args.data_folder), args
+
+    if args.reconstruction_window is None:
+        parser.error("the following arguments are required: --reconstruction_window/-rw")
+
+    if args.max_event_count <= 0:
+        parser.error(f"argument --max_event_count/-mc: invalid value: {args.max_event_count} (must be greater than 0)")
+
+    config = get_plotting_data.EventChunkConfig(
+        data_folder=args.data_folder,
+        fwhm_multiplier=args.fwhm_multiplier,
+        log_values=args.log_values,
+        max_event_count=args.max_event_count,
+        reconstruction_window=args.reconstruction_window,
+    )
+
+    return config, args
+
+
+def compute_stats(
+    data_folder: str,
+    config: get_plotting_data.EventChunkConfig,
+    jobs: int = 0,
+    cache: Optional[ResultCache] = None,
+    stream: bool = False,
+) -> List[ChunkStats]:
+    """Computes the stats of every CSV in data_folder, using a pool of jobs worker processes (0 = all CPUs)
+
+    The counts read from the CSVs are kept in cache when it is given, so only new or changed files are read again.
+    With stream, raw event CSVs are counted one block at a time so only their counts are kept in memory.
+    """
+    csv_paths = natsorted(glob.glob(os.path.join(data_folder, "**", "*.csv"), recursive=True), alg=ns.IGNORECASE)
+    jobs = min(jobs or os.cpu_count() or 1, len(csv_paths))
+
+    from_csv = partial(ChunkStats.from_csv, config=config, data_folder=data_folder, cache=cache, stream=stream)
+
+    if jobs <= 1:
+        return [from_csv(csv_path) for csv_path in csv_paths]
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        if cache is None:
+            return list(executor.map(from_csv, csv_paths))
+
+        stats = []
+        for chunk_stats, counters in executor.map(partial(call_counted, cache, from_csv), csv_paths):
+            stats.append(chunk_stats)
+            cache.add_counters(counters)
+
+        return stats
+
+
+if __name__ == "__main__":
+    config, args = get_args()
+
+    cache = cache_from_args(args)
+
+    start = time.perf_counter()
+    stats = compute_stats(args.data_folder, config, args.jobs, cache, args.stream)
+
+    if not stats:
+        sys.exit(f"No csv files found in '{args.data_folder}'")
+
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    write_stats(stats, args.output)
+    print(f"Wrote the stats of {len(stats)} files to {args.output} in {time.perf_counter() - start:.2f}s")
+
+    if cache is not None:
+        print(format_counters(cache))
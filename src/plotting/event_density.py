@@ -1,8 +1,9 @@
-import csv
-from itertools import islice
+import numpy as np
 import matplotlib
 import matplotlib.pyplot as plt
-from plotting_utils import filename_regex
+from typing import Iterable, Tuple
+from plotting_utils import event_windows, filename_regex
+from plotting_utils.get_plotting_data import DataStorage, SpatialCsvData
 import argparse
 import os
 import sys
@@ -16,10 +17,11 @@ max_plot_points = float("inf")
 
 csv_filename = ""
 save_directory = ""
+stream = False
 
 
 def get_args():
-    global pixel_x, pixel_y, area_size, max_plot_points, csv_filename, save_directory
+    global pixel_x, pixel_y, area_size, max_plot_points, csv_filename, save_directory, stream
 
     parser = argparse.ArgumentParser()
     parser.add_argument("aedat_csv_file", help="CSV with AEDAT data to plot", type=str)
@@ -29,6 +31,9 @@ def get_args():
     parser.add_argument("--area_size", "-a", help="size of box around pixel to observe", type=int, required=True)
     parser.add_argument("--max_plot_points", "-m", help="max number of points to plot", type=int)
     parser.add_argument("--save_directory", "-d", help="Save file to directory", type=str)
+    parser.add_argument(
+        "--stream", action="store_true", help="Read the CSV block by block instead of through an event store"
+    )
 
     args = parser.parse_args()
 
@@ -53,51 +58,87 @@ def get_args():
         quit("area_size was negative, it should be positive integer")
     if args.max_plot_points is not None and args.max_plot_points > 0:
         max_plot_points = args.max_plot_points
-
-
-if __name__ == "__main__":
-    get_args()
-    matplotlib.use("Qt5Agg")
-
-    last_pixel_state = None
-    redundancies = 0  # TODO: do redundancies for all pixels
-    reset_pixel = True
-
-    change_timestamps = []  # The times when the pixel changed state
-    time_between = []  # The times between the state changes
-
-    with open(csv_filename) as csv_file:
-        csv_reader = csv.reader(csv_file, delimiter=",")
-
-        for row in islice(csv_reader, 1, None):  # Skip the header
-            x_row = int(row[1])
-            y_row = int(row[2])
-
-            check_x = abs(x_row - pixel_x)
-            check_y = abs(y_row - pixel_y)
-
-            if check_x < area_size and check_y < area_size:
-                pixel_state = (row[0] == "True") or (row[0] == "1")
-
-                if pixel_state != last_pixel_state:
-                    reset_pixel = False
-                    last_pixel_state = pixel_state
-                    change_timestamps.append(float(row[3]))
-                    if len(change_timestamps) > max_plot_points:
-                        print(redundancies, "broken")
-
-                        break
-                else:
-                    redundancies += 1
+    stream = args.stream
+
+
+def find_state_changes(
+    area_blocks: Iterable[SpatialCsvData], max_plot_points: float = float("inf")
+) -> Tuple[np.ndarray, int]:
+    """Finds when the area changes state, one block of its events at a time
+
+    The area changes state whenever an event's polarity differs from the previous event in the area. Only the changes
+    are kept, so the blocks can be streamed from a recording of any length.
+
+    Args:
+        area_blocks (Iterable[SpatialCsvData]): Events of the area in file order
+        max_plot_points (float, optional): Stop at the change that goes over this many, like reading row by row would
+
+    Returns:
+        Tuple[np.ndarray, int]: Timestamps of the state changes and the number of events that did not change the state
+    """
+    change_timestamps = []
+    n_changes = 0
+    n_events = 0
+    previous_state = None
+
+    for events in area_blocks:
+        pixel_states = events.polarities
+        if len(pixel_states) == 0:
+            continue
+
+        state_changed = np.empty(len(pixel_states), dtype=bool)
+        state_changed[0] = pixel_states[0] != previous_state
+        state_changed[1:] = pixel_states[1:] != pixel_states[:-1]
+        change_indices = np.flatnonzero(state_changed)
+
+        if n_changes + len(change_indices) > max_plot_points:
+            change_indices = change_indices[: int(max_plot_points) + 1 - n_changes]
+            change_timestamps.append(events.timestamps[change_indices])
+            n_changes += len(change_indices)
+            redundancies = n_events + int(change_indices[-1]) + 1 - n_changes  # TODO: do redundancies for all pixels
+            print(redundancies, "broken")
+
+            return np.concatenate(change_timestamps), redundancies
+
+        change_timestamps.append(events.timestamps[change_indices])
+        n_changes += len(change_indices)
+        n_events += len(pixel_states)
+        previous_state = pixel_states[-1]
+
+    if len(change_timestamps) == 0:
+        return np.empty(0, dtype=np.int64), 0
+
+    return np.concatenate(change_timestamps), n_events - n_changes
+
+
+def plot_event_density(
+    csv_filename: str,
+    pixel_x: int,
+    pixel_y: int,
+    area_size: int,
+    max_plot_points: float = float("inf"),
+    save_directory: str = "",
+    stream: bool = False,
+):
+    plt.figure()
+
+    # This plot uses the Y coordinates as they appear in the CSV, which are flipped in the event store
+    area = (pixel_x, 128 - pixel_y, area_size)
+    if stream:
+        area_blocks = event_windows.iter_area_events(csv_filename, *area)
+    else:
+        area_blocks = [SpatialCsvData.from_event_store(csv_filename, DataStorage.BOOL, area=area)]
+
+    change_timestamps, redundancies = find_state_changes(area_blocks, max_plot_points)
 
     print(f"Redundancies: {redundancies}")
 
-    # Normalize timestamps & convert to mS
-    change_timestamps = [(x - change_timestamps[0]) / 1000 for x in change_timestamps]
+    # The times when the pixel changed state. Normalize timestamps & convert to mS
+    if len(change_timestamps) > 0:
+        change_timestamps = (change_timestamps - change_timestamps[0]) / 1000
 
     # Get the time between timestamps
-    for i in range(len(change_timestamps) - 1):
-        time_between.append(change_timestamps[i + 1] - change_timestamps[i])
+    time_between = np.diff(change_timestamps)
 
     # Add lines to plot
     for stamp in change_timestamps:
@@ -122,3 +163,12 @@ if __name__ == "__main__":
 
     if len(time_between) != 0:
         print(f"Average time between: {round(sum(time_between) / len(time_between), 2)}mS")
+
+    plt.close()
+
+
+if __name__ == "__main__":
+    get_args()
+    matplotlib.use("Qt5Agg")
+
+    plot_event_density(csv_filename, pixel_x, pixel_y, area_size, max_plot_points, save_directory, stream)
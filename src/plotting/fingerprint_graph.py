@@ -17,15 +17,18 @@ from matplotlib.ticker import ScalarFormatter
 import plotting_utils.get_plotting_data as get_plotting_data
 from plotting_utils.get_plotting_data import CsvData
 from plotting_utils import filename_regex
+from plotting_utils.result_cache import ResultCache, add_cache_args, cache_from_args, check_cache_args
 
 file_to_plot = ""
 x_lim: Optional[int] = None
 reconstruction_window = 0
 save_directory = ""
+cache: Optional[ResultCache] = None
+stream = False
 
 
 def get_args():
-    global file_to_plot, x_lim, reconstruction_window, save_directory
+    global file_to_plot, x_lim, reconstruction_window, save_directory, cache, stream
 
     parser = argparse.ArgumentParser()
     parser.add_argument("aedat_csv_file", help="CSV containing AEDAT data to be plotted", type=str)
@@ -36,7 +39,13 @@ def get_args():
     )
     parser.add_argument("--plot_xlim", "-x", help="Limit on the X-axis (seconds)", type=float)
     parser.add_argument("--save_directory", "-d", help="Save file to directory", type=str)
+    parser.add_argument(
+        "--stream", action="store_true", help="Count a raw event CSV block by block instead of through an event store"
+    )
+    add_cache_args(parser)
     args = parser.parse_args()
+    check_cache_args(parser, args)
+    cache = cache_from_args(args)
 
     if args.save_directory is not None:
         if not os.path.exists(args.save_directory):
@@ -56,21 +65,33 @@ def get_args():
     if x_lim is not None and x_lim <= 0:
         sys.exit("The argument --plot_xlim/-x must be greater than 0")
 
-    if args.reconstruction_window.isdigit() and args.reconstruction_window != "0":
-        reconstruction_window = int(args.reconstruction_window)
+    reconstruction_window = parse_reconstruction_window(args.reconstruction_window)
+    stream = args.stream
 
-    else:
-        if args.reconstruction_window.lstrip("-").isdigit():
-            sys.exit("The argument reconstruction window must be greater than 0")
 
-        if os.path.exists(args.reconstruction_window) and args.reconstruction_window.endswith(".json"):
-            config = get_plotting_data.parseConfig(args.reconstruction_window)
-            reconstruction_window = config.reconstructionWindow
-        else:
-            sys.exit(f"The path {args.reconstruction_window} does not point to a json file")
+def parse_reconstruction_window(reconstruction_window_arg: str) -> int:
+    """Gets the reconstruction window from an int or the path to a config file"""
+    if reconstruction_window_arg.isdigit() and reconstruction_window_arg != "0":
+        return int(reconstruction_window_arg)
 
+    if reconstruction_window_arg.lstrip("-").isdigit():
+        sys.exit("The argument reconstruction window must be greater than 0")
 
-def plot_event_count(event_counts: list, t: list, line_color: str, max_plot_entries_x: Optional[int], plot_title: str):
+    if os.path.exists(reconstruction_window_arg) and reconstruction_window_arg.endswith(".json"):
+        config = get_plotting_data.parseConfig(reconstruction_window_arg)
+        return config.reconstructionWindow
+    else:
+        sys.exit(f"The path {reconstruction_window_arg} does not point to a json file")
+
+
+def plot_event_count(
+    event_counts: list,
+    t: list,
+    line_color: str,
+    max_plot_entries_x: Optional[float],
+    plot_title: str,
+    save_directory: str = "",
+):
     plt.clf()
 
     plt.title(plot_title)
@@ -99,7 +120,7 @@ def plot_event_count(event_counts: list, t: list, line_color: str, max_plot_entr
     # Plot lines with circles on the points
     plt.plot(t, event_counts, "-o", markersize=4, c=line_color)
 
-    if x_lim is not None:
+    if max_plot_entries_x is not None:
         ax.set_xlim([0, max_plot_entries_x])
 
     plt.gcf().set_size_inches((20, 5))
@@ -107,10 +128,14 @@ def plot_event_count(event_counts: list, t: list, line_color: str, max_plot_entr
     plt.savefig(os.path.join(save_directory, f'{plot_title.replace(" ", "_")}.png'))
 
 
-if __name__ == "__main__":
-    get_args()
-    matplotlib.use("Qt5Agg")
-
+def plot_fingerprint(
+    file_to_plot: str,
+    reconstruction_window: int,
+    x_lim: Optional[float] = None,
+    save_directory: str = "",
+    cache: Optional[ResultCache] = None,
+    stream: bool = False,
+):
     file_name = os.path.basename(file_to_plot)
 
     hz = filename_regex.parse_frequency(file_name, "Hz ")
@@ -123,7 +148,9 @@ if __name__ == "__main__":
 
     max_csv_entries = (x_lim * 1000000) // reconstruction_window if x_lim is not None else -1
 
-    plot_data: CsvData = get_plotting_data.read_aedat_csv(file_to_plot, reconstruction_window, max_csv_entries)
+    plot_data: CsvData = get_plotting_data.read_chunk_data(
+        file_to_plot, reconstruction_window, max_csv_entries, cache=cache, stream=stream
+    )
 
     plot_event_count(
         plot_data.y_off,
@@ -132,6 +159,7 @@ if __name__ == "__main__":
         x_lim,
         f"{waveform_type}{voltage}{hz}{degrees}"
         f" OFF Events Fingerprint ({reconstruction_window}μs Reconstruction Window)",
+        save_directory,
     )
     plot_event_count(
         plot_data.y_on,
@@ -140,6 +168,7 @@ if __name__ == "__main__":
         x_lim,
         f"{waveform_type}{voltage}{hz}{degrees}"
         f"ON Events Fingerprint ({reconstruction_window}μs Reconstruction Window)",
+        save_directory,
     )
     plot_event_count(
         plot_data.y_all,
@@ -148,4 +177,13 @@ if __name__ == "__main__":
         x_lim,
         f"{waveform_type}{voltage}{hz}{degrees}"
         f"All Events Fingerprint ({reconstruction_window}μs Reconstruction Window)",
+        save_directory,
     )
+    plt.close()
+
+
+if __name__ == "__main__":
+    get_args()
+    matplotlib.use("Qt5Agg")
+
+    plot_fingerprint(file_to_plot, reconstruction_window, x_lim, save_directory, cache, stream)
@@ -15,10 +15,11 @@ num_clusters = 6
 max_time = -1
 save_directory = ""
 skip_rows = 0
+workers = 1
 
 
 def get_args():
-    global file_to_plot, num_clusters, max_time, save_directory, skip_rows
+    global file_to_plot, num_clusters, max_time, save_directory, skip_rows, workers
 
     parser = argparse.ArgumentParser()
 
@@ -29,6 +30,9 @@ def get_args():
     parser.add_argument("--skip_rows", "-s", help="Skips N rows of the input CSV", action="store", type=int)
     parser.add_argument("--max_time", "-t", help="Max time in microseconds", type=float)
     parser.add_argument("--save_directory", "-d", help="Save file to directory", type=str)
+    parser.add_argument(
+        "--workers", "-w", help="Number of processes used to read the CSV (0 = all CPUs)", type=int, default=1
+    )
 
     args = parser.parse_args()
 
@@ -62,6 +66,12 @@ def get_args():
         parser.print_help()
         sys.exit("Error: Max time argument is required")
 
+    if args.workers < 0:
+        parser.print_help()
+        sys.exit("Error: --workers cannot be negative")
+    else:
+        workers = args.workers
+
     file_to_plot = args.aedat_csv_file
 
 
@@ -69,10 +79,12 @@ if __name__ == "__main__":
     get_args()
     matplotlib.use("Qt5Agg")
 
-    data = get_plotting_data.SpatialCsvData.from_csv(file_to_plot, DataStorage.NONE, max_time, skip_rows)
+    data = get_plotting_data.SpatialCsvData.from_event_store(
+        file_to_plot, DataStorage.NONE, max_time, skip_rows, workers
+    )
 
     # Transform X and Y positions into the correct format for this plot -> [[X,Y], [X,Y], ...]
-    plot_points = np.asarray(list(zip(data.x_positions, data.y_positions)))
+    plot_points = np.column_stack((data.x_positions, data.y_positions))
 
     model = SpectralClustering(
         n_clusters=num_clusters, assign_labels="cluster_qr", affinity="rbf", eigen_solver="lobpcg"
@@ -5,40 +5,48 @@ X Axis: Time
 
 CSV Format: on/off,x,y,timestamp
 """
-import csv
 import math
 import sys
 import argparse
 import os
-import itertools
 import re
-from typing import List
+from typing import Optional
+import numpy as np
 import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mticker
-from plotting_utils.plotting_helper import check_aedat_csv_format
-from plotting_utils import filename_regex
+from plotting_utils import event_windows, filename_regex
+from plotting_utils.get_plotting_data import DataStorage, SpatialCsvData
 
 file_to_plot = ""
 time_limit = math.inf
+start_time = 0.0
 use_global_area = False
 manual_title = None
 pixel_x = -1
 pixel_y = -1
 area_size = -1
 save_directory = ""
+stream = False
 
 
 def get_args():
-    global file_to_plot, pixel_x, pixel_y, area_size, time_limit, manual_title, use_global_area, save_directory
+    global file_to_plot, pixel_x, pixel_y, area_size, time_limit, start_time, manual_title, use_global_area
+    global save_directory, stream
 
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "aedat_csv_file", help="CSV containing AEDAT data to be plotted (ON/OFF,x,y,timestamp)", type=str
     )
     parser.add_argument("--time_limit", "-t", type=float, help="Time limit for the X-axis (seconds)")
+    parser.add_argument(
+        "--start_time", "-s", type=float, default=0.0, help="Skip events before this point in the recording (seconds)"
+    )
     parser.add_argument("--title", type=str, help="Manually set plot title. Title will be auto-generated if not set")
     parser.add_argument("--save_directory", "-d", help="Save file to directory", type=str)
+    parser.add_argument(
+        "--stream", action="store_true", help="Read the CSV block by block instead of through an event store"
+    )
 
     local_area_args = parser.add_argument_group("Local area arguments")
     local_area_args.add_argument("--pixel_x", "-x", help="X coordinate of the pixel to examine", type=int)
@@ -65,6 +73,10 @@ def get_args():
     if args.time_limit is not None:
         time_limit = args.time_limit
 
+    if args.start_time < 0:
+        sys.exit("Error: --start_time cannot be negative")
+    start_time = args.start_time
+
     if args.title is not None:
         manual_title = args.title
 
@@ -81,66 +93,44 @@ def get_args():
     pixel_y = args.pixel_y
     area_size = args.area_size
     use_global_area = args.global_area
+    stream = args.stream
 
 
 def get_activity_area(
-    csv_file, pixel_x: int, pixel_y: int, area_size: int, max_points: int = sys.maxsize, time_limit: float = math.inf
-):
-    points: List[List[int]] = []
-    first_timestamp = 0
-
-    with open(csv_file, "r", encoding="utf-8") as csvfile:
-        reader = csv.reader(csvfile, delimiter=",")
-
-        header = next(reader, None)  # Grab the header
-        if header is None:
-            raise ValueError(f"Error: File '{csv_file}' seems to be empty")
-
-        # Strip whitespace from header if there is any
-        header = [x.strip(" ") for x in header]
-
-        if not check_aedat_csv_format(header, ["On/Off", "X", "Y", "Timestamp"]):
-            sys.exit(
-                f"File {csv_file} is not of the correct format.\n"
-                "A csv containing X, Y, and Timestamp columns is required."
-            )
-
-        polarity_index = header.index("On/Off")
-        x_index = header.index("X")
-        y_index = header.index("Y")
-        timestamp_index = header.index("Timestamp")
-
-        first_row = next(reader, None)
-        if first_row is None:
-            raise ValueError(f"Error: File '{csv_file}' has a header but contains no data")
-
-        first_timestamp = int(first_row[timestamp_index])
-
-        if time_limit != math.inf:
-            time_limit = time_limit * 1000000  # Convert to microseconds
-
-        for row in itertools.chain([first_row], reader):
-            x_pos = int(row[x_index])
-            y_pos = 128 - int(row[y_index])
-
-            timestamp = int(row[3]) - first_timestamp
-            if timestamp > time_limit:
-                return points
-
-            check_x = abs(x_pos - pixel_x)
-            check_y = abs(y_pos - pixel_y)
-
-            # Check if this event is inside the specified area
-            if check_x < area_size and check_y < area_size:
-                if row[polarity_index] in ["1", "True"]:
-                    points.append([1, timestamp])
-                else:
-                    points.append([-1, timestamp])
-
-                if len(points) == max_points:
-                    return points
+    csv_file,
+    pixel_x: int,
+    pixel_y: int,
+    area_size: int,
+    max_points: int = sys.maxsize,
+    time_limit: float = math.inf,
+    start_time: float = 0,
+    stream: bool = False,
+) -> np.ndarray:
+    """Finds the events inside of a square area around a pixel
+
+    With stream the CSV is read one block at a time, so only the area's events are kept in memory.
+
+    Returns:
+        np.ndarray: One [polarity, timestamp] row per event where polarity is 1 for ON events and -1 for OFF events
+    """
+    time_limit = time_limit if time_limit != math.inf else sys.maxsize
+
+    if stream:
+        blocks = list(
+            event_windows.iter_area_events(csv_file, pixel_x, pixel_y, area_size, time_limit, start_time=start_time)
+        )
+        events = SpatialCsvData(
+            np.concatenate([block.polarities for block in blocks]),
+            np.concatenate([block.x_positions for block in blocks]),
+            np.concatenate([block.y_positions for block in blocks]),
+            np.concatenate([block.timestamps for block in blocks]),
+        )
+    else:
+        events = SpatialCsvData.from_event_store(
+            csv_file, DataStorage.BOOL, time_limit, start_time=start_time, area=(pixel_x, pixel_y, area_size)
+        )
 
-    return points
+    return np.column_stack((np.where(events.polarities[:max_points], 1, -1), events.timestamps[:max_points]))
 
 
 def auto_generate_title(file_name: str) -> str:
@@ -157,16 +147,28 @@ def auto_generate_title(file_name: str) -> str:
     return auto_title
 
 
-if __name__ == "__main__":
-    get_args()
-    matplotlib.use("Qt5Agg")
-
-    file_path = file_to_plot
+def plot_spikes(
+    file_path: str,
+    pixel_x: int,
+    pixel_y: int,
+    area_size: int,
+    use_global_area: bool = False,
+    time_limit: float = math.inf,
+    start_time: float = 0,
+    manual_title: Optional[str] = None,
+    save_directory: str = "",
+    stream: bool = False,
+):
+    plt.figure()
 
     if use_global_area:
-        plot_points = get_activity_area(file_to_plot, 999, 999, 9999, time_limit=time_limit)
+        plot_points = get_activity_area(
+            file_path, 999, 999, 9999, time_limit=time_limit, start_time=start_time, stream=stream
+        )
     else:
-        plot_points = get_activity_area(file_path, pixel_x, pixel_y, area_size, time_limit=time_limit)
+        plot_points = get_activity_area(
+            file_path, pixel_x, pixel_y, area_size, time_limit=time_limit, start_time=start_time, stream=stream
+        )
 
     # Add lines to plot
     for point in plot_points:
@@ -210,3 +212,22 @@ if __name__ == "__main__":
         plot_file_name = f"spike_Plot-{file_name}_X-{pixel_x}_Y-{pixel_y}_Area-{area_size}.png"
 
     plt.savefig(os.path.join(save_directory, plot_file_name), bbox_inches="tight", pad_inches=0.1)
+    plt.close()
+
+
+if __name__ == "__main__":
+    get_args()
+    matplotlib.use("Qt5Agg")
+
+    plot_spikes(
+        file_to_plot,
+        pixel_x,
+        pixel_y,
+        area_size,
+        use_global_area,
+        time_limit,
+        start_time,
+        manual_title,
+        save_directory,
+        stream,
+    )
@@ -0,0 +1,177 @@
+"""
+Summary statistics of event chunk CSVs without plotting them.
+
+For every recording the mean and standard deviation of the Gaussian fitted to the Off, On and All event counts are
+computed, along with the variance and FWHM event_chunk_graph_hist.py plots. Rows are keyed by the metadata parsed from
+the file name so a folder of recordings can be compared in a spreadsheet or a regression script. Nothing in this
+module imports matplotlib.
+"""
+import csv
+import json
+import math
+import os
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from plotting_utils import filename_regex
+import plotting_utils.get_plotting_data as get_plotting_data
+from plotting_utils.result_cache import ResultCache
+
+EVENT_TYPES = ("off", "on", "all")
+STAT_NAMES = ("mu", "sigma", "variance", "fwhm")
+
+METADATA_FIELDS = ["waveform", "frequency_hz", "voltage_v", "degrees", "slots", "threshold", "polarizer"]
+STATS_FIELDS = (
+    ["file"]
+    + METADATA_FIELDS
+    + ["windows"]
+    + [f"{event_type}_{stat}" for event_type in EVENT_TYPES for stat in STAT_NAMES]
+)
+"""Columns of the stats table, in order"""
+
+
+def parse_file_metadata(file_path: str) -> Dict[str, Any]:
+    """Parses the recording settings in a file path
+
+    Each setting is looked for in the file name first, then in the folders it is in (closest first).
+
+    Returns:
+        Dict[str, Any]: An entry for every name in METADATA_FIELDS. Settings that are not found are None
+    """
+    parts = os.path.normpath(os.path.splitext(file_path)[0]).split(os.sep)[::-1]
+    parsers: Dict[str, Tuple[Callable[[str], str], Callable[[str], Any]]] = {
+        "waveform": (filename_regex.parse_waveform, str.lower),
+        "frequency_hz": (filename_regex.parse_frequency, int),
+        "voltage_v": (filename_regex.parse_voltage, float),
+        "degrees": (filename_regex.parse_degrees, int),
+        "slots": (filename_regex.parse_slots, int),
+        "threshold": (filename_regex.parse_threshold, int),
+    }
+
+    metadata: Dict[str, Any] = {}
+    for field, (parse, convert) in parsers.items():
+        value = next((value for value in map(parse, parts) if value), "")
+        metadata[field] = convert(value) if value else None
+
+    metadata["polarizer"] = not any("nopol" in part.lower().replace(" ", "") for part in parts)
+
+    return metadata
+
+
+def count_stats(counts: np.ndarray, fwhm_multiplier: float = 2.355) -> Dict[str, float]:
+    """Fits a Gaussian to event counts
+
+    Args:
+        counts (np.ndarray): Event count (or log count) of each time window
+        fwhm_multiplier (float, optional): 2.355 for the FWHM or 1 for the standard deviation
+
+    Returns:
+        Dict[str, float]: The maximum likelihood mu and sigma of the Gaussian (the same as scipy.stats.norm.fit), the
+                          variance of the counts and the FWHM. NaN for every entry if there are no counts
+    """
+    if len(counts) == 0:
+        return {stat: math.nan for stat in STAT_NAMES}
+
+    counts = np.asarray(counts, dtype=np.float64)
+    mu = counts.mean()
+    variance = np.mean(np.square(counts - mu))
+    sigma = math.sqrt(variance)
+
+    return {"mu": float(mu), "sigma": sigma, "variance": float(variance), "fwhm": fwhm_multiplier * sigma}
+
+
+class ChunkStats:
+    """Stats of one event chunk CSV"""
+
+    file: str
+    """Path of the CSV relative to the data folder"""
+
+    metadata: Dict[str, Any]
+    windows: int
+    """Number of time windows the stats were computed from"""
+
+    stats: Dict[str, Dict[str, float]]
+    """Output of count_stats for each entry in EVENT_TYPES"""
+
+    def __init__(self, file: str, metadata: Dict[str, Any], windows: int, stats: Dict[str, Dict[str, float]]):
+        self.file = file
+        self.metadata = metadata
+        self.windows = windows
+        self.stats = stats
+
+    def to_row(self) -> Dict[str, Any]:
+        """Flattens the stats into a row with the STATS_FIELDS columns"""
+        row: Dict[str, Any] = {"file": self.file, **self.metadata, "windows": self.windows}
+
+        for event_type in EVENT_TYPES:
+            for stat in STAT_NAMES:
+                row[f"{event_type}_{stat}"] = self.stats[event_type][stat]
+
+        return row
+
+    @staticmethod
+    def from_csv(
+        csv_path: str,
+        config: get_plotting_data.EventChunkConfig,
+        data_folder: Optional[str] = None,
+        cache: Optional[ResultCache] = None,
+        stream: bool = False,
+    ) -> "ChunkStats":
+        """Reads an event chunk CSV and computes its stats
+
+        Uses the reconstructionWindow, maxEventCount, logValues and FWHMMultiplier settings of config, the same as
+        event_chunk_graph_hist.py does.
+
+        Args:
+            csv_path (str): Path to the CSV file
+            config (get_plotting_data.EventChunkConfig): Settings the CSVs are read with
+            data_folder (Optional[str], optional): Folder the stored file path is relative to. Defaults to the folder
+                                                   the CSV is in
+            cache (Optional[ResultCache], optional): Cache for the counts read from the CSV
+            stream (bool, optional): Count raw event CSVs one block at a time instead of through an event store
+        """
+        d = get_plotting_data.read_chunk_data(
+            csv_path, config.reconstructionWindow, config.maxEventCount, config.logValues, cache, stream
+        )
+
+        file = os.path.relpath(csv_path, data_folder or os.path.dirname(csv_path))
+        stats = {
+            "off": count_stats(d.y_off, config.FWHMMultiplier),
+            "on": count_stats(d.y_on, config.FWHMMultiplier),
+            "all": count_stats(d.y_all, config.FWHMMultiplier),
+        }
+
+        return ChunkStats(file, parse_file_metadata(file), len(d.y_all), stats)
+
+
+def write_stats_csv(stats: List[ChunkStats], csv_path: str):
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=STATS_FIELDS)
+        writer.writeheader()
+        writer.writerows(chunk_stats.to_row() for chunk_stats in stats)
+
+
+def write_stats_json(stats: List[ChunkStats], json_path: str):
+    rows = [chunk_stats.to_row() for chunk_stats in stats]
+
+    # JSON has no NaN. Stats of empty files are written as null
+    for row in rows:
+        for field, value in row.items():
+            if isinstance(value, float) and math.isnan(value):
+                row[field] = None
+
+    with open(json_path, "w") as f:
+        json.dump(rows, f, indent=2)
+
+
+def write_stats(stats: List[ChunkStats], output_path: str):
+    """Writes the stats table as CSV or JSON depending on the extension of output_path"""
+    extension = os.path.splitext(output_path)[1].lower()
+
+    if extension == ".csv":
+        write_stats_csv(stats, output_path)
+    elif extension == ".json":
+        write_stats_json(stats, output_path)
+    else:
+        raise ValueError(f"Unknown stats file type '{extension}'. Expected .csv or .json")
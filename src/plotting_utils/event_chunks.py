@@ -0,0 +1,147 @@
+"""
+Event chunk counting: the number of ON, OFF and all events in each reconstruction window of a recording.
+
+These are the same counts the AEDAT file readers write to event chunk CSVs, computed directly from the events so any
+reconstruction window can be used without generating a CSV for it first.
+"""
+import math
+from typing import Dict, Iterable
+
+import numpy as np
+
+MAX_BASE_WINDOW_RATIO = 8
+"""Windows are counted separately when the shared base window is this many times smaller than the smallest window"""
+
+
+def merge_windows(counts: np.ndarray, factor: int) -> np.ndarray:
+    """Sums every factor consecutive rows of a count array
+
+    Args:
+        counts (np.ndarray): (N, ...) counts per window
+        factor (int): Number of windows merged into one
+
+    Returns:
+        np.ndarray: (ceil(N / factor), ...) counts. The last row is the sum of the remaining rows when N is not a
+                    multiple of factor
+    """
+    if factor < 1:
+        raise ValueError(f"Windows can not be merged by a factor of {factor}")
+
+    if factor == 1 or len(counts) == 0:
+        return np.array(counts)
+
+    return np.add.reduceat(counts, np.arange(0, len(counts), factor), axis=0)
+
+
+def count_window(polarities: np.ndarray, timestamps: np.ndarray, time_window: int) -> np.ndarray:
+    """Counts the events in each time window
+
+    Args:
+        polarities (np.ndarray): bool polarity of each event (True for ON)
+        timestamps (np.ndarray): Non-negative timestamps in microseconds. Windows start at 0
+        time_window (int): Window size in microseconds
+
+    Returns:
+        np.ndarray: (number of windows, 3) int64 array of ON, OFF and all event counts
+    """
+    if len(timestamps) == 0:
+        return np.empty((0, 3), dtype=np.int64)
+
+    window_indices = timestamps // time_window
+    n_windows = int(window_indices.max()) + 1
+
+    all_counts = np.bincount(window_indices, minlength=n_windows)
+    on_counts = np.bincount(window_indices[polarities], minlength=n_windows)
+
+    return np.column_stack((on_counts, all_counts - on_counts, all_counts)).astype(np.int64)
+
+
+def count_windows(polarities: np.ndarray, timestamps: np.ndarray, time_windows: Iterable[int]) -> Dict[int, np.ndarray]:
+    """Counts the events in each time window for several window sizes at once
+
+    The events are binned once with the greatest common divisor of the window sizes and each window size is built by
+    merging those bins. Sizes without a useful common divisor are binned separately.
+
+    Args:
+        polarities (np.ndarray): bool polarity of each event (True for ON)
+        timestamps (np.ndarray): Non-negative timestamps in microseconds. Windows start at 0
+        time_windows (Iterable[int]): Window sizes in microseconds
+
+    Returns:
+        Dict[int, np.ndarray]: (number of windows, 3) arrays of ON, OFF and all event counts for each window size
+    """
+    time_windows = sorted({int(time_window) for time_window in time_windows})
+
+    if len(time_windows) == 0:
+        return {}
+
+    if time_windows[0] <= 0:
+        raise ValueError("Time windows must be positive")
+
+    base_window = math.gcd(*time_windows)
+    if time_windows[0] // base_window > MAX_BASE_WINDOW_RATIO:
+        return {time_window: count_window(polarities, timestamps, time_window) for time_window in time_windows}
+
+    base_counts = count_window(polarities, timestamps, base_window)
+
+    return {time_window: merge_windows(base_counts, time_window // base_window) for time_window in time_windows}
+
+
+def count_row_blocks(row_blocks: Iterable[np.ndarray], time_windows: Iterable[int]) -> Dict[int, np.ndarray]:
+    """count_windows over a recording that is given one block of rows at a time
+
+    Only the running counts are kept, never the events of the whole recording. Windows start at the timestamp of the
+    first row.
+
+    Args:
+        row_blocks (Iterable[np.ndarray]): (N, 4) int64 On/Off,X,Y,Timestamp arrays in file order, as returned by
+                                           event_csv.parse_event_rows. ON events have a polarity of 1. No timestamp
+                                           may be earlier than the first one
+        time_windows (Iterable[int]): Window sizes in microseconds
+
+    Returns:
+        Dict[int, np.ndarray]: (number of windows, 3) arrays of ON, OFF and all event counts for each window size
+    """
+    time_windows = sorted({int(time_window) for time_window in time_windows})
+
+    if len(time_windows) > 0 and time_windows[0] <= 0:
+        raise ValueError("Time windows must be positive")
+
+    # Grown by doubling so adding a block does not copy all the earlier counts. Only the first n_windows rows are used
+    totals = {time_window: np.zeros((0, 3), dtype=np.int64) for time_window in time_windows}
+    n_windows = {time_window: 0 for time_window in time_windows}
+    first_timestamp = None
+
+    for rows in row_blocks:
+        if len(rows) == 0:
+            continue
+
+        if first_timestamp is None:
+            first_timestamp = rows[0, 3]
+
+        timestamps = rows[:, 3] - first_timestamp
+        polarities = rows[:, 0] == 1
+        start_time = int(timestamps.min())
+
+        # A negative offset would index the totals from the end. count_windows raises a ValueError for these events too
+        if start_time < 0:
+            raise ValueError(
+                f"Timestamps are not sorted: an event at {first_timestamp + start_time}μs comes before the first event "
+                f"at {first_timestamp}μs"
+            )
+
+        for time_window in time_windows:
+            # Counting from the block's first window keeps the counts as long as the block, not the recording so far
+            offset = start_time // time_window
+            counts = count_window(polarities, timestamps - offset * time_window, time_window)
+            end = offset + len(counts)
+
+            total = totals[time_window]
+            if end > len(total):
+                total = np.concatenate((total, np.zeros((max(end, 2 * len(total)) - len(total), 3), dtype=np.int64)))
+                totals[time_window] = total
+
+            total[offset:end] += counts
+            n_windows[time_window] = max(n_windows[time_window], end)
+
+    return {time_window: totals[time_window][: n_windows[time_window]].copy() for time_window in time_windows}
@@ -0,0 +1,142 @@
+"""
+Vectorized parsing for the CSV files produced by the AEDAT file readers.
+
+Rows are parsed a block of bytes at a time with NumPy instead of going through csv.reader and int() per field.
+"""
+import os
+import warnings
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+EVENT_CSV_HEADER = ["On/Off", "X", "Y", "Timestamp"]
+
+READ_BLOCK_SIZE = 1 << 24  # Number of bytes read per block (16 MiB). Blocks are extended to the next newline
+RANGE_SIZE = 1 << 26  # Target number of bytes handed to each worker when parsing in parallel (64 MiB)
+
+
+def read_csv_header(csv_file: str) -> Tuple[List[str], int]:
+    """Reads the header line of a CSV file
+
+    Args:
+        csv_file (str): Path to the CSV file
+
+    Returns:
+        Tuple[List[str], int]: The header entries and the byte offset of the first data row
+    """
+    with open(csv_file, "rb") as f:
+        header_line = f.readline()
+        return header_line.decode("utf-8").rstrip("\r\n").split(","), f.tell()
+
+
+def parse_int_rows(data: bytes, n_columns: int) -> np.ndarray:
+    """Parses newline separated rows of comma separated integers
+
+    Args:
+        data (bytes): Complete rows of CSV data (no header)
+        n_columns (int): Number of columns in each row
+
+    Returns:
+        np.ndarray: int64 array with shape (number of rows, n_columns)
+    """
+    data = data.strip().replace(b"\r", b"").replace(b"\n", b",")
+
+    if not data:
+        return np.empty((0, n_columns), dtype=np.int64)
+
+    with warnings.catch_warnings():
+        # NumPy only warns and returns the values read so far when it hits something that is not an integer
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            values = np.fromstring(data, dtype=np.int64, sep=",")
+        except (DeprecationWarning, ValueError):
+            raise ValueError("CSV contains rows that are not comma separated integers")
+
+    if values.size % n_columns != 0:
+        raise ValueError(f"CSV contains rows that do not have {n_columns} columns")
+
+    return values.reshape(-1, n_columns)
+
+
+def parse_event_rows(data: bytes) -> np.ndarray:
+    """Parses On/Off,X,Y,Timestamp rows. The polarity column may be 1/-1, 1/0 or True/False
+
+    Returns:
+        np.ndarray: int64 array with shape (number of rows, 4). ON events have a polarity of 1
+    """
+    return parse_int_rows(data.replace(b"True", b"1").replace(b"False", b"0"), len(EVENT_CSV_HEADER))
+
+
+def iter_row_blocks(csv_file: str, start: int, end: int = -1, block_size: int = 0) -> Iterator[bytes]:
+    """Reads a CSV file in blocks that always end on a row boundary
+
+    Args:
+        csv_file (str): Path to the CSV file
+        start (int): Byte offset of the first row to read. Must be the start of a row
+        end (int, optional): Byte offset to stop reading at. Must be the start of a row or -1 for the end of the file
+        block_size (int, optional): Approximate size of each block. Defaults to READ_BLOCK_SIZE
+
+    Yields:
+        bytes: Complete rows of CSV data
+    """
+    block_size = block_size if block_size > 0 else READ_BLOCK_SIZE
+
+    with open(csv_file, "rb") as f:
+        f.seek(start)
+        position = start
+
+        while end < 0 or position < end:
+            block = f.read(block_size if end < 0 else min(block_size, end - position))
+            if not block:
+                break
+
+            # Finish the row that the block ends in
+            if not block.endswith(b"\n"):
+                block += f.readline()
+
+            position += len(block)
+            yield block
+
+
+def split_row_ranges(csv_file: str, start: int, n_ranges: int) -> List[Tuple[int, int]]:
+    """Splits the rows of a CSV file into byte ranges that start and end on row boundaries
+
+    Args:
+        csv_file (str): Path to the CSV file
+        start (int): Byte offset of the first data row
+        n_ranges (int): Number of ranges to split the file into. Fewer ranges are returned for small files
+
+    Returns:
+        List[Tuple[int, int]]: (start, end) byte offsets in file order
+    """
+    file_size = os.path.getsize(csv_file)
+    boundaries = [start]
+
+    with open(csv_file, "rb") as f:
+        for i in range(1, n_ranges):
+            target = start + (file_size - start) * i // n_ranges
+            if target <= boundaries[-1]:
+                continue
+
+            # Move the boundary forward to the start of the next row (target itself if a row already starts there)
+            f.seek(target - 1)
+            f.readline()
+            boundary = f.tell()
+
+            if boundary < file_size and boundary > boundaries[-1]:
+                boundaries.append(boundary)
+
+    boundaries.append(file_size)
+
+    return [(range_start, range_end) for range_start, range_end in zip(boundaries, boundaries[1:])]
+
+
+def parse_event_range(csv_file: str, start: int, end: int) -> np.ndarray:
+    """Parses the On/Off,X,Y,Timestamp rows in a byte range produced by split_row_ranges
+
+    Returns:
+        np.ndarray: int64 array with shape (number of rows, 4)
+    """
+    row_blocks = [parse_event_rows(block) for block in iter_row_blocks(csv_file, start, end)]
+
+    return np.concatenate(row_blocks) if row_blocks else np.empty((0, len(EVENT_CSV_HEADER)), dtype=np.int64)
@@ -0,0 +1,153 @@
+"""
+Accumulates the events of a recording into 128x128 frames.
+
+Each frame covers one time window and holds three images of the sensor: the number of events at each pixel, the sum of
+their polarities (+1 for ON, -1 for OFF) and the timestamp of the latest event. Frames are built straight from the
+event columns, so the image processing algorithms can run on every window of a recording without exporting PNGs first.
+
+Frames are indexed [row, column] with row = Y and column = X as they appear in the CSV.
+"""
+from typing import Iterator, Optional
+
+import numpy as np
+
+from plotting_utils import event_windows
+from plotting_utils.get_plotting_data import SpatialCsvData
+
+FRAME_SIZE = 128
+"""Width and height of the DVS128 sensor"""
+
+FRAME_KINDS = ("counts", "polarity", "time_surface")
+"""Images that EventFrame.image can build"""
+
+
+class EventFrame:
+    """Events of one time window accumulated per pixel"""
+
+    index: int
+    """Position of the window in the recording, starting at 0"""
+
+    start_time: int
+    end_time: int
+    """Time span of the window (microseconds relative to the first event of the recording, end exclusive)"""
+
+    counts: np.ndarray
+    """(FRAME_SIZE, FRAME_SIZE) int32 number of events at each pixel"""
+
+    polarity_sum: np.ndarray
+    """(FRAME_SIZE, FRAME_SIZE) int32 number of ON minus OFF events at each pixel"""
+
+    last_timestamp: np.ndarray
+    """(FRAME_SIZE, FRAME_SIZE) int64 timestamp of the latest event at each pixel. -1 where there was no event"""
+
+    def __init__(
+        self,
+        index: int,
+        start_time: int,
+        end_time: int,
+        counts: np.ndarray,
+        polarity_sum: np.ndarray,
+        last_timestamp: np.ndarray,
+    ):
+        self.index = index
+        self.start_time = start_time
+        self.end_time = end_time
+        self.counts = counts
+        self.polarity_sum = polarity_sum
+        self.last_timestamp = last_timestamp
+
+    def image(self, kind: str = "counts") -> np.ndarray:
+        """Converts one of the frame's arrays to an 8-bit image
+
+        The image has three identical channels, the same layout cv2.imread returns for a grayscale PNG, so it can be
+        passed to the image processing algorithms in place of an exported image.
+
+        Args:
+            kind (str, optional): "counts" scales the event counts to 0-255. "polarity" maps the polarity sums to 0-255
+                                  with 128 for pixels without a net change. "time_surface" maps the latest timestamps
+                                  from the start to the end of the window to 1-255, 0 for pixels without events
+
+        Returns:
+            np.ndarray: (FRAME_SIZE, FRAME_SIZE, 3) uint8 image
+        """
+        if kind == "counts":
+            gray = scale_to_byte(self.counts, max(int(self.counts.max()), 1))
+        elif kind == "polarity":
+            largest = max(int(np.abs(self.polarity_sum).max()), 1)
+            gray = 128 + (self.polarity_sum.astype(np.int64) * 127) // largest
+        elif kind == "time_surface":
+            # Events at the start of the window map to 1 and the last possible timestamp to 255. Rounding down would
+            # map the early events of a long window to 0, the same as pixels without events
+            duration = max(self.end_time - self.start_time, 1)
+            elapsed = np.clip(self.last_timestamp - self.start_time, 0, duration - 1)
+            gray = np.where(self.last_timestamp >= 0, 1 + (elapsed * 254) // max(duration - 1, 1), 0)
+        else:
+            raise ValueError(f"Unknown frame kind '{kind}'. Should be one of {', '.join(FRAME_KINDS)}")
+
+        return np.repeat(gray.astype(np.uint8)[:, :, np.newaxis], 3, axis=2)
+
+
+def scale_to_byte(values: np.ndarray, maximum: int) -> np.ndarray:
+    """Linearly maps 0-maximum to 0-255, clipping values above maximum"""
+    return (np.minimum(values, maximum).astype(np.int64) * 255) // maximum
+
+
+def accumulate_frame(
+    events: SpatialCsvData, index: int = 0, start_time: int = 0, end_time: Optional[int] = None
+) -> EventFrame:
+    """Accumulates events into a frame
+
+    Args:
+        events (SpatialCsvData): Events in timestamp order with y_positions flipped as SpatialCsvData stores them
+        index (int, optional): Position of the frame in the recording
+        start_time (int, optional): Start of the frame's time window (microseconds)
+        end_time (Optional[int], optional): End of the frame's time window. Defaults to just after the last event
+
+    Returns:
+        EventFrame: The accumulated frame
+    """
+    columns = events.x_positions.astype(np.intp)
+    rows = FRAME_SIZE - events.y_positions.astype(np.intp)
+
+    if len(columns) > 0 and (columns.max() >= FRAME_SIZE or rows.min() < 0 or rows.max() >= FRAME_SIZE):
+        raise ValueError(f"Events must be inside of the {FRAME_SIZE}x{FRAME_SIZE} sensor")
+
+    pixels = rows * FRAME_SIZE + columns
+    n_pixels = FRAME_SIZE * FRAME_SIZE
+
+    counts = np.bincount(pixels, minlength=n_pixels).astype(np.int32)
+    on_counts = np.bincount(pixels[events.polarities], minlength=n_pixels).astype(np.int32)
+
+    # The events are in timestamp order, but assigning with repeated pixels does not guarantee the last one is kept
+    last_timestamp = np.full(n_pixels, -1, dtype=np.int64)
+    np.maximum.at(last_timestamp, pixels, events.timestamps)
+
+    if end_time is None:
+        end_time = int(events.timestamps[-1]) + 1 if len(events.timestamps) > 0 else start_time
+
+    return EventFrame(
+        index,
+        start_time,
+        end_time,
+        counts.reshape(FRAME_SIZE, FRAME_SIZE),
+        (2 * on_counts - counts).reshape(FRAME_SIZE, FRAME_SIZE),
+        last_timestamp.reshape(FRAME_SIZE, FRAME_SIZE),
+    )
+
+
+def iter_frames(
+    csv_file: str, duration: int, stride: Optional[int] = None, block_size: int = 0
+) -> Iterator[EventFrame]:
+    """Reads a recording as frames of consecutive time windows
+
+    The CSV is read incrementally through event_windows.iter_csv_windows, so only one window of events is kept in
+    memory at a time. Windows without events give empty frames.
+
+    Args:
+        csv_file (str): Path to an On/Off,X,Y,Timestamp CSV
+        duration (int): Length of each frame's window (microseconds)
+        stride (Optional[int], optional): Time between the starts of consecutive windows. Defaults to duration
+        block_size (int, optional): Approximate number of bytes parsed at once
+    """
+    for window in event_windows.iter_csv_windows(csv_file, duration=duration, stride=stride, block_size=block_size):
+        yield accumulate_frame(window.events, window.index, window.start_time, window.end_time)
@@ -0,0 +1,194 @@
+"""
+Sparse sidecar index for On/Off,X,Y,Timestamp CSVs.
+
+Every INDEX_STRIDE rows the byte offset and timestamp of the row are recorded, which lets readers seek close to a row
+number or timestamp instead of parsing everything before it. The index is saved next to the CSV and is rebuilt when
+the CSV's size or modification time changes.
+"""
+import zipfile
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from plotting_utils import event_csv
+from plotting_utils.event_store import source_signature
+
+INDEX_STRIDE = 1 << 16  # Rows between index entries
+INDEX_SUFFIX = ".index.npz"
+
+
+def default_index_path(csv_file: str) -> str:
+    return csv_file + INDEX_SUFFIX
+
+
+class EventIndex:
+    """Byte offsets and timestamps of every stride-th row of an event CSV"""
+
+    offsets: np.ndarray
+    """Byte offset of rows 0, stride, 2 * stride, ..."""
+
+    timestamps: np.ndarray
+    """Absolute timestamp of the rows in offsets"""
+
+    stride: int
+    data_start: int
+    """Byte offset of the first data row"""
+
+    row_count: int
+    timestamps_sorted: bool
+    source: Dict[str, int]
+
+    def __init__(
+        self,
+        offsets: np.ndarray,
+        timestamps: np.ndarray,
+        stride: int,
+        data_start: int,
+        row_count: int,
+        timestamps_sorted: bool,
+        source: Dict[str, int],
+    ):
+        self.offsets = offsets
+        self.timestamps = timestamps
+        self.stride = stride
+        self.data_start = data_start
+        self.row_count = row_count
+        self.timestamps_sorted = timestamps_sorted
+        self.source = source
+
+    @property
+    def first_timestamp(self) -> Optional[int]:
+        return int(self.timestamps[0]) if len(self.timestamps) > 0 else None
+
+    def seek_row(self, row: int) -> Tuple[int, int]:
+        """Finds the closest indexed row at or before a row number
+
+        Returns:
+            Tuple[int, int]: Byte offset and row number of the indexed row
+        """
+        if len(self.offsets) == 0:
+            return self.data_start, 0
+
+        entry = min(row // self.stride, len(self.offsets) - 1)
+        return int(self.offsets[entry]), entry * self.stride
+
+    def seek_timestamp(self, timestamp: int) -> Tuple[int, int]:
+        """Finds an indexed row before the first row with a timestamp of at least timestamp
+
+        Only valid when timestamps_sorted is True.
+
+        Returns:
+            Tuple[int, int]: Byte offset and row number of the indexed row
+        """
+        if len(self.offsets) == 0:
+            return self.data_start, 0
+
+        entry = max(int(np.searchsorted(self.timestamps, timestamp, side="left")) - 1, 0)
+        return int(self.offsets[entry]), entry * self.stride
+
+    def save(self, index_path: str):
+        np.savez(
+            index_path,
+            offsets=self.offsets,
+            timestamps=self.timestamps,
+            header=np.array(
+                [
+                    self.stride,
+                    self.data_start,
+                    self.row_count,
+                    self.timestamps_sorted,
+                    self.source["size"],
+                    self.source["mtime_ns"],
+                ],
+                dtype=np.int64,
+            ),
+        )
+
+    @staticmethod
+    def open(csv_file: str, index_path: Optional[str] = None) -> Optional["EventIndex"]:
+        """Loads the sidecar index of a CSV
+
+        Returns:
+            Optional[EventIndex]: None if there is no index or it was built from a different version of the CSV
+        """
+        index_path = index_path or default_index_path(csv_file)
+
+        try:
+            with np.load(index_path) as saved:
+                offsets, timestamps, header = saved["offsets"], saved["timestamps"], saved["header"]
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            return None
+
+        stride, data_start, row_count, timestamps_sorted, size, mtime_ns = (int(value) for value in header)
+        source = {"size": size, "mtime_ns": mtime_ns}
+
+        if source != source_signature(csv_file):
+            return None
+
+        return EventIndex(offsets, timestamps, stride, data_start, row_count, bool(timestamps_sorted), source)
+
+    @staticmethod
+    def build(csv_file: str, stride: int = INDEX_STRIDE) -> "EventIndex":
+        """Scans an event CSV once and records the offset and timestamp of every stride-th row"""
+        source = source_signature(csv_file)
+        _, data_start = event_csv.read_csv_header(csv_file)
+
+        offsets = []
+        timestamps = []
+        row_count = 0
+        timestamps_sorted = True
+        last_timestamp = None
+        block_start = data_start
+
+        for block in event_csv.iter_row_blocks(csv_file, data_start):
+            rows = event_csv.parse_event_rows(block)
+            block_bytes = np.frombuffer(block, dtype=np.uint8)
+
+            # Rows start at the beginning of the block and after every newline. Blank lines are not rows
+            row_starts = np.concatenate(([0], np.flatnonzero(block_bytes == ord("\n")) + 1))
+            row_starts = row_starts[row_starts < len(block_bytes)]
+            row_starts = row_starts[(block_bytes[row_starts] != ord("\n")) & (block_bytes[row_starts] != ord("\r"))]
+
+            if len(row_starts) != len(rows):
+                raise ValueError(f"Could not index '{csv_file}'. Row offsets do not match the parsed rows")
+
+            indexed = np.flatnonzero((row_count + np.arange(len(rows))) % stride == 0)
+            offsets.append(block_start + row_starts[indexed])
+            timestamps.append(rows[indexed, 3])
+
+            if len(rows) > 0:
+                block_timestamps = rows[:, 3]
+                if last_timestamp is not None and block_timestamps[0] < last_timestamp:
+                    timestamps_sorted = False
+                elif np.any(block_timestamps[1:] < block_timestamps[:-1]):
+                    timestamps_sorted = False
+                last_timestamp = block_timestamps[-1]
+
+            row_count += len(rows)
+            block_start += len(block)
+
+        return EventIndex(
+            np.concatenate(offsets) if offsets else np.empty(0, dtype=np.int64),
+            np.concatenate(timestamps) if timestamps else np.empty(0, dtype=np.int64),
+            stride,
+            data_start,
+            row_count,
+            timestamps_sorted,
+            source,
+        )
+
+    @staticmethod
+    def open_or_build(csv_file: str, stride: int = INDEX_STRIDE) -> "EventIndex":
+        """Loads the sidecar index of a CSV, building and saving it first if it is missing or stale"""
+        index = EventIndex.open(csv_file)
+
+        if index is None:
+            index = EventIndex.build(csv_file, stride)
+
+            # The index is only an optimization. Carry on without saving it if the data folder is read only
+            try:
+                index.save(default_index_path(csv_file))
+            except OSError:
+                pass
+
+        return index
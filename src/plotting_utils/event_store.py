@@ -0,0 +1,151 @@
+"""
+Binary on-disk storage for On/Off,X,Y,Timestamp recordings.
+
+A store is a directory holding one .npy file per column and a small metadata.json header. Columns are opened with
+np.load(mmap_mode="r"), so opening a store is cheap and pages are only read once a column is touched. The header
+records the size and modification time of the CSV the store was converted from so stale stores can be detected.
+"""
+import json
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+STORE_VERSION = 1
+STORE_SUFFIX = ".events"
+METADATA_FILE = "metadata.json"
+
+COLUMN_DTYPES = {
+    "polarities": np.dtype(np.bool_),
+    "x_positions": np.dtype(np.uint8),
+    "y_positions": np.dtype(np.uint8),
+    "timestamps": np.dtype(np.int64),
+}
+
+
+def source_signature(file_path: str) -> Dict[str, int]:
+    """Cheap fingerprint of a file used to detect changes without hashing its contents"""
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def default_store_dir(csv_file: str) -> str:
+    return csv_file + STORE_SUFFIX
+
+
+class EventStore:
+    """Memory-mapped columns of a converted recording
+
+    Columns match SpatialCsvData: bool polarities, uint8 X/Y positions (Y already flipped) and int64 timestamps in
+    microseconds relative to the first event of the recording.
+    """
+
+    store_dir: str
+    metadata: Dict[str, Any]
+
+    def __init__(self, store_dir: str, metadata: Dict[str, Any]):
+        self.store_dir = store_dir
+        self.metadata = metadata
+        self.__columns: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return int(self.metadata["event_count"])
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self.__columns:
+            self.__columns[name] = np.load(os.path.join(self.store_dir, f"{name}.npy"), mmap_mode="r")
+
+        return self.__columns[name]
+
+    @property
+    def polarities(self) -> np.ndarray:
+        return self.column("polarities")
+
+    @property
+    def x_positions(self) -> np.ndarray:
+        return self.column("x_positions")
+
+    @property
+    def y_positions(self) -> np.ndarray:
+        return self.column("y_positions")
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.column("timestamps")
+
+    @property
+    def first_timestamp(self) -> int:
+        """Absolute timestamp of the first event in the source CSV"""
+        return int(self.metadata["first_timestamp"])
+
+    @property
+    def timestamps_sorted(self) -> bool:
+        return bool(self.metadata["timestamps_sorted"])
+
+    @staticmethod
+    def open(csv_file: str, store_dir: Optional[str] = None) -> Optional["EventStore"]:
+        """Opens the store for a CSV file
+
+        Returns:
+            Optional[EventStore]: None if the store does not exist or was converted from a different version of the CSV
+        """
+        store_dir = store_dir or default_store_dir(csv_file)
+
+        try:
+            with open(os.path.join(store_dir, METADATA_FILE), "r") as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if metadata.get("version") != STORE_VERSION or metadata.get("source") != source_signature(csv_file):
+            return None
+
+        return EventStore(store_dir, metadata)
+
+    @staticmethod
+    def create(
+        csv_file: str,
+        columns: Dict[str, np.ndarray],
+        first_timestamp: int,
+        store_dir: Optional[str] = None,
+    ) -> "EventStore":
+        """Writes a store for a CSV file, replacing any existing one
+
+        Args:
+            csv_file (str): The CSV the columns were read from
+            columns (Dict[str, np.ndarray]): An array for every entry in COLUMN_DTYPES
+            first_timestamp (int): Absolute timestamp of the first event in the CSV
+            store_dir (Optional[str], optional): Where to write the store. Defaults to default_store_dir(csv_file)
+        """
+        store_dir = store_dir or default_store_dir(csv_file)
+        signature = source_signature(csv_file)
+
+        timestamps = columns["timestamps"]
+        metadata = {
+            "version": STORE_VERSION,
+            "source": signature,
+            "event_count": len(timestamps),
+            "first_timestamp": int(first_timestamp),
+            "timestamps_sorted": bool(np.all(timestamps[1:] >= timestamps[:-1])),
+        }
+
+        # Write into a temporary directory first so a reader never sees a half written store
+        parent_dir = os.path.dirname(os.path.abspath(store_dir))
+        temp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=parent_dir)
+        try:
+            for name, dtype in COLUMN_DTYPES.items():
+                np.save(os.path.join(temp_dir, f"{name}.npy"), np.asarray(columns[name], dtype=dtype))
+
+            with open(os.path.join(temp_dir, METADATA_FILE), "w") as f:
+                json.dump(metadata, f)
+
+            if os.path.exists(store_dir):
+                shutil.rmtree(store_dir)
+            os.replace(temp_dir, store_dir)
+        except BaseException:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+        return EventStore(store_dir, metadata)
@@ -0,0 +1,311 @@
+"""
+Reads On/Off,X,Y,Timestamp recordings incrementally as windows of events.
+
+The CSV is parsed one block of rows at a time and only the events of the current window (plus at most one block) are
+kept in memory, so recordings of any length can be processed. Windows either span a fixed duration or hold a fixed
+number of events, and consecutive windows start stride apart: a stride smaller than the window makes them overlap,
+a larger one skips the events in between.
+
+Events are expected in timestamp order, as the AEDAT file readers write them. Timestamps are in microseconds relative
+to the first event of the recording, the same as SpatialCsvData.from_csv returns them.
+"""
+import sys
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from plotting_utils import event_csv
+from plotting_utils.get_plotting_data import DataStorage, SpatialCsvData
+
+
+class EventWindow:
+    """Events of one window"""
+
+    index: int
+    """Position of the window in the recording, starting at 0"""
+
+    start_time: int
+    end_time: int
+    """Time span of the window (microseconds, end exclusive). For count windows this is the span of its events"""
+
+    first_event: int
+    """Row number of the first event of the window in the recording"""
+
+    events: SpatialCsvData
+
+    def __init__(self, index: int, start_time: int, end_time: int, first_event: int, events: SpatialCsvData):
+        self.index = index
+        self.start_time = start_time
+        self.end_time = end_time
+        self.first_event = first_event
+        self.events = events
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+
+class _EventBuffer:
+    """Columns of the events that have been read but not dropped yet"""
+
+    def __init__(self, first_timestamp: int):
+        self.columns: List[np.ndarray] = [
+            np.empty(0, dtype=dtype) for dtype in (np.bool_, np.uint8, np.uint8, np.int64)
+        ]
+        self.first_timestamp = first_timestamp
+        self.first_event = 0
+        """Row number of the first buffered event"""
+        self.pending_drop = 0
+        """Events to drop from the next events appended, when more were dropped than were buffered"""
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.columns[3]
+
+    def __len__(self) -> int:
+        return len(self.columns[3])
+
+    def append(self, events: SpatialCsvData):
+        new_columns = [events.polarities, events.x_positions, events.y_positions, events.timestamps]
+        self.columns = [np.concatenate((column, new_column)) for column, new_column in zip(self.columns, new_columns)]
+
+        if self.pending_drop > 0:
+            self.drop(self.pending_drop)
+
+    def drop(self, count: int):
+        """Removes the first count events. Events past the end of the buffer are dropped when they are appended"""
+        dropped = min(count, len(self))
+        self.columns = [column[dropped:] for column in self.columns]
+        self.first_event += dropped
+        self.pending_drop = count - dropped
+
+    def take(self, start: int, end: int) -> SpatialCsvData:
+        """Copies of the events from start to end (buffer positions), so they stay valid after the buffer changes"""
+        polarities, x_positions, y_positions, timestamps = [column[start:end].copy() for column in self.columns]
+        return SpatialCsvData(polarities, x_positions, y_positions, timestamps, DataStorage.BOOL, self.first_timestamp)
+
+
+def iter_event_blocks(csv_file: str, block_size: int = 0) -> Iterator[SpatialCsvData]:
+    """Parses an On/Off,X,Y,Timestamp CSV one block of rows at a time
+
+    Args:
+        csv_file (str): Path to the CSV file
+        block_size (int, optional): Approximate number of bytes parsed at once. Defaults to event_csv.READ_BLOCK_SIZE
+
+    Yields:
+        SpatialCsvData: The events of each block. Timestamps are relative to the first event of the recording and
+                        first_timestamp is its absolute timestamp
+    """
+    header, data_start = event_csv.read_csv_header(csv_file)
+
+    if header != event_csv.EVENT_CSV_HEADER:
+        raise ValueError("CSV may not be the correct format.\n" "Header should be On/Off,X,Y,Timestamp")
+
+    first_timestamp: Optional[int] = None
+
+    for block in event_csv.iter_row_blocks(csv_file, data_start, block_size=block_size):
+        rows = event_csv.parse_event_rows(block)
+        if len(rows) == 0:
+            continue
+
+        if first_timestamp is None:
+            first_timestamp = int(rows[0, 3])
+
+        yield SpatialCsvData(
+            rows[:, 0] == 1,
+            rows[:, 1].astype(np.uint8),
+            (128 - rows[:, 2]).astype(np.uint8),
+            rows[:, 3] - first_timestamp,
+            DataStorage.BOOL,
+            first_timestamp,
+        )
+
+
+def iter_area_events(
+    csv_file: str,
+    pixel_x: int,
+    pixel_y: int,
+    area_size: int,
+    time_limit: float = sys.maxsize,
+    start_time: float = 0,
+    block_size: int = 0,
+) -> Iterator[SpatialCsvData]:
+    """Streaming version of SpatialCsvData.from_event_store with an area
+
+    Keeps the events where abs(x - pixel_x) < area_size and abs(y - pixel_y) < area_size, block by block, without
+    building an EventStore or holding more than one block of the recording.
+
+    Args:
+        csv_file (str): Path to an On/Off,X,Y,Timestamp CSV
+        pixel_x (int): X position of the center pixel
+        pixel_y (int): Y position of the center pixel, as stored in y_positions
+        area_size (int): Distance from the center pixel the area extends to (exclusive)
+        time_limit (float, optional): Stop after this many seconds past the first event at or after start_time
+        start_time (float, optional): Skip events before this point in the recording (seconds)
+        block_size (int, optional): Approximate number of bytes parsed at once
+
+    Yields:
+        SpatialCsvData: The area's events of each block. Timestamps are relative to the first event at or after
+                        start_time, the same as from_event_store returns them
+    """
+    start_timestamp = int(start_time * 1000000)
+    base_timestamp: Optional[int] = None
+    end_timestamp = None
+
+    for events in iter_event_blocks(csv_file, block_size):
+        started = np.searchsorted(events.timestamps, start_timestamp, side="left")
+        if started == len(events.timestamps):
+            continue
+
+        if base_timestamp is None:
+            base_timestamp = int(events.timestamps[started])
+            if time_limit != sys.maxsize:
+                end_timestamp = base_timestamp + int(time_limit * 1000000)
+
+        end = len(events.timestamps)
+        if end_timestamp is not None:
+            end = int(np.searchsorted(events.timestamps, end_timestamp, side="right"))
+
+        kept = slice(started, end)
+        in_area = (np.abs(events.x_positions[kept].astype(np.int64) - pixel_x) < area_size) & (
+            np.abs(events.y_positions[kept].astype(np.int64) - pixel_y) < area_size
+        )
+
+        yield SpatialCsvData(
+            events.polarities[kept][in_area],
+            events.x_positions[kept][in_area],
+            events.y_positions[kept][in_area],
+            events.timestamps[kept][in_area] - base_timestamp,
+            DataStorage.BOOL,
+            events.first_timestamp + base_timestamp,
+        )
+
+        if end < len(events.timestamps):
+            return
+
+    if base_timestamp is None:
+        raise ValueError(f"CSV file '{csv_file}' seems to be empty")
+
+
+def iter_time_windows(
+    blocks: Iterable[SpatialCsvData], duration: int, stride: Optional[int] = None
+) -> Iterator[EventWindow]:
+    """Groups events into windows spanning a fixed duration
+
+    Window i holds the events with timestamps in [i * stride, i * stride + duration). Windows without events are
+    yielded too, so the window index always maps to the same time. Windows stop at the first one that reaches past the
+    last event, or after which the next one would start past it.
+
+    Args:
+        blocks (Iterable[SpatialCsvData]): Events in timestamp order, e.g. from iter_event_blocks
+        duration (int): Length of each window (microseconds)
+        stride (Optional[int], optional): Time between the starts of consecutive windows. Defaults to duration
+    """
+    stride = stride or duration
+    if duration <= 0 or stride <= 0:
+        raise ValueError(f"Window duration and stride must be positive, not {duration} and {stride}")
+
+    buffer = _EventBuffer(0)
+    index = 0
+
+    def next_window() -> EventWindow:
+        nonlocal index
+        start_time = index * stride
+        end_time = start_time + duration
+        start, end = np.searchsorted(buffer.timestamps, [start_time, end_time], side="left")
+        window = EventWindow(index, start_time, end_time, buffer.first_event + int(start), buffer.take(start, end))
+
+        index += 1
+        buffer.drop(int(np.searchsorted(buffer.timestamps, index * stride, side="left")))
+
+        return window
+
+    for events in blocks:
+        buffer.first_timestamp = events.first_timestamp
+        buffer.append(events)
+
+        # A window is complete once an event at or past its end has been read
+        while len(buffer) > 0 and buffer.timestamps[-1] >= index * stride + duration:
+            yield next_window()
+
+    if len(buffer) == 0:
+        return
+
+    last_timestamp = buffer.timestamps[-1]
+    while True:
+        window = next_window()
+        yield window
+
+        if window.end_time > last_timestamp or index * stride > last_timestamp:
+            break
+
+
+def iter_count_windows(
+    blocks: Iterable[SpatialCsvData], count: int, stride: Optional[int] = None
+) -> Iterator[EventWindow]:
+    """Groups events into windows holding a fixed number of events
+
+    Window i holds events i * stride to i * stride + count. Windows stop at the first one that reaches the last event,
+    or after which the next one would start past it, so the last window can hold fewer than count events.
+
+    Args:
+        blocks (Iterable[SpatialCsvData]): Events in file order, e.g. from iter_event_blocks
+        count (int): Number of events in each window
+        stride (Optional[int], optional): Number of events between the starts of consecutive windows. Defaults to
+                                          count
+    """
+    stride = stride or count
+    if count <= 0 or stride <= 0:
+        raise ValueError(f"Window size and stride must be positive, not {count} and {stride}")
+
+    buffer = _EventBuffer(0)
+    index = 0
+
+    def next_window() -> EventWindow:
+        nonlocal index
+        events = buffer.take(0, count)
+        timestamps = events.timestamps
+        window = EventWindow(index, int(timestamps[0]), int(timestamps[-1]) + 1, buffer.first_event, events)
+
+        index += 1
+        buffer.drop(stride)
+
+        return window
+
+    for events in blocks:
+        buffer.first_timestamp = events.first_timestamp
+        buffer.append(events)
+
+        # Keep the window that reaches the end of the buffer until it is known whether more events follow
+        while len(buffer) > count:
+            yield next_window()
+
+    if len(buffer) > 0:
+        yield next_window()
+
+
+def iter_csv_windows(
+    csv_file: str,
+    duration: Optional[int] = None,
+    count: Optional[int] = None,
+    stride: Optional[int] = None,
+    block_size: int = 0,
+) -> Iterator[EventWindow]:
+    """Reads a recording as windows of events with bounded memory
+
+    Args:
+        csv_file (str): Path to an On/Off,X,Y,Timestamp CSV
+        duration (Optional[int], optional): Length of each window (microseconds). See iter_time_windows
+        count (Optional[int], optional): Number of events in each window. See iter_count_windows
+        stride (Optional[int], optional): Distance between the starts of consecutive windows, in microseconds or
+                                          events. Defaults to the window size
+        block_size (int, optional): Approximate number of bytes parsed at once
+
+    Exactly one of duration and count must be given.
+    """
+    if duration is not None and count is None:
+        return iter_time_windows(iter_event_blocks(csv_file, block_size), duration, stride)
+
+    if count is not None and duration is None:
+        return iter_count_windows(iter_event_blocks(csv_file, block_size), count, stride)
+
+    raise ValueError("Either a window duration or an event count is needed")
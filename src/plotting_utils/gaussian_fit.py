@@ -0,0 +1,130 @@
+"""
+Gaussian curves fitted to event count histograms.
+
+The fit is kept apart from plotting so it can be computed in worker processes or cached and plotted later.
+"""
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import stats
+
+HIST_BINS = 100
+PAD_BINS = 100
+ACCURACY = 0.002
+"""Points of the curve below this density are trimmed from its ends"""
+
+LOG_ACCURACY = 0.00002
+"""ACCURACY for log event counts, which have a much narrower spread"""
+
+
+class GaussianFit:
+    """Gaussian fitted to a histogram and the points of the curve to plot"""
+
+    mu: float
+    sigma: float
+    x: np.ndarray
+    y: np.ndarray
+    """Probability density at each x"""
+
+    def __init__(self, mu: float, sigma: float, x: np.ndarray, y: np.ndarray):
+        self.mu = mu
+        self.sigma = sigma
+        self.x = x
+        self.y = y
+
+
+def pad_bins(hist_bins: np.ndarray, pad_count: int) -> np.ndarray:
+    """Extends histogram bin edges on both sides so the tails of a fitted curve are not cut off
+
+    The i-th added edge is i bin widths further out than the one before it, so the padding reaches
+    pad_count * (pad_count + 1) / 2 bin widths past each end of hist_bins.
+    """
+    difference = hist_bins[1] - hist_bins[0]
+    steps = difference * np.arange(1, pad_count + 1)
+
+    # Accumulate one step at a time so the edges round the same way as adding them one by one
+    left = np.cumsum(np.concatenate(([hist_bins[0]], -steps)))[:0:-1]
+    right = np.cumsum(np.concatenate(([hist_bins[-1]], steps)))[1:]
+
+    return np.concatenate((left, hist_bins, right))
+
+
+def fit_gaussian(data: np.ndarray, log_values: bool = False, hist_bins: Optional[np.ndarray] = None) -> GaussianFit:
+    """Fits a Gaussian to data and samples its curve at the padded histogram bin edges
+
+    Args:
+        data (np.ndarray): Event counts
+        log_values (bool, optional): data holds log event counts. Trims the curve at LOG_ACCURACY instead of ACCURACY
+        hist_bins (Optional[np.ndarray], optional): Bin edges of the histogram of data. Defaults to HIST_BINS equal
+                                                    bins over the range of data
+
+    Returns:
+        GaussianFit: The fit, with the curve trimmed to the part between the first and last point above the accuracy
+    """
+    if hist_bins is None:
+        hist_bins = np.histogram_bin_edges(data, bins=HIST_BINS)
+
+    x = pad_bins(hist_bins, PAD_BINS)
+
+    mu, sigma = stats.norm.fit(data)
+    y = stats.norm.pdf(x, mu, sigma)
+
+    accuracy = LOG_ACCURACY if log_values else ACCURACY
+    kept = np.flatnonzero(~(y < accuracy))
+    kept_range = slice(kept[0], kept[-1] + 1) if len(kept) > 0 else slice(0, 0)
+
+    return GaussianFit(float(mu), float(sigma), x[kept_range], y[kept_range])
+
+
+def stack_curves(xs: Sequence[np.ndarray], ys: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Stacks curves of different lengths into (number of curves, longest curve) arrays padded with NaN"""
+    lengths = np.array([len(x) for x in xs], dtype=np.int64)
+    x = np.full((len(xs), lengths.max(initial=0)), np.nan)
+    y = np.full_like(x, np.nan)
+
+    # Point j of curve i is in the row where j is below the length of curve i
+    in_curve = np.arange(x.shape[1]) < lengths[:, np.newaxis]
+    if len(xs) > 0:
+        x[in_curve] = np.concatenate(xs)
+        y[in_curve] = np.concatenate(ys)
+
+    return x, y
+
+
+def align_starts(x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Shifts each stacked curve so it starts at (0, 0)"""
+    return x - x[:, :1], y - y[:, :1]
+
+
+def peak_positions(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """x of the highest point of each stacked curve (the first one if there are several)"""
+    peaks: np.ndarray = x[np.arange(len(x)), np.nanargmax(y, axis=1)]
+    return peaks
+
+
+def center_peaks(x: np.ndarray, y: np.ndarray, extra_offsets: Optional[np.ndarray] = None) -> np.ndarray:
+    """Shifts each stacked curve along x so its peak is at 0, or at -extra_offsets when they are given"""
+    offsets = peak_positions(x, y)
+    if extra_offsets is not None:
+        offsets = offsets + extra_offsets
+
+    centered: np.ndarray = x - offsets[:, np.newaxis]
+    return centered
+
+
+def normalize_groups(y: np.ndarray, groups: np.ndarray) -> np.ndarray:
+    """Divides each stacked curve by the highest point of all the curves in its group
+
+    Args:
+        y (np.ndarray): (number of curves, points) curve heights, padded with NaN
+        groups (np.ndarray): Non-negative int group of each curve
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    if len(y) == 0:
+        return y
+
+    curve_heights = np.nanmax(y, axis=1)
+    group_heights = np.zeros(groups.max() + 1)
+    np.maximum.at(group_heights, groups, curve_heights)
+
+    return y / group_heights[groups, np.newaxis]
@@ -1,11 +1,19 @@
-import csv
 import os
 import json
-import itertools
-from typing import Callable, List
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 import sys
 from enum import Enum
 
+import numpy as np
+
+from plotting_utils import event_chunks, event_csv
+from plotting_utils.event_index import EventIndex
+from plotting_utils.event_store import EventStore
+from plotting_utils.result_cache import ResultCache
+from plotting_utils.roi_index import RoiIndex
+
 
 class EventChunkConfig:
 
@@ -75,144 +83,572 @@ class EventChunkConfig:
         self.gaussianMaxY = gaussian_max_y
 
 
+OUTLIER_EVENT_COUNT = 8000
+"""Time windows with more events than this are camera glitches"""
+
+
 # TODO: rename to CsvChunkData
 class CsvData:
     file_name: str
-    time_windows: List[float]
-    y_on: List[int]
-    y_off: List[int]
-    y_all: List[int]
+    time_windows: np.ndarray
+    y_on: np.ndarray
+    y_off: np.ndarray
+    y_all: np.ndarray
 
-    def __init__(self, file_name: str, time_windows: List[float], y_on: List[int], y_off: List[int], y_all: List[int]):
+    def __init__(
+        self, file_name: str, time_windows: np.ndarray, y_on: np.ndarray, y_off: np.ndarray, y_all: np.ndarray
+    ):
         self.file_name = file_name
         self.time_windows = time_windows
         self.y_on = y_on
         self.y_off = y_off
         self.y_all = y_all
 
+    @staticmethod
+    def from_counts(file_name: str, counts: np.ndarray, time_window: int) -> "CsvData":
+        """Builds CsvData from an (N, 3) array of On, Off and All event counts per time window
+
+        Outliers are replaced with substitute_outliers.
+        """
+        counts = substitute_outliers(counts)
+        time_windows = (np.arange(len(counts)) - 1) * time_window * 0.000001
+
+        return CsvData(file_name, time_windows, counts[:, 0], counts[:, 1], counts[:, 2])
+
 
 class DataStorage(Enum):
     BOOL = 1
     COLOR = 2
-    BOOL_AND_COLOR = 3
+    """polarities_color is also exposed"""
     NONE = 4
 
 
 class SpatialCsvData:
-    def __init__(self, polarity_as_bool: bool, polarity_as_color: bool):
-        self.polarities: List[bool] = []
-        self.polarities_color: List[str] = []
-        self.x_positions: List[int] = []
-        self.y_positions: List[int] = []
-        self.timestamps: List[int] = []
+    """Events from an On/Off,X,Y,Timestamp CSV stored as NumPy columns
 
-        self.__polarity_storage_callbacks: List[Callable[[bool], None]] = []
+    X/Y positions are uint8, timestamps are int64 microseconds relative to the first event and polarities are bool
+    (True for ON events). data_storage selects which polarity views are exposed. first_timestamp is the absolute
+    timestamp of the first event.
+    """
 
-        if polarity_as_color:
-            self.__polarity_storage_callbacks.append(self.__store_polarity_color)
+    def __init__(
+        self,
+        polarities: np.ndarray,
+        x_positions: np.ndarray,
+        y_positions: np.ndarray,
+        timestamps: np.ndarray,
+        data_storage: DataStorage = DataStorage.BOOL,
+        first_timestamp: int = 0,
+    ):
+        self.x_positions = x_positions
+        self.y_positions = y_positions
+        self.timestamps = timestamps
+        self.data_storage = data_storage
+        self.first_timestamp = first_timestamp
+
+        self.__polarities = polarities
+
+    @property
+    def polarities(self) -> np.ndarray:
+        if self.data_storage != DataStorage.NONE:
+            return self.__polarities
 
-        if polarity_as_bool:
-            self.__polarity_storage_callbacks.append(self.__store_polarity_bool)
+        return np.empty(0, dtype=bool)
 
-    def __store_polarity_bool(self, polarity: bool):
-        self.polarities.append(polarity)
+    @property
+    def polarities_color(self) -> np.ndarray:
+        """"g" for ON events and "r" for OFF events
 
-    def __store_polarity_color(self, polarity: bool):
-        self.polarities_color.append("g" if polarity == 1 else "r")
+        The strings take 4 bytes per event and are built again on every access. To plot the events, pass polarities
+        to plotting_helper.polarity_color_args instead.
+        """
+        if self.data_storage != DataStorage.COLOR:
+            return np.empty(0, dtype=str)
+
+        return np.where(self.__polarities, "g", "r")
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
 
     @staticmethod
-    def from_csv(csv_file: str, data_storage: DataStorage, time_limit: int = sys.maxsize, skip_rows: int = 0):
-        first_timestamp = 0
+    def from_csv(
+        csv_file: str,
+        data_storage: DataStorage,
+        time_limit: float = sys.maxsize,
+        skip_rows: int = 0,
+        workers: int = 1,
+        start_time: float = 0,
+    ) -> "SpatialCsvData":
+        """Reads an On/Off,X,Y,Timestamp CSV
+
+        When the CSV has a sidecar EventIndex, skip_rows and start_time seek close to the first kept row instead of
+        parsing every row before it. Using start_time builds the index if it does not exist yet.
+
+        Args:
+            csv_file (str): Path to the CSV file
+            data_storage (DataStorage): Polarity views to expose
+            time_limit (float, optional): Stop reading after this many seconds of events
+            skip_rows (int, optional): Number of rows to skip at the start of the file
+            workers (int, optional): Number of processes used to parse the file. 1 parses in this process and 0 uses
+                                     every available CPU
+            start_time (float, optional): Skip events until this many seconds after the first event in the file
+
+        Returns:
+            SpatialCsvData: The events in the file. Timestamps are relative to the first event that was kept
+        """
         if time_limit != sys.maxsize:
             time_limit = int(time_limit * 1000000)  # Convert to microseconds
 
-        polarity_as_bool = data_storage in [DataStorage.BOOL, DataStorage.BOOL_AND_COLOR]
-        polarity_as_color = data_storage in [DataStorage.COLOR, DataStorage.BOOL_AND_COLOR]
+        header, data_start = event_csv.read_csv_header(csv_file)
 
-        spatial_csv_data = SpatialCsvData(polarity_as_bool, polarity_as_color)
+        # Make sure CSV is the correct format
+        if header != event_csv.EVENT_CSV_HEADER:
+            raise ValueError("CSV may not be the correct format.\n" "Header should be On/Off,X,Y,Timestamp")
+
+        index: Optional[EventIndex] = None
+        if start_time > 0:
+            index = EventIndex.open_or_build(csv_file)
+        elif skip_rows > 0:
+            index = EventIndex.open(csv_file)
+
+        # Seek to the last indexed row before the first row that would be kept
+        start_timestamp: Optional[int] = None
+        seek_points = [(data_start, 0)]
+        if index is not None:
+            seek_points.append(index.seek_row(skip_rows))
+
+            if start_time > 0 and index.first_timestamp is not None:
+                start_timestamp = index.first_timestamp + int(start_time * 1000000)
+                if index.timestamps_sorted:
+                    seek_points.append(index.seek_timestamp(start_timestamp))
+
+        data_start, first_row = max(seek_points, key=lambda seek_point: seek_point[1])
+        skip_rows = max(skip_rows - first_row, 0)
+
+        if workers == 0:
+            workers = os.cpu_count() or 1
+
+        row_blocks: Iterable[np.ndarray]
+        if workers == 1:
+            row_blocks = (
+                event_csv.parse_event_rows(block) for block in event_csv.iter_row_blocks(csv_file, data_start)
+            )
+            spatial_csv_data = SpatialCsvData.from_event_rows(
+                row_blocks, data_storage, time_limit, skip_rows, start_timestamp
+            )
+        else:
+            # Several ranges per worker keeps each result small and lets ranges past the time limit be cancelled
+            file_size = os.path.getsize(csv_file)
+            n_ranges = max(workers, (file_size - data_start) // event_csv.RANGE_SIZE)
+            row_ranges = event_csv.split_row_ranges(csv_file, data_start, n_ranges)
+
+            executor = ProcessPoolExecutor(max_workers=workers)
+            try:
+                row_blocks = executor.map(
+                    partial(event_csv.parse_event_range, csv_file),
+                    [start for start, _ in row_ranges],
+                    [end for _, end in row_ranges],
+                )
+                spatial_csv_data = SpatialCsvData.from_event_rows(
+                    row_blocks, data_storage, time_limit, skip_rows, start_timestamp
+                )
+            finally:
+                executor.shutdown(cancel_futures=True)
 
-        with open(csv_file, "r") as csvfile:
-            reader = csv.reader(csvfile, delimiter=",")
-            header = next(reader, None)  # Grab header
+        if len(spatial_csv_data) == 0:
+            raise ValueError(f"CSV file '{csv_file}' seems to be empty")
 
-            # Make sure CSV is the correct format
-            if header != ["On/Off", "X", "Y", "Timestamp"]:
-                raise ValueError("CSV may not be the correct format.\n" "Header should be On/Off,X,Y,Timestamp")
+        return spatial_csv_data
 
+    @staticmethod
+    def from_event_rows(
+        row_blocks: Iterable[np.ndarray],
+        data_storage: DataStorage,
+        time_limit: float = sys.maxsize,
+        skip_rows: int = 0,
+        start_timestamp: Optional[int] = None,
+    ) -> "SpatialCsvData":
+        """Builds the event columns from blocks of parsed On/Off,X,Y,Timestamp rows given in file order
+
+        Args:
+            row_blocks (Iterable[np.ndarray]): (N, 4) int64 arrays as returned by event_csv.parse_event_rows
+            data_storage (DataStorage): Polarity views to expose
+            time_limit (float, optional): Stop at the first event more than time_limit microseconds after the first
+                                          kept event
+            skip_rows (int, optional): Number of rows to drop from the start
+            start_timestamp (Optional[int], optional): After skipping rows, also drop rows until the first one with at
+                                                       least this absolute timestamp
+
+        Returns:
+            SpatialCsvData: The kept events. Blocks after the time limit is reached are not consumed
+        """
+        columns: List[List[np.ndarray]] = [[], [], [], []]
+        first_timestamp = None
+
+        for rows in row_blocks:
             # Skip N rows as specified by skip_rows
-            [next(reader, None) for _ in range(skip_rows)]
+            if skip_rows > 0:
+                skipped = min(skip_rows, len(rows))
+                rows = rows[skipped:]
+                skip_rows -= skipped
 
-            first_row = next(reader, None)
+            if start_timestamp is not None:
+                started = np.flatnonzero(rows[:, 3] >= start_timestamp)
+                if started.size == 0:
+                    continue
 
-            if first_row is None:
-                raise ValueError(f"CSV file '{csv_file}' seems to be empty")
+                rows = rows[started[0]:]
+                start_timestamp = None
 
-            first_timestamp = int(first_row[3])
+            if len(rows) == 0:
+                continue
 
-            for row in itertools.chain([first_row], reader):
-                timestamp = int(row[3]) - first_timestamp
+            if first_timestamp is None:
+                first_timestamp = rows[0, 3]
 
-                if timestamp > time_limit:
-                    break
+            timestamps = rows[:, 3] - first_timestamp
 
-                polarity = row[0] in ["1", "True"]
-                x_pos = int(row[1])
-                y_pos = 128 - int(row[2])
+            past_limit = np.flatnonzero(timestamps > time_limit)
+            if past_limit.size > 0:
+                rows = rows[: past_limit[0]]
+                timestamps = timestamps[: past_limit[0]]
 
-                spatial_csv_data.append_row(polarity, x_pos, y_pos, timestamp)
+            columns[0].append(rows[:, 0] == 1)
+            columns[1].append(rows[:, 1].astype(np.uint8))
+            columns[2].append((128 - rows[:, 2]).astype(np.uint8))
+            columns[3].append(timestamps)
 
-        return spatial_csv_data
+            if past_limit.size > 0:
+                break
+
+        polarities, x_positions, y_positions, timestamps = [
+            np.concatenate(column) if column else np.empty(0, dtype=dtype)
+            for column, dtype in zip(columns, [bool, np.uint8, np.uint8, np.int64])
+        ]
+
+        return SpatialCsvData(
+            polarities, x_positions, y_positions, timestamps, data_storage, int(first_timestamp or 0)
+        )
+
+    @staticmethod
+    def from_event_store(
+        csv_file: str,
+        data_storage: DataStorage,
+        time_limit: float = sys.maxsize,
+        skip_rows: int = 0,
+        workers: int = 1,
+        start_time: float = 0,
+        store_dir: Optional[str] = None,
+        area: Optional[Tuple[int, int, int]] = None,
+    ) -> "SpatialCsvData":
+        """Same as from_csv, but reads through a memory-mapped EventStore
+
+        The CSV is converted to a store on first access and the store is reused until the CSV's size or modification
+        time changes. When no rows are skipped and no area is given the returned columns are views of the
+        memory-mapped files.
+
+        Args:
+            store_dir (Optional[str], optional): Location of the store. Defaults to a directory next to the CSV
+            area (Optional[Tuple[int, int, int]], optional): (pixel_x, pixel_y, area_size). Only keep the events where
+                abs(x - pixel_x) < area_size and abs(y - pixel_y) < area_size. Y is the flipped position stored in
+                y_positions. Uses the recording's RoiIndex, which is built on first use
+        """
+        store = EventStore.open(csv_file, store_dir)
+
+        if store is None:
+            events = SpatialCsvData.from_csv(csv_file, DataStorage.BOOL, workers=workers)
+            columns = {
+                "polarities": events.polarities,
+                "x_positions": events.x_positions,
+                "y_positions": events.y_positions,
+                "timestamps": events.timestamps,
+            }
+            store = EventStore.create(csv_file, columns, events.first_timestamp, store_dir)
+
+        start = skip_rows
+        if start_time > 0:
+            start_timestamp = int(start_time * 1000000)
+
+            if store.timestamps_sorted:
+                start = max(start, int(np.searchsorted(store.timestamps, start_timestamp, side="left")))
+            else:
+                started = np.flatnonzero(store.timestamps[start:] >= start_timestamp)
+                start = start + int(started[0]) if started.size > 0 else len(store)
+
+        if start >= len(store):
+            raise ValueError(f"CSV file '{csv_file}' seems to be empty")
+
+        if time_limit != sys.maxsize:
+            time_limit = int(time_limit * 1000000)  # Convert to microseconds
+
+        timestamps = store.timestamps[start:]
+        base_timestamp = int(timestamps[0])
+
+        # Index of the first event past the time limit, found the same way from_csv stops reading
+        if time_limit >= np.iinfo(np.int64).max - base_timestamp:
+            end = len(timestamps)
+        elif store.timestamps_sorted:
+            end = int(np.searchsorted(timestamps, base_timestamp + time_limit, side="right"))
+        else:
+            past_limit = np.flatnonzero(timestamps > base_timestamp + time_limit)
+            end = int(past_limit[0]) if past_limit.size > 0 else len(timestamps)
+
+        kept: Union[slice, np.ndarray] = slice(start, start + end)
+        if area is not None:
+            kept = RoiIndex.open_or_build(store).query(*area, start=start, end=start + end)
+
+        # Avoid copying the timestamp column when it is already relative to the first kept event
+        timestamps = store.timestamps[kept]
+        if base_timestamp != 0:
+            timestamps = timestamps - base_timestamp
+
+        return SpatialCsvData(
+            store.polarities[kept],
+            store.x_positions[kept],
+            store.y_positions[kept],
+            timestamps,
+            data_storage,
+            store.first_timestamp + base_timestamp,
+        )
 
-    def append_row(self, polarity: bool, x: int, y: int, timestamp: int):
-        self.x_positions.append(x)
-        self.y_positions.append(y)
-        self.timestamps.append(timestamp)
 
-        for polarity_func in self.__polarity_storage_callbacks:
-            polarity_func(polarity)
+def substitute_outliers(counts: np.ndarray, outlier_count: int = OUTLIER_EVENT_COUNT) -> np.ndarray:
+    """Replaces the rows of an On,Off,All count array where the camera registered too many events
+
+    A row is an outlier when its last column is above outlier_count. Every column of an outlier row is replaced by the
+    floored mean of all rows before it, including rows that were already replaced. Outliers before the first valid row
+    have no earlier data and are replaced by that first valid row instead (0 if every row is an outlier).
+
+    Args:
+        counts (np.ndarray): (N, 3) array of On, Off and All event counts per time window
+
+    Returns:
+        np.ndarray: int64 copy of counts with the outliers replaced
+    """
+    counts = np.array(counts, dtype=np.int64)
+    is_outlier = counts[:, -1] > outlier_count
+    outliers = np.flatnonzero(is_outlier)
+
+    if outliers.size == 0:
+        return counts
+
+    valid_rows = np.flatnonzero(~is_outlier)
+    first_valid = int(valid_rows[0]) if valid_rows.size > 0 else len(counts)
+    first_valid_counts = counts[first_valid].copy() if valid_rows.size > 0 else np.zeros(counts.shape[1], np.int64)
+
+    counts[outliers] = 0
+    prefix_sums = np.cumsum(counts, axis=0)  # Only includes valid rows since the outliers were zeroed
+
+    # Each replacement only depends on the prefix sum and the replacements before it, so only the outliers are visited
+    replaced_sum = np.zeros(counts.shape[1], dtype=np.int64)
+    for i in outliers:
+        counts[i] = first_valid_counts if i < first_valid else (prefix_sums[i - 1] + replaced_sum) // i
+        replaced_sum += counts[i]
+
+    return counts
 
 
 # TODO: indicate that this is for chunk CSVs
-def read_aedat_csv(csv_path: str, timeWindow: int, maxSize: int = -1) -> CsvData:
-    x: List[float] = []
-    y_on: List[int] = []
-    y_off: List[int] = []
-    y_all: List[int] = []
+def read_aedat_csv(csv_path: str, timeWindow: int, maxSize: int = -1, stream: bool = False) -> CsvData:
+    """Reads a CSV of On, Off and All event counts per time window
+
+    On/Off,X,Y,Timestamp CSVs are also accepted and are counted with read_event_chunks.
+
+    Args:
+        csv_path (str): Path to the CSV file
+        timeWindow (int): Reconstruction window the CSV was generated with (microseconds)
+        maxSize (int, optional): Stop after row maxSize. -1 reads every row
+        stream (bool, optional): Count an On/Off,X,Y,Timestamp CSV one block at a time, see read_event_chunks
 
+    Returns:
+        CsvData: int64 count arrays with outliers replaced by substitute_outliers
+    """
     if not os.path.exists(csv_path):
         raise FileNotFoundError(f"CSV file could not be found: {csv_path}")
 
-    with open(csv_path, "r") as csvfile:
-        reader = csv.reader(csvfile, delimiter=",")
-        header = next(reader, None)  # Grab header
+    header, data_start = event_csv.read_csv_header(csv_path)
 
-        if header is None:
-            raise ValueError(f"CSV file '{csv_path}' seems to be empty")
+    if header == [""]:
+        raise ValueError(f"CSV file '{csv_path}' seems to be empty")
 
-        # Make sure CSV is the correct format
-        for entry in header:
-            if "count" not in entry.lower():
-                raise ValueError(
-                    "CSV may not be the correct format.\n"
-                    "Header entries should indicate that the columns contain event counts"
-                )
+    # Raw recordings are counted directly instead of requiring a pre-generated event chunk CSV
+    if header == event_csv.EVENT_CSV_HEADER:
+        return read_event_chunks(csv_path, [timeWindow], maxSize, stream)[int(timeWindow)]
 
-        for i, row in enumerate(reader):
-            x.append((i - 1) * timeWindow * 0.000001)
-            # TODO: If timewindow is large this will not work
-            # also machineLearning Get data might need this fix for outliers
-            if int(row[2]) > 8000:  # If camera bugs out and registers too many events, use like data instead
-                y_on.append(sum(y_on) // len(y_on))
-                y_off.append(sum(y_off) // len(y_off))
-                y_all.append(sum(y_all) // len(y_all))
-            else:
-                y_on.append(int(row[0]))
-                y_off.append(int(row[1]))
-                y_all.append(int(row[2]))
-            if i == maxSize:
-                break
+    # Make sure CSV is the correct format
+    for entry in header:
+        if "count" not in entry.lower():
+            raise ValueError(
+                "CSV may not be the correct format.\n"
+                "Header entries should indicate that the columns contain event counts"
+            )
+
+    # Row maxSize is the last row that is read
+    row_count = int(maxSize) + 1 if maxSize >= 0 else sys.maxsize
+
+    row_blocks = []
+    rows_read = 0
+    for block in event_csv.iter_row_blocks(csv_path, data_start):
+        rows = event_csv.parse_int_rows(block, len(header))
+        row_blocks.append(rows[: row_count - rows_read, :3])
+        rows_read += len(row_blocks[-1])
+
+        if rows_read >= row_count:
+            break
+
+    counts = np.concatenate(row_blocks) if row_blocks else np.empty((0, 3), dtype=np.int64)
+
+    return CsvData.from_counts(csv_path, counts, timeWindow)
+
+
+def log_scale_counts(counts: np.ndarray) -> np.ndarray:
+    """Takes the base 10 log of event counts
+
+    Windows without events have no log value and are given the log of the mean count instead.
+
+    Args:
+        counts (np.ndarray): Event count of each window. For a 2D array each column is scaled with its own mean
+
+    Returns:
+        np.ndarray: float64 log counts with the same shape as counts
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+
+    if len(counts) == 0:
+        return counts
+
+    return np.log10(np.where(counts == 0, counts.mean(axis=0), counts))
+
+
+def log_counts(csv_data: CsvData) -> CsvData:
+    """Takes the base 10 log of every event count in place with log_scale_counts
+
+    Returns:
+        CsvData: csv_data with float64 count arrays
+    """
+    csv_data.y_on = log_scale_counts(csv_data.y_on)
+    csv_data.y_off = log_scale_counts(csv_data.y_off)
+    csv_data.y_all = log_scale_counts(csv_data.y_all)
+
+    return csv_data
+
+
+def read_chunk_data(
+    csv_path: str,
+    time_window: int,
+    max_size: int = -1,
+    log_values: bool = False,
+    cache: Optional[ResultCache] = None,
+    stream: bool = False,
+) -> CsvData:
+    """read_aedat_csv followed by log_counts if log_values is set, with the result kept in a ResultCache
+
+    Args:
+        csv_path (str): Path to the CSV file
+        time_window (int): Reconstruction window the CSV was generated with (microseconds)
+        max_size (int, optional): Stop after row max_size. -1 reads every row
+        log_values (bool, optional): Take the log of the counts with log_counts
+        cache (Optional[ResultCache], optional): Cache to load the counts from or save them to. None to always read
+                                                 the CSV
+        stream (bool, optional): Count an On/Off,X,Y,Timestamp CSV one block at a time, see read_event_chunks. The
+                                 counts are the same either way, so it is not part of the cache key
+    """
+
+    def read() -> CsvData:
+        csv_data = read_aedat_csv(csv_path, time_window, max_size, stream)
+        return log_counts(csv_data) if log_values else csv_data
+
+    if cache is None:
+        return read()
+
+    def read_arrays() -> Dict[str, np.ndarray]:
+        csv_data = read()
+        return {
+            "time_windows": csv_data.time_windows,
+            "y_on": csv_data.y_on,
+            "y_off": csv_data.y_off,
+            "y_all": csv_data.y_all,
+        }
+
+    params = {"time_window": int(time_window), "max_size": int(max_size), "log_values": bool(log_values)}
+    arrays = cache.get_or_compute(csv_path, "read_chunk_data", params, read_arrays)
+
+    return CsvData(csv_path, arrays["time_windows"], arrays["y_on"], arrays["y_off"], arrays["y_all"])
+
+
+def read_event_chunks(
+    csv_path: str, time_windows: Iterable[int], max_size: int = -1, stream: bool = False
+) -> Dict[int, CsvData]:
+    """Counts the events of an On/Off,X,Y,Timestamp CSV per time window for several window sizes
+
+    The events are read through the CSV's EventStore and binned once for all window sizes.
+
+    Args:
+        csv_path (str): Path to the CSV file
+        time_windows (Iterable[int]): Reconstruction windows to count with (microseconds)
+        max_size (int, optional): Stop after window max_size. -1 keeps every window
+        stream (bool, optional): Count the CSV one block at a time instead, without creating an EventStore. Only the
+                                 counts are kept in memory, so recordings of any length can be counted
 
-    return CsvData(csv_path, x, y_on, y_off, y_all)
+    Returns:
+        Dict[int, CsvData]: The counts for each reconstruction window, the same as read_aedat_csv returns for an
+                            event chunk CSV generated with that window
+    """
+    if stream:
+        _, data_start = event_csv.read_csv_header(csv_path)
+        row_blocks = (event_csv.parse_event_rows(block) for block in event_csv.iter_row_blocks(csv_path, data_start))
+        window_counts = event_chunks.count_row_blocks(row_blocks, time_windows)
+    else:
+        events = SpatialCsvData.from_event_store(csv_path, DataStorage.BOOL)
+        window_counts = event_chunks.count_windows(events.polarities, events.timestamps, time_windows)
+
+    row_count = int(max_size) + 1 if max_size >= 0 else sys.maxsize
+
+    return {
+        time_window: CsvData.from_counts(csv_path, counts[:row_count], time_window)
+        for time_window, counts in window_counts.items()
+    }
+
+
+def rebin_chunks(
+    csv_data: CsvData, time_window: int, coarse_windows: Iterable[int], drop_partial: bool = False
+) -> Dict[int, CsvData]:
+    """Sums the counts of consecutive time windows into coarser time windows
+
+    Outliers were already replaced at the original resolution, so the merged counts are not checked against
+    OUTLIER_EVENT_COUNT again. Each coarse window is built from the largest already built window that divides it.
+
+    Args:
+        csv_data (CsvData): Counts with a reconstruction window of time_window
+        time_window (int): Reconstruction window of csv_data (microseconds)
+        coarse_windows (Iterable[int]): Reconstruction windows to build. Must be multiples of time_window
+        drop_partial (bool, optional): Drop the last coarse window when there are not enough windows left to fill it
+
+    Returns:
+        Dict[int, CsvData]: The counts for each coarse reconstruction window
+    """
+    coarse_windows = sorted({int(coarse_window) for coarse_window in coarse_windows})
+
+    for coarse_window in coarse_windows:
+        if coarse_window <= 0 or coarse_window % time_window != 0:
+            raise ValueError(f"{coarse_window}μs is not a multiple of the {time_window}μs reconstruction window")
+
+    level_counts = {time_window: np.column_stack((csv_data.y_on, csv_data.y_off, csv_data.y_all))}
+    window_count = len(csv_data.y_all)
+    rebinned = {}
+
+    for coarse_window in coarse_windows:
+        source_window = max(window for window in level_counts if coarse_window % window == 0)
+        counts = event_chunks.merge_windows(level_counts[source_window], coarse_window // source_window)
+        level_counts[coarse_window] = counts
+
+        if drop_partial:
+            counts = counts[: window_count // (coarse_window // time_window)]
+
+        time_windows = (np.arange(len(counts)) - 1) * coarse_window * 0.000001
+        rebinned[coarse_window] = CsvData(csv_data.file_name, time_windows, counts[:, 0], counts[:, 1], counts[:, 2])
+
+    return rebinned
 
 
 def parseConfig(location: str = "plotting/config.json", data_folder=None) -> EventChunkConfig:
@@ -1,15 +1,25 @@
 import numpy as np
-from scipy import stats
-from scipy.stats import norm
 import matplotlib.pyplot as plt
 import matplotlib
 from sklearn.metrics import pairwise_distances_argmin
-from typing import Tuple, List
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 from pylab import plot, xlabel, ylabel
 from scipy import fft, arange
 import re
 
 import plotting_utils.get_plotting_data as get_plotting_data
+from plotting_utils import gaussian_fit
+
+POLARITY_COLORMAP = matplotlib.colors.ListedColormap(["r", "g"], name="polarity")
+"""Red for OFF events (0) and green for ON events (1)"""
+
+
+def polarity_color_args(polarities: np.ndarray) -> Dict[str, Any]:
+    """Keyword arguments for scatter that color events by their bool polarities with POLARITY_COLORMAP
+
+    The polarities are passed as colormap indices, so no color string or RGBA value is stored per event.
+    """
+    return {"c": polarities.view(np.int8), "cmap": POLARITY_COLORMAP, "vmin": 0, "vmax": 1}
 
 
 class FloatRangeArg(object):
@@ -56,70 +66,186 @@ def clean_line_title(label: str) -> str:
 
 
 def paddBins(hist_bins: np.ndarray, pad_bins: int):
-
-    # pad left & right
-    difference = hist_bins[1] - hist_bins[0]
-    for i in range(pad_bins):
-        hist_bins = np.insert(hist_bins, 0, hist_bins[0] - (difference * (i + 1)))
-
-    for i in range(pad_bins):
-        hist_bins = np.append(hist_bins, hist_bins[len(hist_bins) - 1] + difference * (i + 1))
-
-    return hist_bins
+    return gaussian_fit.pad_bins(hist_bins, pad_bins)
 
 
 def plot_hist(
     data: List, axes, plot_major: int, plot_minor: int, plot_color: str, log_values: bool
 ) -> matplotlib.lines.Line2D:
     """
-    Plots only the hist.
+    Plots the hist and the Gaussian fitted to it.
     """
-    y, x, _ = axes[plot_major][plot_minor].hist(
-        data, bins=100, color=plot_color, edgecolor=plot_color, linewidth=1.5, density=True
+    fit = hist_gaussian(data, axes, plot_major, plot_minor, plot_color, log_values)
+    return plot_gaussian(fit, axes[plot_major][plot_minor])
+
+
+def hist_gaussian(
+    data: List, axes, plot_major: int, plot_minor: int, plot_color: str, log_values: bool
+) -> gaussian_fit.GaussianFit:
+    """
+    Plots only the hist. The Gaussian fitted to it is returned without being plotted.
+    """
+    _, x, _ = axes[plot_major][plot_minor].hist(
+        data, bins=gaussian_fit.HIST_BINS, color=plot_color, edgecolor=plot_color, linewidth=1.5, density=True
     )
-    x = paddBins(x, 100)
 
-    (mu, sigma) = norm.fit(data)
-    y = stats.norm.pdf(x, mu, sigma)
-    accuracy = 0.002
-    if log_values:
-        accuracy = 0.00002
-    while y[0] < accuracy:
-        y = np.delete(y, 0)
-        x = np.delete(x, 0)
-    while y[len(y) - 1] < accuracy:
-        y = np.delete(y, len(y) - 1)
-        x = np.delete(x, len(x) - 1)
+    return gaussian_fit.fit_gaussian(data, log_values, x)
 
-    return axes[plot_major][plot_minor].plot(x, y, linewidth=2)[0]
 
+def plot_gaussian(fit: gaussian_fit.GaussianFit, ax) -> matplotlib.lines.Line2D:
+    return ax.plot(fit.x, fit.y, linewidth=2)[0]
 
-def find_clusters(X: np.ndarray, n_clusters: int, rseed: int = 2) -> Tuple[np.ndarray, np.ndarray]:
-    # 1. Randomly choose clusters
-    rng = np.random.RandomState(rseed)
-    i = rng.permutation(X.shape[0])[:n_clusters]
-    centers = X[i]
 
-    while True:
-        # 2a. Assign labels based on closest center
-        labels = pairwise_distances_argmin(X, centers)
+def find_clusters(
+    X: np.ndarray,
+    n_clusters: int,
+    rseed: int = 2,
+    init_centers: Optional[np.ndarray] = None,
+    batch_size: int = 0,
+    max_iter: int = 300,
+    tol: float = 1e-4,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Groups points into clusters with k-means
 
-        # 2b. Find new centers from means of points
-        new_centers = np.array([X[labels == i].mean(0) for i in range(n_clusters)])
+    Each iteration assigns a sample of the points to their closest center and moves the centers towards them. With
+    batch_size 0 the sample is every point and the centers become the means of their points (Lloyd's algorithm).
+    Otherwise the sample is batch_size random points and each center moves by a step that shrinks with the number of
+    points it has been given so far (mini-batch k-means), so an iteration costs the same however many points there are.
+
+    A center that has not been closest to any sampled point for as many samples as there are points is moved to the
+    sampled point furthest from its center, so no cluster stays empty.
+
+    Args:
+        X (np.ndarray): (N, D) points
+        n_clusters (int): Number of clusters
+        rseed (int, optional): Seed for the initial centers and the mini-batch samples
+        init_centers (Optional[np.ndarray], optional): (n_clusters, D) centers to start from instead of random points,
+                                                       e.g. the centers found for the previous time window
+        batch_size (int, optional): Points sampled per iteration. 0 uses every point
+        max_iter (int, optional): Iterations after which to stop even if the centers still move
+        tol (float, optional): Stop once no center moves further than tol times the mean variance of the points
+                               during a pass over as many samples as there are points
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (n_clusters, D) centers and the (N,) index of the closest center to each point
+    """
+    X = np.asarray(X, dtype=np.float64)
+    if X.ndim != 2:
+        raise ValueError(f"Points must be an (N, D) array, got shape {X.shape}")
+    if n_clusters < 1:
+        raise ValueError("There must be at least one cluster")
+    if batch_size < 0:
+        raise ValueError("batch_size can not be negative")
+
+    rng = np.random.RandomState(rseed)
+    n_points = X.shape[0]
+
+    if init_centers is None:
+        if n_points < n_clusters:
+            raise ValueError(f"Can not pick {n_clusters} initial centers from {n_points} points")
+        centers = X[rng.permutation(n_points)[:n_clusters]]
+    else:
+        centers = np.array(init_centers, dtype=np.float64)
+        if centers.shape != (n_clusters, X.shape[1]):
+            raise ValueError(f"init_centers must have shape {(n_clusters, X.shape[1])}, got {centers.shape}")
+
+    if n_points == 0:
+        return centers, np.empty(0, dtype=np.intp)
+
+    mini_batch = 0 < batch_size < n_points
+    threshold = tol * np.mean(np.var(X, axis=0))
+
+    # Points each center has been given, which sets the size of its mini-batch steps
+    counts = np.zeros(n_clusters, dtype=np.int64)
+    # Points sampled since each center was last the closest to one
+    idle = np.zeros(n_clusters, dtype=np.int64)
+    # Convergence is checked once per pass over as many samples as there are points, since single mini-batch steps
+    # shrink as the centers are given more points even when they are still far from the means
+    pass_centers = centers
+    sampled = 0
+
+    for _ in range(max_iter):
+        batch = X[rng.randint(0, n_points, batch_size)] if mini_batch else X
+        labels = pairwise_distances_argmin(batch, centers)
+
+        batch_counts = np.bincount(labels, minlength=n_clusters)
+        batch_sums = np.zeros_like(centers)
+        np.add.at(batch_sums, labels, batch)
+
+        if mini_batch:
+            counts += batch_counts
+        else:
+            counts = batch_counts
+
+        new_centers = centers.copy()
+        moved = batch_counts > 0
+        # Moves each center towards the mean of its new points, weighted by their share of all of its points
+        step = (batch_sums[moved] - batch_counts[moved, np.newaxis] * centers[moved]) / counts[moved, np.newaxis]
+        new_centers[moved] += step
+
+        idle += len(batch)
+        idle[moved] = 0
+        empty = np.flatnonzero(idle >= n_points)
+        if len(empty) > 0:
+            distances = np.square(batch - centers[labels]).sum(axis=1)
+            furthest = np.argsort(distances)[::-1][: len(empty)]
+            empty = empty[: len(furthest)]
+            new_centers[empty] = batch[furthest]
+            counts[empty] = 0
+            idle[empty] = 0
 
-        # 2c. Check for convergence
-        if np.all(centers == new_centers):
-            break
         centers = new_centers
+        sampled += len(batch)
+        if sampled >= n_points:
+            if np.square(centers - pass_centers).sum(axis=1).max() <= threshold:
+                break
+            pass_centers = centers
+            sampled = 0
+
+    return centers, pairwise_distances_argmin(X, centers)
+
+
+def cluster_windows(
+    windows: Iterable[np.ndarray], n_clusters: int, **kwargs
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """Clusters the points of successive time windows, starting each window from the centers of the previous one
+
+    Consecutive windows of a recording mostly hold the same objects, so the previous centers are already close and
+    only a few iterations are needed per window.
 
-    return centers, labels
+    Args:
+        windows (Iterable[np.ndarray]): (N, D) points of each window, e.g. the event coordinates
+        n_clusters (int): Number of clusters
+        **kwargs: Passed to find_clusters
+
+    Yields:
+        Tuple[np.ndarray, np.ndarray]: Centers and labels of each window
+    """
+    centers = None
+    for points in windows:
+        points = np.asarray(points)
+        if centers is None and len(points) < n_clusters:
+            # Not enough points to place the first centers yet
+            yield np.empty((0, points.shape[1])), np.full(len(points), -1, dtype=np.intp)
+            continue
+
+        centers, labels = find_clusters(points, n_clusters, init_centers=centers, **kwargs)
+        yield centers, labels
 
 
-def plotKmeans(data, axes, row: int, columnIndex: int, numberOfCenters: int):
+def plotKmeans(
+    data, axes, row: int, columnIndex: int, numberOfCenters: int, init_centers: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Scatters the points colored by cluster with the centers in red
+
+    Returns:
+        np.ndarray: The centers, which can be passed as init_centers when plotting the next time window
+    """
     pts = np.asarray(data)
-    centers, labels = find_clusters(pts, numberOfCenters)
+    centers, labels = find_clusters(pts, numberOfCenters, init_centers=init_centers)
     axes[row][columnIndex].scatter(pts[:, 0], pts[:, 1], c=labels, s=10, cmap="viridis")
     axes[row][columnIndex].scatter(centers[:, 0], centers[:, 1], c="red")
+    return centers
 
 
 def centerAllGuas(
@@ -131,71 +257,67 @@ def centerAllGuas(
     config: get_plotting_data.EventChunkConfig,
     smart_shifting: bool = False,
 ):
+    """Plots the Gaussians with their peaks lined up. Polarized lines go on the left and non-polarized on the right
+
+    Each side is scaled so its highest line peaks at 1. The x data of the lines is replaced with the centered curves.
+    """
     labels_copy = np.copy(labels)
+    no_polarizer = np.array(["NoPolarizer" in label for label in labels_copy], dtype=bool)
 
-    max_height_pol = 0  # Get the largest y value in all the polarized lines
-    max_height_nopol = 0  # Get the largest y value in all the non-polarized lines
+    x, y = gaussian_fit.stack_curves([line.get_xdata() for line in lines], [line.get_ydata(0) for line in lines])
+    peaks = np.nanargmax(y, axis=1) if len(lines) > 0 else np.empty(0, dtype=np.int64)
 
-    # TODO: see if getting raw y_data (get_ydata(1)) is useful
-
-    for i, line in enumerate(lines):
-        if "NoPolarizer" in labels_copy[i]:
-            if np.max(line.get_ydata(0)) > max_height_nopol:
-                max_height_nopol = np.max(line.get_ydata(0))
-        else:
-            if np.max(line.get_ydata(0)) > max_height_pol:
-                max_height_pol = np.max(line.get_ydata(0))
-
-    for i, line in enumerate(lines):
-        max_y = np.max(line.get_ydata(0))
-        index = np.where(line.get_ydata(0) == max_y)
-        offset = line.get_xdata()[index[0][0]]
-        row = 0
+    # How much further than the peak each line is shifted
+    extra_offsets = np.zeros(len(lines))
 
+    for i, label in enumerate(labels_copy):
         if smart_shifting:
             # TODO: fine control for automatic centering not working
-            if line.get_ydata(0)[index[0][0] - 1] > offset:
-                diff_low = line.get_xdata()[index[0][0] - 1] - offset
+            peak = peaks[i]
+            offset = x[i, peak]
+
+            if y[i, peak - 1] > offset:
+                diff_low = x[i, peak - 1] - offset
             else:
-                diff_low = offset - line.get_xdata()[index[0][0] - 1]
+                diff_low = offset - x[i, peak - 1]
 
-            if line.get_ydata(0)[index[0][0] + 1] > offset:
-                diff_high = line.get_xdata()[index[0][0] - 1] + offset
+            if y[i, peak + 1] > offset:
+                diff_high = x[i, peak - 1] + offset
             else:
-                diff_high = offset - line.get_xdata()[index[0][0] + 1]
+                diff_high = offset - x[i, peak + 1]
 
             if diff_high > diff_low:
-                offset = offset + (offset - diff_high) / 2
+                extra_offsets[i] = (offset - diff_high) / 2
             else:
-                offset = offset - (offset - diff_low) / 2
+                extra_offsets[i] = -(offset - diff_low) / 2
         else:
             # FIXME: manual shifting for now
-            if "NoPolarizer" in labels_copy[i]:
-                if "burst" in labels_copy[i]:
-                    offset = offset + 1.0
-                elif "sine" in labels_copy[i]:
-                    offset = offset - 2.0
+            if no_polarizer[i]:
+                if "burst" in label:
+                    extra_offsets[i] = 1.0
+                elif "sine" in label:
+                    extra_offsets[i] = -2.0
             else:
-                if "triangle" in labels_copy[i]:
-                    offset = offset + 0.7
-                elif "burst" in labels_copy[i]:
-                    offset = offset + 0.5
+                if "triangle" in label:
+                    extra_offsets[i] = 0.7
+                elif "burst" in label:
+                    extra_offsets[i] = 0.5
 
-        for j in range(len(line.get_xdata())):
-            line.get_xdata()[j] = line.get_xdata()[j] - offset
+    x = gaussian_fit.center_peaks(x, y, extra_offsets)
+    normalized_y = gaussian_fit.normalize_groups(y, no_polarizer)
+
+    for i, line in enumerate(lines):
+        points = slice(0, len(line.get_xdata()))
+        line.set_xdata(x[i, points])
 
         labels_copy[i] = clean_line_title(labels_copy[i])
+        row = 0
 
-        if "NoPolarizer" in labels_copy[i]:
+        if no_polarizer[i]:
             row = 1
             labels_copy[i] = labels_copy[i].replace(" NoPolarizer", "")
-            axes[axes_index][row].plot(
-                line.get_xdata(), line.get_ydata(0) / max_height_nopol, label=labels_copy[i].capitalize()
-            )
-        else:
-            axes[axes_index][row].plot(
-                line.get_xdata(), line.get_ydata(0) / max_height_pol, label=labels_copy[i].capitalize()
-            )
+
+        axes[axes_index][row].plot(x[i, points], normalized_y[i, points], label=labels_copy[i].capitalize())
 
     axes[axes_index][1].title.set_text("Non-Polarized " + title)
     axes[axes_index][0].title.set_text("Polarized " + title)
@@ -214,27 +336,29 @@ def showAllGuas(
     axes: np.ndarray,
     config: get_plotting_data.EventChunkConfig,
 ):
+    """Plots the Gaussians shifted to start at (0, 0). Polarized lines go on the left and non-polarized on the right
+
+    All lines are scaled by the highest point of the lines before shifting. The data of the lines is replaced with the
+    shifted curves.
+    """
     labels_copy = np.copy(labels)
-    max_height = 0
 
-    for line in lines:
-        if np.max(line.get_ydata(0)) > max_height:
-            max_height = np.max(line.get_ydata(0))
+    x, y = gaussian_fit.stack_curves([line.get_xdata() for line in lines], [line.get_ydata(0) for line in lines])
+    max_height = max(np.nanmax(y), 0) if len(lines) > 0 else 0
+
+    x, y = gaussian_fit.align_starts(x, y)
 
     for i, line in enumerate(lines):
-        shift_x = line.get_xdata()[0]
-        for j, x in enumerate(line.get_xdata()):
-            line.get_xdata()[j] = x - shift_x
-        shift_y = line.get_ydata(0)[0]
-        for j, y in enumerate(line.get_ydata()):
-            line.get_ydata(0)[j] = y - shift_y
+        points = slice(0, len(line.get_xdata()))
+        line.set_data(x[i, points], y[i, points])
+
         row = 0
         if "NoPolarizer" in labels_copy[i]:
             labels_copy[i] = labels_copy[i].replace(" NoPolarizer", "")
             row = 1
 
         labels_copy[i] = clean_line_title(labels_copy[i])
-        axes[axes_index][row].plot(line.get_xdata(), line.get_ydata(0) / max_height, label=labels_copy[i])
+        axes[axes_index][row].plot(x[i, points], y[i, points] / max_height, label=labels_copy[i])
 
     axes[axes_index][1].title.set_text("Non-Polarized " + title)
     axes[axes_index][0].title.set_text("Polarized " + title)
@@ -0,0 +1,257 @@
+"""
+Disk cache for arrays derived from recordings.
+
+Each entry is an .npz file named after a hash of the source file's fingerprint, the name of the function that
+produced it and the parameters it was called with, so a changed CSV or different settings never return stale results.
+The cache is bounded in size: when it grows past max_bytes the least recently used entries are removed.
+"""
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import numpy as np
+
+from plotting_utils.event_store import source_signature
+
+CACHE_VERSION = 1
+"""Bump to invalidate every entry when the format of cached results changes"""
+
+DEFAULT_CACHE_DIR = os.path.join("results", "cache")
+DEFAULT_MAX_BYTES = 1 << 30
+ENTRY_SUFFIX = ".npz"
+HASH_BLOCK_SIZE = 1 << 20
+
+CachedArrays = Dict[str, np.ndarray]
+T = TypeVar("T")
+
+
+def file_fingerprint(file_path: str, hash_contents: bool = False) -> Dict[str, Any]:
+    """Identifies a version of a file
+
+    Args:
+        file_path (str): File to fingerprint
+        hash_contents (bool, optional): Use the SHA-256 of the contents, which survives copies and touched modification
+                                        times. Otherwise the absolute path, size and modification time are used
+
+    Returns:
+        Dict[str, Any]: JSON serializable fingerprint
+    """
+    if not hash_contents:
+        return {"path": os.path.abspath(file_path), **source_signature(file_path)}
+
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+
+    return {"sha256": digest.hexdigest()}
+
+
+class ResultCache:
+    """Size-bounded LRU cache of arrays on disk
+
+    Instances can be sent to worker processes. Each process counts its own hits and misses, which can be combined with
+    add_counters.
+    """
+
+    cache_dir: str
+    max_bytes: int
+    hash_contents: bool
+    """Fingerprint source files by their contents instead of their size and modification time"""
+
+    hits: int
+    misses: int
+    evictions: int
+
+    def __init__(
+        self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES, hash_contents: bool = False
+    ):
+        if max_bytes <= 0:
+            raise ValueError(f"The cache size must be positive, not {max_bytes}")
+
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hash_contents = hash_contents
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__total_bytes: Optional[int] = None
+
+    @property
+    def counters(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def add_counters(self, counters: Dict[str, int]):
+        """Adds the counters of another instance, e.g. one that was used in a worker process"""
+        self.hits += counters["hits"]
+        self.misses += counters["misses"]
+        self.evictions += counters["evictions"]
+
+    def key(self, source_file: str, function_name: str, params: Dict[str, Any]) -> str:
+        """Hash identifying the result of function_name called with params on the current version of source_file"""
+        key_data = {
+            "version": CACHE_VERSION,
+            "source": file_fingerprint(source_file, self.hash_contents),
+            "function": function_name,
+            "params": params,
+        }
+
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode()).hexdigest()
+
+    def entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ENTRY_SUFFIX)
+
+    def get(self, key: str) -> Optional[CachedArrays]:
+        """Loads an entry and marks it as recently used
+
+        Returns:
+            Optional[CachedArrays]: None if there is no readable entry for key
+        """
+        entry_path = self.entry_path(key)
+
+        try:
+            with np.load(entry_path, allow_pickle=False) as entry:
+                arrays = {name: entry[name] for name in entry.files}
+            os.utime(entry_path)
+        except (OSError, ValueError, zipfile.BadZipFile):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return arrays
+
+    def put(self, key: str, arrays: CachedArrays):
+        """Saves an entry, then removes the least recently used entries if the cache is too large
+
+        The cache is only an optimization, so entries that can not be written are skipped.
+        """
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+            # Write under a temporary name first so a reader never sees a half written entry
+            fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=ENTRY_SUFFIX, dir=self.cache_dir)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(f, **arrays)
+                entry_size = os.path.getsize(temp_path)
+                os.replace(temp_path, self.entry_path(key))
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        except OSError:
+            return
+
+        if self.__total_bytes is None:
+            self.__total_bytes = sum(size for _, _, size in self.__entries())
+        else:
+            self.__total_bytes += entry_size
+
+        if self.__total_bytes > self.max_bytes:
+            self.evict()
+
+    def get_or_compute(
+        self, source_file: str, function_name: str, params: Dict[str, Any], compute: Callable[[], CachedArrays]
+    ) -> CachedArrays:
+        """Returns the cached result of compute, calling it and caching the result on a miss"""
+        key = self.key(source_file, function_name, params)
+        arrays = self.get(key)
+
+        if arrays is None:
+            arrays = compute()
+            self.put(key, arrays)
+
+        return arrays
+
+    def evict(self):
+        """Removes the least recently used entries until the cache is no larger than max_bytes"""
+        entries = sorted(self.__entries())
+        total_bytes = sum(size for _, _, size in entries)
+
+        for _, entry_path, size in entries:
+            if total_bytes <= self.max_bytes:
+                break
+
+            try:
+                os.remove(entry_path)
+                self.evictions += 1
+            except FileNotFoundError:  # Already evicted by another process
+                pass
+            total_bytes -= size
+
+        self.__total_bytes = total_bytes
+
+    def clear(self):
+        for _, entry_path, _ in self.__entries():
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+
+        self.__total_bytes = 0
+
+    def __entries(self) -> List[Tuple[int, str, int]]:
+        """Last use time, path and size of every entry"""
+        try:
+            dir_entries = list(os.scandir(self.cache_dir))
+        except FileNotFoundError:
+            return []
+
+        entries = []
+        for dir_entry in dir_entries:
+            if not dir_entry.name.endswith(ENTRY_SUFFIX) or dir_entry.name.startswith(".tmp-"):
+                continue
+
+            try:
+                stat = dir_entry.stat()
+            except FileNotFoundError:
+                continue
+
+            entries.append((stat.st_mtime_ns, dir_entry.path, stat.st_size))
+
+        return entries
+
+
+def call_counted(
+    cache: ResultCache, function: Callable[..., T], /, *args: Any, **kwargs: Any
+) -> Tuple[T, Dict[str, int]]:
+    """Calls function, also returning how much each counter of cache changed during the call
+
+    Used to run functions that take a cache in worker processes, where the counters of the worker's copy of the cache
+    would be lost otherwise. Add the returned counters to the original cache with add_counters.
+    """
+    before = cache.counters
+    result = function(*args, **kwargs)
+
+    return result, {name: count - before[name] for name, count in cache.counters.items()}
+
+
+def add_cache_args(parser: argparse.ArgumentParser):
+    """Adds the --cache_dir, --cache_size and --no_cache arguments read by cache_from_args"""
+    parser.add_argument(
+        "--cache_dir", type=str, default=DEFAULT_CACHE_DIR, help="Directory results derived from the CSVs are cached in"
+    )
+    parser.add_argument(
+        "--cache_size", type=int, default=DEFAULT_MAX_BYTES >> 20, help="Maximum size of the cache (MiB)"
+    )
+    parser.add_argument("--no_cache", action="store_true", help="Always read the CSVs instead of using the cache")
+
+
+def check_cache_args(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    if args.cache_size <= 0:
+        parser.error(f"argument --cache_size: invalid value: {args.cache_size} (must be greater than 0)")
+
+
+def cache_from_args(args: argparse.Namespace) -> Optional[ResultCache]:
+    """Creates the cache described by the arguments added with add_cache_args. None if --no_cache is set"""
+    if args.no_cache:
+        return None
+
+    return ResultCache(args.cache_dir, args.cache_size << 20)
+
+
+def format_counters(cache: ResultCache) -> str:
+    return f"Cache: {cache.hits} hits, {cache.misses} misses, {cache.evictions} evictions"
@@ -0,0 +1,135 @@
+"""
+Pixel index for region-of-interest queries on an EventStore.
+
+Event indices are grouped by pixel in a CSR layout: the events of pixel (x, y) are order[indptr[p]:indptr[p + 1]] with
+p = x * GRID_SIZE + y, in file order. A query for the square around a pixel only reads the runs of the pixels inside
+the square instead of testing every event in the recording. The index is saved inside the store directory, so it is
+discarded together with the store when the CSV changes.
+"""
+import os
+import tempfile
+from typing import List, Optional
+
+import numpy as np
+
+from plotting_utils.event_store import EventStore
+
+GRID_SIZE = 256  # X and Y positions are stored as uint8
+INDPTR_FILE = "roi_indptr.npy"
+ORDER_FILE = "roi_order.npy"
+
+
+class RoiIndex:
+    """Event indices of a recording grouped by pixel"""
+
+    indptr: np.ndarray
+    """Start of each pixel's run in order. Has GRID_SIZE * GRID_SIZE + 1 entries"""
+
+    order: np.ndarray
+    """Event indices sorted by pixel, then by position in the file"""
+
+    def __init__(self, indptr: np.ndarray, order: np.ndarray):
+        self.indptr = indptr
+        self.order = order
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def query(self, pixel_x: int, pixel_y: int, area_size: int, start: int = 0, end: int = -1) -> np.ndarray:
+        """Finds the events inside of a square area around a pixel
+
+        Matches the events where abs(x - pixel_x) < area_size and abs(y - pixel_y) < area_size.
+
+        Args:
+            pixel_x (int): X position of the center pixel
+            pixel_y (int): Y position of the center pixel, as stored in the EventStore
+            area_size (int): Distance from the center pixel the area extends to (exclusive)
+            start (int, optional): Only return events with an index of at least start
+            end (int, optional): Only return events with an index below end. -1 for no limit
+
+        Returns:
+            np.ndarray: Sorted event indices
+        """
+        end = len(self.order) if end < 0 else end
+
+        x_range = np.arange(max(pixel_x - area_size + 1, 0), min(pixel_x + area_size, GRID_SIZE))
+        y_first = max(pixel_y - area_size + 1, 0)
+        y_last = min(pixel_y + area_size, GRID_SIZE) - 1
+
+        if len(x_range) == 0 or y_first > y_last or start >= end:
+            return np.empty(0, dtype=np.int64)
+
+        runs: List[np.ndarray] = []
+        if start <= 0 and end >= len(self.order):
+            # The pixels of one column of the area are next to each other, so each column is a single run
+            run_starts = self.indptr[x_range * GRID_SIZE + y_first]
+            run_ends = self.indptr[x_range * GRID_SIZE + y_last + 1]
+            runs = [self.order[run_start:run_end] for run_start, run_end in zip(run_starts, run_ends)]
+        else:
+            # Each pixel's run is in file order, so the part inside [start, end) can be found by bisection
+            pixels = (x_range[:, np.newaxis] * GRID_SIZE + np.arange(y_first, y_last + 1)).ravel()
+            run_starts = self.indptr[pixels]
+            run_ends = self.indptr[pixels + 1]
+            nonempty = run_starts < run_ends
+            for run_start, run_end in zip(run_starts[nonempty], run_ends[nonempty]):
+                run = self.order[run_start:run_end]
+                in_range = slice(np.searchsorted(run, start), np.searchsorted(run, end))
+                runs.append(run[in_range])
+
+        return np.sort(np.concatenate(runs)) if runs else np.empty(0, dtype=np.int64)
+
+    def save(self, store_dir: str):
+        # Write each file under a temporary name first so a reader never sees a half written index
+        for file_name, array in ((ORDER_FILE, self.order), (INDPTR_FILE, self.indptr)):
+            fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".npy", dir=store_dir)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.save(f, array)
+                os.replace(temp_path, os.path.join(store_dir, file_name))
+            except BaseException:
+                os.remove(temp_path)
+                raise
+
+    @staticmethod
+    def open(store: EventStore) -> Optional["RoiIndex"]:
+        """Opens the index saved in a store
+
+        Returns:
+            Optional[RoiIndex]: None if the store does not have an index yet
+        """
+        try:
+            indptr = np.load(os.path.join(store.store_dir, INDPTR_FILE), mmap_mode="r")
+            order = np.load(os.path.join(store.store_dir, ORDER_FILE), mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+
+        if len(indptr) != GRID_SIZE * GRID_SIZE + 1 or len(order) != len(store):
+            return None
+
+        return RoiIndex(indptr, order)
+
+    @staticmethod
+    def build(x_positions: np.ndarray, y_positions: np.ndarray) -> "RoiIndex":
+        pixels = x_positions.astype(np.int64) * GRID_SIZE + y_positions
+
+        indptr = np.zeros(GRID_SIZE * GRID_SIZE + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pixels, minlength=GRID_SIZE * GRID_SIZE), out=indptr[1:])
+
+        # A stable sort keeps the events of each pixel in file order
+        return RoiIndex(indptr, np.argsort(pixels, kind="stable").astype(np.int64))
+
+    @staticmethod
+    def open_or_build(store: EventStore) -> "RoiIndex":
+        """Opens the index saved in a store, building and saving it first if it is missing"""
+        index = RoiIndex.open(store)
+
+        if index is None:
+            index = RoiIndex.build(store.x_positions, store.y_positions)
+
+            # The index is only an optimization. Carry on without saving it if the data folder is read only
+            try:
+                index.save(store.store_dir)
+            except OSError:
+                pass
+
+        return index
@@ -0,0 +1,87 @@
+"""
+Record of the files a script has processed, so a rerun only processes the files that are new or changed.
+
+For every source file the manifest keeps its fingerprint, the settings it was processed with and the artifacts that
+were produced from it (figures, saved per-file results). An entry is current while the file is unchanged, the settings
+are the same and every artifact still exists.
+"""
+import json
+import os
+import tempfile
+from typing import Any, Dict, Iterable, Optional
+
+from plotting_utils.result_cache import file_fingerprint
+
+MANIFEST_VERSION = 1
+
+
+class RunManifest:
+    """Per-file entries of a manifest file. Changes are only written by save"""
+
+    manifest_path: str
+    entries: Dict[str, Dict[str, Any]]
+    """Fingerprint, settings and artifacts of each source file, keyed by its absolute path"""
+
+    def __init__(self, manifest_path: str, entries: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.manifest_path = manifest_path
+        self.entries = entries if entries is not None else {}
+
+    @staticmethod
+    def load(manifest_path: str) -> "RunManifest":
+        """Reads a manifest. A missing, unreadable or outdated manifest gives an empty one"""
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return RunManifest(manifest_path)
+
+        if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+            return RunManifest(manifest_path)
+
+        return RunManifest(manifest_path, manifest["files"])
+
+    def is_current(self, source_file: str, params: Dict[str, Any]) -> bool:
+        """Whether source_file was processed with params since it last changed and its artifacts still exist"""
+        entry = self.entries.get(os.path.abspath(source_file))
+
+        if entry is None or entry["params"] != params:
+            return False
+
+        try:
+            if entry["fingerprint"] != file_fingerprint(source_file):
+                return False
+        except OSError:
+            return False
+
+        return all(os.path.exists(artifact) for artifact in entry["artifacts"].values())
+
+    def artifacts(self, source_file: str) -> Dict[str, str]:
+        """Paths of the artifacts recorded for source_file by name"""
+        return self.entries[os.path.abspath(source_file)]["artifacts"]
+
+    def record(self, source_file: str, params: Dict[str, Any], artifacts: Dict[str, str]):
+        """Records that source_file was processed with params. Call after the artifacts have been written"""
+        self.entries[os.path.abspath(source_file)] = {
+            "fingerprint": file_fingerprint(source_file),
+            "params": params,
+            "artifacts": artifacts,
+        }
+
+    def prune(self, source_files: Iterable[str]):
+        """Removes the entries of every file not in source_files, e.g. recordings that were deleted"""
+        keep = {os.path.abspath(source_file) for source_file in source_files}
+        self.entries = {source: entry for source, entry in self.entries.items() if source in keep}
+
+    def save(self):
+        manifest_dir = os.path.dirname(self.manifest_path) or "."
+        os.makedirs(manifest_dir, exist_ok=True)
+
+        # Write under a temporary name first so an interrupted run does not leave a broken manifest
+        fd, temp_path = tempfile.mkstemp(prefix=".tmp-", suffix=".json", dir=manifest_dir)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"version": MANIFEST_VERSION, "files": self.entries}, f, indent=2, sort_keys=True)
+            os.replace(temp_path, self.manifest_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
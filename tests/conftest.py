@@ -0,0 +1,22 @@
+import importlib.util
+import os
+import sys
+
+import pytest
+
+# The image processing scripts import pymeanshift at module level. Without it, a stand-in is put on the path so the
+# code that does not segment images can still be tested. Worker processes inherit sys.path, so they find it too
+if importlib.util.find_spec("pymeanshift") is None:
+    sys.path.append(os.path.join(os.path.dirname(__file__), "stubs"))
+
+
+@pytest.fixture
+def write_chunk_csv():
+    """Writes rows of on, off and all counts to an event chunks CSV"""
+
+    def write(path, counts):
+        with open(path, "w") as f:
+            f.write("On Count,Off Count,All Count\n")
+            f.write("\n".join(",".join(str(count) for count in row) for row in counts))
+
+    return write
@@ -0,0 +1,125 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import batch_process
+from decoded_image import SharedDecodedImage
+
+
+def gray_sum_stage(image):
+    return int(image.gray.sum())
+
+
+def color_sum_stage(image):
+    return int(image.bgr.astype(np.int64).sum())
+
+
+def failing_stage(image):
+    if image.gray[0, 0] == 0:
+        raise RuntimeError("stage failed")
+    return 0
+
+
+def finish_sums(image_name, image, stage_results, save_directory):
+    with open(os.path.join(save_directory, f"{image_name}.txt"), "w") as f:
+        f.write(str(sorted(stage_results.items())))
+
+    return float(stage_results.get("gray", 0) - stage_results.get("color", 0) + image.gray_float.sum())
+
+
+@pytest.fixture
+def image_paths(tmp_path):
+    rng = np.random.default_rng(0)
+    paths = []
+
+    for i in range(5):
+        path = os.path.join(tmp_path, f"image_{i}.png")
+        image = rng.integers(1, 256, (16 + i, 24, 3), dtype=np.uint8)
+        # The failing stage fails for the odd images
+        image[0, 0] = 0 if i % 2 else 255
+        cv2.imwrite(path, image)
+        paths.append(path)
+
+    return paths
+
+
+@pytest.fixture
+def created_handles(monkeypatch):
+    """Handles of every shared image the scheduler creates"""
+    handles = []
+    create = SharedDecodedImage.create
+
+    def recording_create(image):
+        shared = create(image)
+        handles.append(shared.handle)
+        return shared
+
+    monkeypatch.setattr(SharedDecodedImage, "create", staticmethod(recording_create))
+    return handles
+
+
+def assert_unlinked(handles):
+    for handle in handles:
+        for name, _, _ in handle:
+            with pytest.raises(FileNotFoundError):
+                SharedDecodedImage.attach(((name, (1,), "|u1"),))
+
+
+@pytest.mark.parametrize("stages", [{}, {"gray": gray_sum_stage, "color": color_sum_stage}])
+def test_pool_matches_sequential(tmp_path, image_paths, created_handles, stages):
+    algorithm = (stages, finish_sums)
+    sequential_directory = tmp_path / "sequential"
+    pool_directory = tmp_path / "pool"
+    sequential_directory.mkdir()
+    pool_directory.mkdir()
+
+    sequential = batch_process.process_images(algorithm, image_paths, str(sequential_directory), jobs=1)
+    pooled = batch_process.process_images(algorithm, image_paths, str(pool_directory), jobs=3)
+
+    assert [result[0] for result in pooled] == image_paths
+    assert [result[2] for result in pooled] == [result[2] for result in sequential]
+    assert all(result[3] is None for result in pooled)
+    for image_path in image_paths:
+        output = f"{batch_process.image_name_of(image_path)}.txt"
+        assert (pool_directory / output).read_text() == (sequential_directory / output).read_text()
+
+    assert len(created_handles) == len(image_paths)
+    assert_unlinked(created_handles)
+
+
+def test_failed_stage_is_recorded(tmp_path, image_paths, created_handles):
+    algorithm = ({"gray": gray_sum_stage, "fails": failing_stage}, finish_sums)
+    unreadable_path = os.path.join(tmp_path, "unreadable.png")
+    with open(unreadable_path, "w") as f:
+        f.write("not an image")
+
+    results = batch_process.process_images(algorithm, image_paths + [unreadable_path], str(tmp_path), jobs=2)
+
+    for i, (image_path, _, value, error) in enumerate(results[:-1]):
+        if i % 2:
+            assert value is None and error == "RuntimeError: stage failed"
+            # The images with a failed stage are never finished
+            assert not os.path.exists(os.path.join(tmp_path, f"{batch_process.image_name_of(image_path)}.txt"))
+        else:
+            assert value is not None and error is None
+
+    assert results[-1][0] == unreadable_path and results[-1][3].startswith("ValueError")
+    assert len(created_handles) == len(image_paths)
+    assert_unlinked(created_handles)
+
+
+def test_save_results(tmp_path):
+    results = [("a.png", 1.5, 2.0, None), ("b.png", 0.25, None, "RuntimeError: stage failed")]
+    results_path = os.path.join(tmp_path, batch_process.RESULTS_FILE)
+
+    batch_process.save_results(results, results_path, "Local Entropy")
+
+    with open(results_path) as f:
+        assert f.read().splitlines() == [
+            "File Name,Seconds,Status,Local Entropy,Error",
+            "a.png,1.500,ok,2.0,",
+            'b.png,0.250,FAILED,,"RuntimeError: stage failed"',
+        ]
+    assert os.listdir(tmp_path) == [batch_process.RESULTS_FILE]
@@ -0,0 +1,88 @@
+import csv
+import json
+import math
+import os
+
+import numpy as np
+import pytest
+from scipy.stats import norm
+
+from plotting_utils import chunk_stats
+from plotting_utils.chunk_stats import ChunkStats
+from plotting_utils.get_plotting_data import EventChunkConfig
+
+
+@pytest.mark.parametrize(
+    "file_path,expected",
+    [
+        (
+            "burst-400mV-1hz-15min-30deg Event Chunks.csv",
+            {"waveform": "burst", "frequency_hz": 1, "voltage_v": 0.4, "degrees": 30, "polarizer": True},
+        ),
+        (
+            os.path.join("20hz", "sine-nopol-m1Threshold-2sl.csv"),
+            {"waveform": "sine", "frequency_hz": 20, "threshold": -1, "slots": 2, "polarizer": False},
+        ),
+        ("whiteFoam.csv", {"waveform": None, "frequency_hz": None, "degrees": None, "polarizer": True}),
+    ],
+)
+def test_parse_file_metadata(file_path, expected):
+    metadata = chunk_stats.parse_file_metadata(file_path)
+
+    assert list(metadata) == chunk_stats.METADATA_FIELDS
+    assert {field: metadata[field] for field in expected} == expected
+
+
+def test_count_stats_matches_norm_fit():
+    counts = np.random.default_rng(0).integers(0, 500, 1000)
+    mu, sigma = norm.fit(counts)
+
+    stats = chunk_stats.count_stats(counts, 2.355)
+
+    assert stats["mu"] == pytest.approx(mu)
+    assert stats["sigma"] == pytest.approx(sigma)
+    assert stats["variance"] == pytest.approx(np.var(counts))
+    assert stats["fwhm"] == pytest.approx(2.355 * np.std(counts))
+
+
+def test_count_stats_empty():
+    assert all(math.isnan(value) for value in chunk_stats.count_stats(np.empty(0)).values())
+
+
+def test_chunk_stats_from_csv(tmp_path, write_chunk_csv):
+    os.makedirs(os.path.join(tmp_path, "sine 10hz"))
+    csv_path = os.path.join(tmp_path, "sine 10hz", "sine-30deg.csv")
+    write_chunk_csv(csv_path, [[1, 2, 3], [3, 4, 7], [5, 6, 11]])
+
+    stats = ChunkStats.from_csv(csv_path, EventChunkConfig(reconstruction_window=500), str(tmp_path))
+    row = stats.to_row()
+
+    assert list(row) == chunk_stats.STATS_FIELDS
+    assert row["file"] == os.path.join("sine 10hz", "sine-30deg.csv")
+    assert (row["waveform"], row["frequency_hz"], row["degrees"], row["windows"]) == ("sine", 10, 30, 3)
+    assert row["on_mu"] == pytest.approx(3)
+    assert row["all_variance"] == pytest.approx(np.var([3, 7, 11]))
+
+
+def make_stats(file, counts):
+    stats = {event_type: chunk_stats.count_stats(counts) for event_type in chunk_stats.EVENT_TYPES}
+    return ChunkStats(file, chunk_stats.parse_file_metadata(file), len(counts), stats)
+
+
+def test_write_stats(tmp_path):
+    stats = [make_stats("a.csv", [1, 3]), make_stats("b.csv", [])]
+
+    chunk_stats.write_stats(stats, os.path.join(tmp_path, "stats.csv"))
+    chunk_stats.write_stats(stats, os.path.join(tmp_path, "stats.json"))
+
+    with open(os.path.join(tmp_path, "stats.csv"), newline="") as f:
+        csv_rows = list(csv.DictReader(f))
+    with open(os.path.join(tmp_path, "stats.json")) as f:
+        json_rows = json.load(f)
+
+    assert [row["file"] for row in csv_rows] == [row["file"] for row in json_rows] == ["a.csv", "b.csv"]
+    assert float(csv_rows[0]["off_mu"]) == json_rows[0]["off_mu"] == 2
+    assert json_rows[1]["off_mu"] is None
+
+    with pytest.raises(ValueError, match="Unknown stats file type"):
+        chunk_stats.write_stats(stats, os.path.join(tmp_path, "stats.txt"))
@@ -0,0 +1,86 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pytest
+
+import decoded_image
+from decoded_image import DecodedImage, SharedDecodedImage
+
+
+@pytest.fixture
+def image():
+    return DecodedImage.from_bgr(np.random.default_rng(0).integers(0, 256, (21, 34, 3), dtype=np.uint8))
+
+
+def read_attached(handle):
+    """Copies the arrays of a shared image in a worker process"""
+    with SharedDecodedImage.attach(handle) as shared:
+        return [np.array(getattr(shared.image, name)) for name in decoded_image.ARRAY_NAMES]
+
+
+def assert_unlinked(handle):
+    for name, _, _ in handle:
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=name)
+
+
+def test_attach_in_worker(image):
+    shared = SharedDecodedImage.create(image)
+    handle = shared.handle
+    try:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            arrays = executor.submit(read_attached, handle).result()
+    finally:
+        shared.unlink()
+
+    for name, array in zip(decoded_image.ARRAY_NAMES, arrays):
+        expected = getattr(image, name)
+        assert array.dtype == expected.dtype
+        assert np.array_equal(array, expected)
+
+    assert_unlinked(handle)
+
+
+def test_attach_shares_memory(image):
+    shared = SharedDecodedImage.create(image)
+    try:
+        with SharedDecodedImage.attach(shared.handle) as attached:
+            attached.image.gray[0, 0] = 255 - shared.image.gray[0, 0]
+            assert attached.image.gray[0, 0] == shared.image.gray[0, 0]
+
+        assert attached.image is None
+    finally:
+        shared.unlink()
+
+    with pytest.raises(ValueError):
+        shared.handle
+
+
+def test_create_cleans_up_when_it_fails(image, monkeypatch):
+    created = []
+
+    class FailingSharedMemory(SharedMemory):
+        """Fails to create the last block"""
+
+        def __init__(self, *args, **kwargs):
+            if len(created) == len(decoded_image.ARRAY_NAMES) - 1:
+                raise OSError("No space left on device")
+            super().__init__(*args, **kwargs)
+            created.append(self.name)
+
+    monkeypatch.setattr(decoded_image, "SharedMemory", FailingSharedMemory)
+
+    with pytest.raises(OSError):
+        SharedDecodedImage.create(image)
+
+    assert len(created) == len(decoded_image.ARRAY_NAMES) - 1
+    assert_unlinked([(name, None, None) for name in created])
+
+
+def test_read_fails_for_other_files(tmp_path):
+    path = tmp_path / "not_an_image.png"
+    path.write_text("On/Off,X,Y,Timestamp\n")
+
+    with pytest.raises(ValueError):
+        DecodedImage.read(str(path))
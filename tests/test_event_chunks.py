@@ -0,0 +1,155 @@
+import os
+import shutil
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from plotting_utils import event_chunks, get_plotting_data
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = os.path.join(tmp_path, "OnOff-X-Y-Timestamp.csv")
+    shutil.copy("tests/test_data/OnOff-X-Y-Timestamp.csv", path)
+    return path
+
+
+def test_count_window():
+    polarities = np.array([True, False, False, True, True, False])
+    timestamps = np.array([0, 4, 5, 9, 21, 24])
+
+    counts = event_chunks.count_window(polarities, timestamps, 5)
+
+    assert counts.tolist() == [[1, 1, 2], [1, 1, 2], [0, 0, 0], [0, 0, 0], [1, 1, 2]]
+
+
+def test_merge_windows_ragged_tail():
+    counts = np.arange(15).reshape(5, 3)
+
+    assert event_chunks.merge_windows(counts, 2).tolist() == [[3, 5, 7], [15, 17, 19], [12, 13, 14]]
+    assert event_chunks.merge_windows(counts, 1).tolist() == counts.tolist()
+
+    with pytest.raises(ValueError):
+        event_chunks.merge_windows(counts, 0)
+
+
+@pytest.mark.parametrize("time_windows", [[250, 500, 750, 1500], [300, 7], [1000]])
+def test_count_windows_matches_single_windows(time_windows):
+    rng = np.random.default_rng(0)
+    timestamps = np.sort(rng.integers(0, 100_000, 10_000))
+    polarities = rng.random(10_000) < 0.5
+
+    window_counts = event_chunks.count_windows(polarities, timestamps, time_windows)
+
+    assert sorted(window_counts) == sorted(time_windows)
+    for time_window, counts in window_counts.items():
+        assert counts.tolist() == event_chunks.count_window(polarities, timestamps, time_window).tolist()
+
+
+@pytest.mark.parametrize("time_windows", [[250, 500, 750, 1500], [300, 7], [997, 991, 983]])
+def test_count_row_blocks_matches_count_windows(time_windows):
+    rng = np.random.default_rng(0)
+    timestamps = 478504058 + np.sort(rng.integers(0, 100_000, 10_000))
+    polarities = rng.random(10_000) < 0.5
+    rows = np.column_stack((np.where(polarities, 1, -1), np.zeros((10_000, 2), dtype=np.int64), timestamps))
+
+    window_counts = event_chunks.count_row_blocks(np.array_split(rows, 7), time_windows)
+    expected = event_chunks.count_windows(polarities, timestamps - timestamps[0], time_windows)
+
+    for time_window in time_windows:
+        assert window_counts[time_window].tolist() == expected[time_window].tolist()
+
+
+def test_count_row_blocks_rejects_unsorted_timestamps():
+    rows = np.array([[1, 0, 0, 1000], [-1, 0, 0, 1500], [1, 0, 0, 2600], [1, 0, 0, 999], [-1, 0, 0, 3000]])
+
+    with pytest.raises(ValueError, match="not sorted: an event at 999μs comes before the first event at 1000μs"):
+        event_chunks.count_row_blocks([rows[:3], rows[3:]], [500])
+
+    # The events of the whole recording are rejected too
+    with pytest.raises(ValueError):
+        event_chunks.count_windows(rows[:, 0] == 1, rows[:, 3] - rows[0, 3], [500])
+
+
+def test_count_row_blocks_memory_does_not_grow_with_blocks():
+    rng = np.random.default_rng(0)
+    n_events = 200_000
+    timestamps = np.sort(rng.integers(0, 2_000_000, n_events))
+    rows = np.column_stack((np.ones(n_events, dtype=np.int64), np.zeros((n_events, 2), dtype=np.int64), timestamps))
+    # Window sizes with a least common multiple far longer than the recording
+    time_windows = [997, 991, 983]
+
+    tracemalloc.start()
+    try:
+        window_counts = event_chunks.count_row_blocks(iter(np.array_split(rows, 100)), time_windows)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result_size = sum(counts.nbytes for counts in window_counts.values())
+    assert peak < 4 * result_size
+    assert sum(counts[:, 2].sum() for counts in window_counts.values()) == 3 * n_events
+
+
+def test_read_event_chunks_stream(csv_path):
+    streamed = get_plotting_data.read_event_chunks(csv_path, [5, 10], stream=True)
+    stored = get_plotting_data.read_event_chunks(csv_path, [5, 10])
+
+    for time_window in (5, 10):
+        assert streamed[time_window].y_on.tolist() == stored[time_window].y_on.tolist()
+        assert streamed[time_window].y_all.tolist() == stored[time_window].y_all.tolist()
+
+
+def test_read_aedat_csv_counts_raw_events(csv_path):
+    d = get_plotting_data.read_aedat_csv(csv_path, 5)
+
+    assert d.y_on.tolist() == [1, 3, 2, 0]
+    assert d.y_off.tolist() == [1, 1, 0, 2]
+    assert d.y_all.tolist() == [2, 4, 2, 2]
+    assert np.allclose(d.time_windows, [-0.000005, 0, 0.000005, 0.00001])
+
+    chunks = get_plotting_data.read_event_chunks(csv_path, [5, 10], 0)
+    assert chunks[10].y_all.tolist() == [6]
+
+
+def test_read_chunk_data_stream(csv_path):
+    streamed = get_plotting_data.read_chunk_data(csv_path, 5, stream=True)
+    stored = get_plotting_data.read_chunk_data(csv_path, 5)
+
+    assert streamed.y_on.tolist() == stored.y_on.tolist()
+    assert streamed.y_off.tolist() == stored.y_off.tolist()
+    assert get_plotting_data.read_aedat_csv(csv_path, 10, 0, stream=True).y_all.tolist() == [6]
+
+
+def test_rebin_chunks():
+    counts = np.array([[1, 2, 3], [4, 5, 9], [6, 7, 13], [8, 9, 17], [1, 1, 2]])
+    d = get_plotting_data.CsvData.from_counts("chunks.csv", counts, 250)
+
+    rebinned = get_plotting_data.rebin_chunks(d, 250, [1000, 500, 750])
+
+    assert sorted(rebinned) == [500, 750, 1000]
+    assert rebinned[500].y_all.tolist() == [12, 30, 2]
+    assert rebinned[750].y_on.tolist() == [11, 9]
+    assert rebinned[1000].y_off.tolist() == [23, 1]
+    assert np.allclose(rebinned[500].time_windows, [-0.0005, 0, 0.0005])
+
+    full_windows = get_plotting_data.rebin_chunks(d, 250, [500, 1000], drop_partial=True)
+    assert full_windows[500].y_all.tolist() == [12, 30]
+    assert full_windows[1000].y_all.tolist() == [42]
+
+    with pytest.raises(ValueError):
+        get_plotting_data.rebin_chunks(d, 250, [600])
+
+
+def test_rebin_chunks_matches_counting_events():
+    rng = np.random.default_rng(0)
+    timestamps = np.sort(rng.integers(0, 100_000, 10_000))
+    polarities = rng.random(10_000) < 0.5
+
+    window_counts = event_chunks.count_windows(polarities, timestamps, [250, 500, 1500])
+    d = get_plotting_data.CsvData.from_counts("chunks.csv", window_counts[250], 250)
+    rebinned = get_plotting_data.rebin_chunks(d, 250, [500, 1500])
+
+    assert rebinned[500].y_on.tolist() == window_counts[500][:, 0].tolist()
+    assert rebinned[1500].y_all.tolist() == window_counts[1500][:, 2].tolist()
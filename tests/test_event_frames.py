@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pytest
+
+from plotting_utils import event_frames
+from plotting_utils.get_plotting_data import DataStorage, SpatialCsvData
+
+
+def make_events(rows):
+    """SpatialCsvData from CSV style (polarity, x, y, timestamp) rows"""
+    polarities, x_positions, y_positions, timestamps = np.array(rows, dtype=np.int64).T
+    y_positions = (128 - y_positions).astype(np.uint8)
+    return SpatialCsvData(polarities == 1, x_positions.astype(np.uint8), y_positions, timestamps, DataStorage.BOOL)
+
+
+def test_accumulate_frame():
+    events = make_events([[1, 3, 5, 10], [-1, 3, 5, 20], [-1, 3, 5, 30], [1, 127, 0, 40], [1, 0, 127, 45]])
+
+    frame = event_frames.accumulate_frame(events, index=2, start_time=0, end_time=50)
+
+    assert (frame.index, frame.start_time, frame.end_time) == (2, 0, 50)
+    assert frame.counts.sum() == 5
+    assert (frame.counts[5, 3], frame.polarity_sum[5, 3], frame.last_timestamp[5, 3]) == (3, -1, 30)
+    assert (frame.counts[0, 127], frame.polarity_sum[0, 127], frame.last_timestamp[0, 127]) == (1, 1, 40)
+    assert (frame.counts[127, 0], frame.polarity_sum[127, 0], frame.last_timestamp[127, 0]) == (1, 1, 45)
+    assert frame.last_timestamp[0, 0] == -1
+
+
+def test_frame_images():
+    events = make_events([[1, 0, 0, 0], [1, 0, 0, 10], [-1, 1, 0, 99], [-1, 1, 0, 99], [1, 2, 0, 49]])
+    frame = event_frames.accumulate_frame(events, start_time=0, end_time=100)
+
+    counts = frame.image("counts")
+    assert counts.shape == (128, 128, 3) and counts.dtype == np.uint8
+    assert (counts[..., 0] == counts[..., 2]).all()
+    assert counts[0, :4, 0].tolist() == [255, 255, 127, 0]
+
+    assert frame.image("polarity")[0, :4, 0].tolist() == [255, 1, 191, 128]
+    assert frame.image("time_surface")[0, :4, 0].tolist() == [26, 255, 126, 0]
+
+    with pytest.raises(ValueError):
+        frame.image("edges")
+
+
+def test_time_surface_keeps_early_events_of_long_windows():
+    # The default fusion.py window. Events in its first few hundred microseconds must not look like empty pixels
+    events = make_events([[1, 0, 0, 100], [1, 1, 0, 300], [-1, 2, 0, 50_000], [1, 3, 0, 99_999]])
+    frame = event_frames.accumulate_frame(events, start_time=0, end_time=100_000)
+
+    time_surface = frame.image("time_surface")[..., 0]
+
+    assert time_surface[0, :5].tolist() == [1, 1, 128, 255, 0]
+    assert ((time_surface > 0) == (frame.counts > 0)).all()
+
+
+def test_events_outside_of_sensor():
+    with pytest.raises(ValueError):
+        event_frames.accumulate_frame(make_events([[1, 128, 0, 0]]))
+
+
+def test_iter_frames_match_windows(tmp_path):
+    rng = np.random.default_rng(0)
+    n_events = 3000
+    timestamps = 1000 + np.sort(rng.integers(0, 100_000, n_events))
+    rows = np.column_stack(
+        (np.where(rng.random(n_events) < 0.5, 1, -1), rng.integers(0, 128, n_events), rng.integers(0, 128, n_events))
+    )
+
+    path = os.path.join(tmp_path, "events.csv")
+    with open(path, "w") as f:
+        f.write("On/Off,X,Y,Timestamp\n")
+        f.write("\n".join(f"{p},{x},{y},{t}" for (p, x, y), t in zip(rows, timestamps)))
+
+    frames = list(event_frames.iter_frames(path, 10_000, block_size=4096))
+
+    assert sum(int(frame.counts.sum()) for frame in frames) == n_events
+    for frame in frames:
+        in_frame = (timestamps - timestamps[0] >= frame.start_time) & (timestamps - timestamps[0] < frame.end_time)
+        expected = np.zeros((128, 128), dtype=np.int64)
+        np.add.at(expected, (rows[in_frame, 2], rows[in_frame, 1]), rows[in_frame, 0])
+        assert (frame.polarity_sum == expected).all()
@@ -0,0 +1,85 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from plotting_utils import event_csv
+from plotting_utils.event_index import EventIndex, default_index_path
+from plotting_utils.get_plotting_data import DataStorage, SpatialCsvData
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = os.path.join(tmp_path, "OnOff-X-Y-Timestamp.csv")
+    shutil.copy("tests/test_data/OnOff-X-Y-Timestamp.csv", path)
+    return path
+
+
+def test_build_records_every_stride_row(csv_path):
+    index = EventIndex.build(csv_path, stride=3)
+
+    assert index.row_count == 10
+    assert index.timestamps_sorted
+    assert index.first_timestamp == 478504058
+    assert len(index.offsets) == 4
+
+    # Every indexed offset must point at the start of the indexed row
+    with open(csv_path, "rb") as f:
+        for offset, timestamp in zip(index.offsets, index.timestamps):
+            f.seek(offset)
+            assert int(f.readline().split(b",")[3]) == timestamp
+
+
+def test_seek(csv_path):
+    index = EventIndex.build(csv_path, stride=3)
+
+    assert index.seek_row(0) == (index.data_start, 0)
+    assert index.seek_row(5) == (index.offsets[1], 3)
+    assert index.seek_row(100) == (index.offsets[3], 9)
+
+    # The indexed row is always before the first row with the requested timestamp
+    assert index.seek_timestamp(0) == (index.data_start, 0)
+    assert index.seek_timestamp(int(index.timestamps[1])) == (index.offsets[0], 0)
+    assert index.seek_timestamp(int(index.timestamps[1]) + 1) == (index.offsets[1], 3)
+
+
+def test_saved_index_is_ignored_when_csv_changes(csv_path):
+    EventIndex.open_or_build(csv_path, stride=3)
+    index = EventIndex.open(csv_path)
+
+    assert index is not None
+    assert index.stride == 3
+    assert np.array_equal(index.offsets, EventIndex.build(csv_path, stride=3).offsets)
+
+    with open(csv_path, "a") as f:
+        f.write("\n1,1,1,478504080\n")
+
+    assert EventIndex.open(csv_path) is None
+
+
+@pytest.mark.parametrize("skip_rows", [0, 2, 3, 7, 9])
+@pytest.mark.parametrize("start_time", [0, 0.000001, 0.000007, 0.000013])
+def test_indexed_reads_match_full_reads(csv_path, skip_rows, start_time):
+    with open(csv_path, "rb") as f:
+        f.readline()
+        rows = event_csv.parse_event_rows(f.read())
+    expected = SpatialCsvData.from_event_rows([rows], DataStorage.BOOL, 4, skip_rows, 478504058 + int(start_time * 1e6))
+
+    EventIndex.build(csv_path, stride=2).save(default_index_path(csv_path))
+    indexed = SpatialCsvData.from_csv(csv_path, DataStorage.BOOL, 0.000004, skip_rows, start_time=start_time)
+    stored = SpatialCsvData.from_event_store(csv_path, DataStorage.BOOL, 0.000004, skip_rows, start_time=start_time)
+
+    for events in (indexed, stored):
+        assert events.first_timestamp == expected.first_timestamp
+        assert events.timestamps.tolist() == expected.timestamps.tolist()
+        assert events.x_positions.tolist() == expected.x_positions.tolist()
+        assert events.polarities.tolist() == expected.polarities.tolist()
+
+
+def test_start_time_builds_index(csv_path):
+    events = SpatialCsvData.from_csv(csv_path, DataStorage.BOOL, start_time=0.000009)
+
+    assert os.path.exists(default_index_path(csv_path))
+    assert events.first_timestamp == 478504067
+    assert len(events) == 6
@@ -0,0 +1,78 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from plotting_utils import get_plotting_data
+from plotting_utils.event_store import EventStore, default_store_dir
+from plotting_utils.get_plotting_data import DataStorage, SpatialCsvData
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = os.path.join(tmp_path, "OnOff-X-Y-Timestamp.csv")
+    shutil.copy("tests/test_data/OnOff-X-Y-Timestamp.csv", path)
+    return path
+
+
+def test_store_created_on_first_access(csv_path):
+    assert EventStore.open(csv_path) is None
+
+    SpatialCsvData.from_event_store(csv_path, DataStorage.BOOL)
+    store = EventStore.open(csv_path)
+
+    assert store is not None
+    assert len(store) == 10
+    assert store.first_timestamp == 478504058
+    assert store.timestamps_sorted
+    assert isinstance(store.timestamps, np.memmap)
+
+
+def test_store_reused_while_source_unchanged(csv_path, monkeypatch):
+    SpatialCsvData.from_event_store(csv_path, DataStorage.BOOL)
+
+    def fail_from_csv(*args, **kwargs):
+        raise AssertionError("CSV should not be parsed again")
+
+    monkeypatch.setattr(get_plotting_data.SpatialCsvData, "from_csv", fail_from_csv)
+    events = SpatialCsvData.from_event_store(csv_path, DataStorage.BOOL)
+
+    assert events.x_positions.tolist() == [82, 17, 86, 69, 78, 94, 45, 45, 91, 86]
+
+
+def test_store_rebuilt_when_source_changes(csv_path):
+    SpatialCsvData.from_event_store(csv_path, DataStorage.BOOL)
+
+    with open(csv_path, "a") as f:
+        f.write("\n1,1,1,478504080\n")
+
+    assert EventStore.open(csv_path) is None
+
+    events = SpatialCsvData.from_event_store(csv_path, DataStorage.BOOL)
+
+    assert len(events) == 11
+    assert events.timestamps[-1] == 22
+    # The old store is replaced without leaving temporary directories behind
+    assert sorted(os.listdir(os.path.dirname(csv_path))) == [
+        os.path.basename(csv_path),
+        os.path.basename(default_store_dir(csv_path)),
+    ]
+
+
+@pytest.mark.parametrize("time_limit,skip_rows", [(0.000009, 0), (0.000014, 1), (0.000003, 4), (1, 9)])
+def test_store_matches_csv(csv_path, time_limit, skip_rows):
+    from_csv = SpatialCsvData.from_csv(csv_path, DataStorage.COLOR, time_limit, skip_rows)
+    from_store = SpatialCsvData.from_event_store(csv_path, DataStorage.COLOR, time_limit, skip_rows)
+
+    assert from_store.polarities.tolist() == from_csv.polarities.tolist()
+    assert from_store.polarities_color.tolist() == from_csv.polarities_color.tolist()
+    assert from_store.x_positions.tolist() == from_csv.x_positions.tolist()
+    assert from_store.y_positions.tolist() == from_csv.y_positions.tolist()
+    assert from_store.timestamps.tolist() == from_csv.timestamps.tolist()
+    assert from_store.first_timestamp == from_csv.first_timestamp
+
+
+def test_store_skip_all_rows(csv_path):
+    with pytest.raises(ValueError, match="seems to be empty"):
+        SpatialCsvData.from_event_store(csv_path, DataStorage.BOOL, skip_rows=10)
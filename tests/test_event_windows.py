@@ -0,0 +1,112 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+from plotting_utils import event_chunks, event_windows
+from plotting_utils.get_plotting_data import DataStorage, SpatialCsvData
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    rng = np.random.default_rng(0)
+    n_events = 5000
+    timestamps = 478504058 + np.sort(rng.integers(0, 200_000, n_events))
+    # Leave a gap without events so empty windows are needed
+    timestamps[n_events // 2:] += 50_000
+    polarities = np.where(rng.random(n_events) < 0.5, 1, -1)
+
+    path = os.path.join(tmp_path, "events.csv")
+    x_positions = rng.integers(0, 128, n_events)
+    y_positions = rng.integers(0, 128, n_events)
+
+    with open(path, "w") as f:
+        f.write("On/Off,X,Y,Timestamp\n")
+        f.write("\n".join(f"{p},{x},{y},{t}" for p, x, y, t in zip(polarities, x_positions, y_positions, timestamps)))
+
+    return path
+
+
+@pytest.fixture
+def events(csv_path):
+    return SpatialCsvData.from_csv(csv_path, DataStorage.BOOL)
+
+
+def test_blocks_match_whole_file(csv_path, events):
+    blocks = list(event_windows.iter_event_blocks(csv_path, block_size=4096))
+
+    assert len(blocks) > 1
+    assert all(block.first_timestamp == events.first_timestamp for block in blocks)
+    assert np.concatenate([block.timestamps for block in blocks]).tolist() == events.timestamps.tolist()
+    assert np.concatenate([block.polarities for block in blocks]).tolist() == events.polarities.tolist()
+    assert np.concatenate([block.y_positions for block in blocks]).tolist() == events.y_positions.tolist()
+
+
+@pytest.mark.parametrize("duration,stride", [(10_000, None), (10_000, 4_000), (3_000, 7_000)])
+def test_time_windows(csv_path, events, duration, stride):
+    windows = list(event_windows.iter_csv_windows(csv_path, duration=duration, stride=stride, block_size=4096))
+    stride = stride or duration
+
+    for i, window in enumerate(windows):
+        assert window.index == i
+        assert window.start_time == i * stride
+        kept = (events.timestamps >= window.start_time) & (events.timestamps < window.start_time + duration)
+        assert window.events.timestamps.tolist() == events.timestamps[kept].tolist()
+        assert window.events.x_positions.tolist() == events.x_positions[kept].tolist()
+        if kept.any():
+            assert window.first_event == np.flatnonzero(kept)[0]
+
+    # The windows stop once none of the later ones would hold an event
+    assert any(len(window) == 0 for window in windows)
+    assert max(windows[-1].end_time, windows[-1].start_time + stride) > events.timestamps[-1]
+    assert max(windows[-2].end_time, windows[-2].start_time + stride) <= events.timestamps[-1]
+
+
+def test_time_windows_count_like_event_chunks(csv_path, events):
+    counts = [
+        [window.events.polarities.sum(), (~window.events.polarities).sum(), len(window)]
+        for window in event_windows.iter_csv_windows(csv_path, duration=500, block_size=4096)
+    ]
+
+    assert counts == event_chunks.count_window(events.polarities, events.timestamps, 500).tolist()
+
+
+@pytest.mark.parametrize("count,stride", [(700, None), (700, 300), (300, 1100)])
+def test_count_windows(csv_path, events, count, stride):
+    windows = list(event_windows.iter_csv_windows(csv_path, count=count, stride=stride, block_size=4096))
+    stride = stride or count
+
+    for i, window in enumerate(windows):
+        assert window.first_event == i * stride
+        assert window.events.timestamps.tolist() == events.timestamps[i * stride:i * stride + count].tolist()
+
+    assert windows[-1].first_event + max(count, stride) >= len(events)
+    assert windows[-2].first_event + max(count, stride) < len(events)
+
+
+def test_windows_need_one_size(csv_path):
+    with pytest.raises(ValueError):
+        event_windows.iter_csv_windows(csv_path)
+
+    with pytest.raises(ValueError):
+        event_windows.iter_csv_windows(csv_path, duration=10, count=10)
+
+    with pytest.raises(ValueError):
+        list(event_windows.iter_csv_windows(csv_path, count=0))
+
+
+@pytest.mark.parametrize("start_time,time_limit", [(0, sys.maxsize), (0.03, 0.1), (0.2, sys.maxsize)])
+def test_area_events_match_event_store(tmp_path, csv_path, start_time, time_limit):
+    area = (40, 70, 20)
+    store_dir = os.path.join(tmp_path, "store")
+    expected = SpatialCsvData.from_event_store(
+        csv_path, DataStorage.BOOL, time_limit, start_time=start_time, store_dir=store_dir, area=area
+    )
+    blocks = list(event_windows.iter_area_events(csv_path, *area, time_limit, start_time, block_size=4096))
+
+    assert all(block.first_timestamp == expected.first_timestamp for block in blocks)
+    assert np.concatenate([block.timestamps for block in blocks]).tolist() == expected.timestamps.tolist()
+    assert np.concatenate([block.x_positions for block in blocks]).tolist() == expected.x_positions.tolist()
+    assert np.concatenate([block.y_positions for block in blocks]).tolist() == expected.y_positions.tolist()
+    assert np.concatenate([block.polarities for block in blocks]).tolist() == expected.polarities.tolist()
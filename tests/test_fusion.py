@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+import fusion
+
+
+def loop_o_mss_le(original, otsu_image, mss_image, entropy_image):
+    """The original per-pixel fusion of fusion.py o_mss_le"""
+    result_image = np.copy(original)
+    for (i, row) in enumerate(result_image):
+        for (j, pix) in enumerate(row):
+            if (otsu_image[i][j] == 255) and (mss_image[i][j] > 100) and (entropy_image[i][j] > 0.7):
+                result_image[i][j] = np.array([255, 255, 255])
+            else:
+                result_image[i][j] = np.array([0, 0, 0])
+    return result_image
+
+
+def loop_wavelet_combine(original, mss, decomp, low_thresh, high_thresh, mss_thresh):
+    """The original per-pixel wavelet_combine"""
+    result_image = np.copy(original)
+    for (i, row) in enumerate(result_image):
+        for (j, pix) in enumerate(row):
+            if (mss[i][j] > mss_thresh) and (decomp[i][j] > high_thresh or decomp[i][j] < low_thresh):
+                result_image[i][j] = np.array([255, 255, 255])
+            else:
+                result_image[i][j] = np.array([0, 0, 0])
+    return result_image
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+def test_o_mss_le_mask_matches_loop(rng):
+    shape = (4, 13, 17)
+    originals = rng.integers(0, 256, shape + (3,), dtype=np.uint8)
+    otsu_images = rng.choice(np.array([0, 255], dtype=np.uint8), shape)
+    # Values at the thresholds are included, they must not be fused
+    mss_images = rng.integers(95, 106, shape).astype(np.uint8)
+    entropy_images = rng.choice([0.0, 0.5, 0.7, 0.70001, 3.0], shape)
+
+    fused = fusion.mask_to_image(fusion.o_mss_le_mask(otsu_images, mss_images, entropy_images), originals[0])
+
+    assert fused.shape == originals.shape and fused.dtype == originals.dtype
+    for original, otsu_image, mss_image, entropy_image, fused_image in zip(
+        originals, otsu_images, mss_images, entropy_images, fused
+    ):
+        assert np.array_equal(fused_image, loop_o_mss_le(original, otsu_image, mss_image, entropy_image))
+
+
+def test_wavelet_fusion_matches_loop(rng):
+    n_frames, levels, height, width = 2, 2, 11, 14
+    originals = rng.integers(0, 256, (n_frames, height, width, 3), dtype=np.uint8)
+    mss_images = rng.integers(95, 106, (n_frames, height, width)).astype(np.uint8)
+    bands = rng.choice([-150.0, -100.0, -99.5, 0.0, 99.5, 100.0, 150.0], (n_frames, levels, 3, height, width))
+
+    fused = fusion.wavelet_fusion(originals[0], mss_images, bands)
+
+    assert fused.shape == (n_frames, levels, 3, height, width, 3)
+    for original, mss_image, frame_bands, frame_fused in zip(originals, mss_images, bands, fused):
+        for level_bands, level_fused in zip(frame_bands, frame_fused):
+            for band, band_fused in zip(level_bands, level_fused):
+                expected = loop_wavelet_combine(original, mss_image, band, -100, 100, 100)
+                assert np.array_equal(band_fused, expected)
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from plotting_utils import gaussian_fit
+
+
+def padd_bins_loop(hist_bins, pad_bins):
+    difference = hist_bins[1] - hist_bins[0]
+    for i in range(pad_bins):
+        hist_bins = np.insert(hist_bins, 0, hist_bins[0] - (difference * (i + 1)))
+
+    for i in range(pad_bins):
+        hist_bins = np.append(hist_bins, hist_bins[len(hist_bins) - 1] + difference * (i + 1))
+
+    return hist_bins
+
+
+def test_pad_bins_matches_loop():
+    hist_bins = np.histogram_bin_edges(np.random.default_rng(0).normal(700, 50, 3000), bins=100)
+
+    assert np.array_equal(gaussian_fit.pad_bins(hist_bins, 100), padd_bins_loop(hist_bins, 100))
+
+
+@pytest.mark.parametrize("log_values", [False, True])
+def test_fit_gaussian_matches_trimming_loop(log_values):
+    data = np.random.default_rng(1).normal(700, 50, 3000).round()
+    if log_values:
+        data = np.log10(data)
+
+    x = padd_bins_loop(np.histogram_bin_edges(data, bins=100), 100)
+    mu, sigma = stats.norm.fit(data)
+    y = stats.norm.pdf(x, mu, sigma)
+    accuracy = 0.00002 if log_values else 0.002
+    while y[0] < accuracy:
+        y = np.delete(y, 0)
+        x = np.delete(x, 0)
+    while y[len(y) - 1] < accuracy:
+        y = np.delete(y, len(y) - 1)
+        x = np.delete(x, len(x) - 1)
+
+    fit = gaussian_fit.fit_gaussian(data, log_values)
+
+    assert (fit.mu, fit.sigma) == (mu, sigma)
+    assert np.array_equal(fit.x, x)
+    assert np.array_equal(fit.y, y)
+
+
+def test_stack_curves_pads_with_nan():
+    x, y = gaussian_fit.stack_curves([[1.0, 2.0, 3.0], [5.0]], [[4.0, 5.0, 6.0], [7.0]])
+
+    assert np.array_equal(x, [[1, 2, 3], [5, np.nan, np.nan]], equal_nan=True)
+    assert np.array_equal(y, [[4, 5, 6], [7, np.nan, np.nan]], equal_nan=True)
+
+
+def test_align_starts():
+    x, y = gaussian_fit.stack_curves([[1.0, 2.0, 3.0], [5.0, 6.0]], [[0.5, 2.0, 1.0], [1.0, 3.0]])
+
+    aligned_x, aligned_y = gaussian_fit.align_starts(x, y)
+
+    assert np.array_equal(aligned_x, [[0, 1, 2], [0, 1, np.nan]], equal_nan=True)
+    assert np.array_equal(aligned_y, [[0, 1.5, 0.5], [0, 2, np.nan]], equal_nan=True)
+
+
+def test_center_peaks():
+    x, y = gaussian_fit.stack_curves([[1.0, 2.0, 3.0], [5.0, 6.0]], [[1.0, 3.0, 3.0], [4.0, 2.0]])
+
+    assert np.array_equal(gaussian_fit.peak_positions(x, y), [2, 5])
+    assert np.array_equal(gaussian_fit.center_peaks(x, y), [[-1, 0, 1], [0, 1, np.nan]], equal_nan=True)
+    assert np.array_equal(
+        gaussian_fit.center_peaks(x, y, np.array([0.5, -1])), [[-1.5, -0.5, 0.5], [1, 2, np.nan]], equal_nan=True
+    )
+
+
+def test_normalize_groups():
+    y = np.array([[1.0, 2.0, np.nan], [4.0, 1.0, 0.0], [3.0, 6.0, 3.0]])
+
+    normalized = gaussian_fit.normalize_groups(y, np.array([False, False, True]))
+
+    assert np.array_equal(normalized, [[0.25, 0.5, np.nan], [1, 0.25, 0], [0.5, 1, 0.5]], equal_nan=True)
@@ -0,0 +1,84 @@
+import csv
+import os
+
+import numpy as np
+import pytest
+
+import get_data
+from plotting_utils.result_cache import ResultCache
+
+
+def loop_frame_groups(csv_path, num_frames):
+    """The original per-row grouping of get_data.WaveAndFreqData"""
+    groups = []
+    with open(csv_path) as csv_file:
+        reader = csv.reader(csv_file, delimiter=",")
+        next(reader)
+
+        group = []
+        for row in reader:
+            group.append([int(row[0]), int(row[1]), int(row[2])])
+            if len(group) == num_frames:
+                groups.append(group)
+                group = []
+
+    return groups
+
+
+@pytest.fixture
+def counts():
+    counts = np.random.default_rng(0).integers(0, 1000, (23, 3))
+    counts[:, 2] = counts[:, 0] + counts[:, 1]
+    return counts
+
+
+@pytest.mark.parametrize("num_frames", [1, 5, 23, 24])
+def test_read_frame_groups_matches_loop(tmp_path, write_chunk_csv, counts, num_frames):
+    csv_path = os.path.join(tmp_path, "chunks.csv")
+    write_chunk_csv(csv_path, counts)
+
+    groups = get_data.read_frame_groups(csv_path, num_frames)
+
+    assert groups.shape == (len(counts) // num_frames, num_frames, 3)
+    assert groups.tolist() == loop_frame_groups(csv_path, num_frames)
+
+
+def test_read_frame_groups_through_cache(tmp_path, write_chunk_csv, counts):
+    csv_path = os.path.join(tmp_path, "chunks.csv")
+    write_chunk_csv(csv_path, counts)
+    cache = ResultCache(os.path.join(tmp_path, "cache"))
+
+    first = get_data.read_frame_groups(csv_path, 5, cache)
+    second = get_data.read_frame_groups(csv_path, 5, cache)
+    other = get_data.read_frame_groups(csv_path, 4, cache)
+
+    assert cache.counters == {"hits": 1, "misses": 2, "evictions": 0}
+    assert first.tolist() == second.tolist() == get_data.read_frame_groups(csv_path, 5).tolist()
+    assert other.shape == (5, 4, 3)
+
+
+def test_read_frame_groups_needs_frames(tmp_path, write_chunk_csv):
+    csv_path = os.path.join(tmp_path, "chunks.csv")
+    write_chunk_csv(csv_path, [[1, 2, 3]])
+
+    with pytest.raises(ValueError):
+        get_data.read_frame_groups(csv_path, 0)
+
+
+def test_wave_and_freq_data_through_cache(tmp_path, counts):
+    data_folder = tmp_path / "data"
+    os.makedirs(data_folder / "sine")
+    for i, name in enumerate(["sine-500mV-1hz.csv", "sine-200mV-2hz.csv", "square-300mV-1hz.csv", "sine-1hz.csv"]):
+        rows = "\n".join(",".join(str(count) for count in row) for row in counts + i)
+        (data_folder / "sine" / name).write_text("On Count,Off Count,Combined Count\n" + rows)
+    cache = ResultCache(os.path.join(tmp_path, "cache"))
+
+    uncached = get_data.WaveAndFreqData(4, str(data_folder))
+    get_data.WaveAndFreqData(4, str(data_folder), cache)
+    cached = get_data.WaveAndFreqData(4, str(data_folder), cache)
+
+    # The file without a voltage is skipped before it is read
+    assert cache.counters == {"hits": 3, "misses": 3, "evictions": 0}
+    assert len(uncached.train_input) + len(uncached.test_input) == 3 * (len(counts) // 4)
+    for name in ["train_input", "test_input", "waveform_train_output", "frequency_test_output"]:
+        assert getattr(cached, name).tolist() == getattr(uncached, name).tolist()
@@ -1,5 +1,7 @@
 # import pytest
-from plotting_utils import get_plotting_data
+import os
+import numpy as np
+from plotting_utils import event_csv, get_plotting_data
 from plotting_utils.get_plotting_data import DataStorage
 import pytest
 
@@ -9,35 +11,33 @@ def test_spatial_csv_bool_no_color():
         "tests/test_data/OnOff-X-Y-Timestamp.csv", DataStorage.BOOL
     )
 
-    assert spatial_csv_data.polarities == [True, False, False, True, True, True, True, True, False, False]
-    assert spatial_csv_data.x_positions == [82, 17, 86, 69, 78, 94, 45, 45, 91, 86]
-    assert spatial_csv_data.y_positions == [78, 71, 37, 104, 75, 30, 12, 12, 32, 84]
-    assert spatial_csv_data.timestamps == [0, 4, 6, 8, 9, 9, 10, 11, 17, 19]
-    assert spatial_csv_data.polarities_color == []
+    assert spatial_csv_data.polarities.tolist() == [True, False, False, True, True, True, True, True, False, False]
+    assert spatial_csv_data.x_positions.tolist() == [82, 17, 86, 69, 78, 94, 45, 45, 91, 86]
+    assert spatial_csv_data.y_positions.tolist() == [78, 71, 37, 104, 75, 30, 12, 12, 32, 84]
+    assert spatial_csv_data.timestamps.tolist() == [0, 4, 6, 8, 9, 9, 10, 11, 17, 19]
+    assert spatial_csv_data.polarities_color.tolist() == []
 
 
-def test_spatial_csv_no_bool_color():
+def test_spatial_csv_color():
     spatial_csv_data = get_plotting_data.SpatialCsvData.from_csv(
         "tests/test_data/OnOff-X-Y-Timestamp.csv", DataStorage.COLOR
     )
 
-    assert spatial_csv_data.polarities == []
-    assert spatial_csv_data.x_positions == [82, 17, 86, 69, 78, 94, 45, 45, 91, 86]
-    assert spatial_csv_data.y_positions == [78, 71, 37, 104, 75, 30, 12, 12, 32, 84]
-    assert spatial_csv_data.timestamps == [0, 4, 6, 8, 9, 9, 10, 11, 17, 19]
-    assert spatial_csv_data.polarities_color == ["g", "r", "r", "g", "g", "g", "g", "g", "r", "r"]
+    assert spatial_csv_data.polarities.tolist() == [True, False, False, True, True, True, True, True, False, False]
+    assert spatial_csv_data.x_positions.tolist() == [82, 17, 86, 69, 78, 94, 45, 45, 91, 86]
+    assert spatial_csv_data.y_positions.tolist() == [78, 71, 37, 104, 75, 30, 12, 12, 32, 84]
+    assert spatial_csv_data.timestamps.tolist() == [0, 4, 6, 8, 9, 9, 10, 11, 17, 19]
+    assert spatial_csv_data.polarities_color.tolist() == ["g", "r", "r", "g", "g", "g", "g", "g", "r", "r"]
 
 
-def test_spatial_csv_bool_color():
+def test_spatial_csv_none():
     spatial_csv_data = get_plotting_data.SpatialCsvData.from_csv(
-        "tests/test_data/OnOff-X-Y-Timestamp.csv", DataStorage.BOOL_AND_COLOR
+        "tests/test_data/OnOff-X-Y-Timestamp.csv", DataStorage.NONE
     )
 
-    assert spatial_csv_data.polarities == [True, False, False, True, True, True, True, True, False, False]
-    assert spatial_csv_data.x_positions == [82, 17, 86, 69, 78, 94, 45, 45, 91, 86]
-    assert spatial_csv_data.y_positions == [78, 71, 37, 104, 75, 30, 12, 12, 32, 84]
-    assert spatial_csv_data.timestamps == [0, 4, 6, 8, 9, 9, 10, 11, 17, 19]
-    assert spatial_csv_data.polarities_color == ["g", "r", "r", "g", "g", "g", "g", "g", "r", "r"]
+    assert spatial_csv_data.polarities.tolist() == []
+    assert spatial_csv_data.polarities_color.tolist() == []
+    assert spatial_csv_data.timestamps.tolist() == [0, 4, 6, 8, 9, 9, 10, 11, 17, 19]
 
 
 def test_incorrect_format():
@@ -48,3 +48,153 @@ def test_incorrect_format():
 def test_empty_csv():
     with pytest.raises(ValueError, match="CSV file 'tests/test_data/OnOff-X-Y-Timestamp-NODATA.csv' seems to be empty"):
         get_plotting_data.SpatialCsvData.from_csv("tests/test_data/OnOff-X-Y-Timestamp-NODATA.csv", DataStorage.COLOR)
+
+
+def test_spatial_csv_dtypes():
+    spatial_csv_data = get_plotting_data.SpatialCsvData.from_csv(
+        "tests/test_data/OnOff-X-Y-Timestamp.csv", DataStorage.BOOL
+    )
+
+    assert spatial_csv_data.polarities.dtype == np.bool_
+    assert spatial_csv_data.x_positions.dtype == np.uint8
+    assert spatial_csv_data.y_positions.dtype == np.uint8
+    assert spatial_csv_data.timestamps.dtype == np.int64
+
+
+def test_spatial_csv_time_limit():
+    spatial_csv_data = get_plotting_data.SpatialCsvData.from_csv(
+        "tests/test_data/OnOff-X-Y-Timestamp.csv", DataStorage.BOOL, 0.000009
+    )
+
+    assert spatial_csv_data.timestamps.tolist() == [0, 4, 6, 8, 9, 9]
+    assert spatial_csv_data.polarities.tolist() == [True, False, False, True, True, True]
+
+
+def test_spatial_csv_skip_rows():
+    spatial_csv_data = get_plotting_data.SpatialCsvData.from_csv(
+        "tests/test_data/OnOff-X-Y-Timestamp.csv", DataStorage.BOOL, skip_rows=3
+    )
+
+    assert spatial_csv_data.x_positions.tolist() == [69, 78, 94, 45, 45, 91, 86]
+    assert spatial_csv_data.timestamps.tolist() == [0, 1, 1, 2, 3, 9, 11]
+
+
+def test_spatial_csv_skip_all_rows():
+    with pytest.raises(ValueError, match="seems to be empty"):
+        get_plotting_data.SpatialCsvData.from_csv(
+            "tests/test_data/OnOff-X-Y-Timestamp.csv", DataStorage.BOOL, skip_rows=10
+        )
+
+
+def test_spatial_csv_small_blocks():
+    _, data_start = event_csv.read_csv_header("tests/test_data/OnOff-X-Y-Timestamp.csv")
+    blocks = event_csv.iter_row_blocks("tests/test_data/OnOff-X-Y-Timestamp.csv", data_start, block_size=7)
+    row_blocks = [event_csv.parse_event_rows(block) for block in blocks]
+
+    spatial_csv_data = get_plotting_data.SpatialCsvData.from_event_rows(row_blocks, DataStorage.BOOL, 10, 2)
+
+    assert len(row_blocks) == 10
+    assert spatial_csv_data.x_positions.tolist() == [86, 69, 78, 94, 45, 45]
+    assert spatial_csv_data.timestamps.tolist() == [0, 2, 3, 3, 4, 5]
+
+
+def test_parse_event_rows_bool_polarity():
+    rows = event_csv.parse_event_rows(b"True,1,2,30\r\nFalse,3,4,50\r\n\r\n")
+
+    assert rows.tolist() == [[1, 1, 2, 30], [0, 3, 4, 50]]
+
+
+def test_parse_int_rows_malformed():
+    with pytest.raises(ValueError, match="do not have 4 columns"):
+        event_csv.parse_int_rows(b"1,2,3,4\n5,6,7\n", 4)
+
+    with pytest.raises(ValueError, match="not comma separated integers"):
+        event_csv.parse_int_rows(b"1,2,x,4\n", 4)
+
+
+def test_split_row_ranges_on_row_boundaries():
+    csv_path = "tests/test_data/OnOff-X-Y-Timestamp.csv"
+    _, data_start = event_csv.read_csv_header(csv_path)
+
+    row_ranges = event_csv.split_row_ranges(csv_path, data_start, 4)
+
+    with open(csv_path, "rb") as f:
+        content = f.read()
+
+    assert row_ranges[0][0] == data_start
+    assert row_ranges[-1][1] == len(content)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(row_ranges, row_ranges[1:]))
+    assert all(content[start - 1:start] == b"\n" for start, _ in row_ranges)
+
+
+def test_spatial_csv_parallel_matches_serial():
+    csv_path = "tests/test_data/OnOff-X-Y-Timestamp.csv"
+    serial = get_plotting_data.SpatialCsvData.from_csv(csv_path, DataStorage.BOOL, 0.000014, 1)
+    parallel = get_plotting_data.SpatialCsvData.from_csv(csv_path, DataStorage.BOOL, 0.000014, 1, workers=2)
+
+    assert parallel.polarities.tolist() == serial.polarities.tolist()
+    assert parallel.x_positions.tolist() == serial.x_positions.tolist()
+    assert parallel.y_positions.tolist() == serial.y_positions.tolist()
+    assert parallel.timestamps.tolist() == serial.timestamps.tolist() == [0, 2, 4, 5, 5, 6, 7, 13]
+
+
+def test_read_aedat_csv(tmp_path, write_chunk_csv):
+    csv_path = os.path.join(tmp_path, "chunks.csv")
+    write_chunk_csv(csv_path, [[1, 2, 3], [4, 5, 9], [6, 7, 13], [8, 9, 17]])
+
+    d = get_plotting_data.read_aedat_csv(csv_path, 500, 2)
+
+    assert d.y_on.tolist() == [1, 4, 6]
+    assert d.y_off.tolist() == [2, 5, 7]
+    assert d.y_all.tolist() == [3, 9, 13]
+    assert np.allclose(d.time_windows, [-0.0005, 0, 0.0005])
+
+
+def test_substitute_outliers_matches_running_mean():
+    rng = np.random.default_rng(0)
+    counts = rng.integers(0, 4000, (2000, 3))
+    counts[:, 2] = counts[:, 0] + counts[:, 1]
+    counts[rng.choice(np.arange(1, 2000), 300, replace=False), 2] = 9000
+
+    # Replace outliers one row at a time with the mean of everything before them
+    expected = []
+    for row in counts.tolist():
+        if row[2] > 8000:
+            row = [sum(column) // len(expected) for column in zip(*expected)]
+        expected.append(row)
+
+    assert get_plotting_data.substitute_outliers(counts).tolist() == expected
+
+
+def test_substitute_leading_outliers():
+    counts = [[5000, 5000, 10000], [9000, 9000, 18000], [1, 2, 3], [10, 20, 30], [5000, 5000, 10000]]
+
+    assert get_plotting_data.substitute_outliers(counts).tolist() == [
+        [1, 2, 3],
+        [1, 2, 3],
+        [1, 2, 3],
+        [10, 20, 30],
+        [3, 6, 9],
+    ]
+
+
+def test_log_scale_counts_substitutes_mean_for_zero():
+    counts = np.array([[0, 10, 100], [4, 0, 1000], [8, 20, 0]])
+
+    log_counts = get_plotting_data.log_scale_counts(counts)
+
+    assert log_counts.dtype == np.float64
+    assert np.allclose(log_counts, np.log10([[4, 10, 100], [4, 10, 1000], [8, 20, 1100 / 3]]))
+    assert np.allclose(get_plotting_data.log_scale_counts(counts[:, 0]), np.log10([4, 4, 8]))
+    assert get_plotting_data.log_scale_counts(np.empty(0, dtype=int)).tolist() == []
+
+
+def test_log_counts(tmp_path, write_chunk_csv):
+    csv_path = os.path.join(tmp_path, "chunks.csv")
+    write_chunk_csv(csv_path, [[1, 2, 3], [0, 100, 100], [10, 1000, 1010]])
+
+    d = get_plotting_data.log_counts(get_plotting_data.read_aedat_csv(csv_path, 500))
+
+    assert np.allclose(d.y_on, np.log10([1, 11 / 3, 10]))
+    assert np.allclose(d.y_off, np.log10([2, 100, 1000]))
+    assert np.allclose(d.y_all, np.log10([3, 100, 1010]))
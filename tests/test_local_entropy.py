@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+import local_entropy
+
+
+def loop_entropy_image(img: np.ndarray, radius: int) -> np.ndarray:
+    """The original per-pixel implementation of get_entropy_image"""
+    S = img.shape
+    E = np.array(img)
+
+    for row in range(S[0]):
+        for col in range(S[1]):
+            Lx = np.max([0, col - radius])
+            Ux = np.min([S[1], col + radius])
+            Ly = np.max([0, row - radius])
+            Uy = np.min([S[0], row + radius])
+            region = img[Ly:Uy, Lx:Ux].flatten()
+            E[row, col] = local_entropy.entropy(region)
+
+    return E
+
+
+@pytest.mark.parametrize("radius", [1, 2, 5, 12])
+def test_entropy_image_matches_loop(radius):
+    # Few distinct values so windows hold repeated symbols, and a shape that is not a multiple of the window
+    gray = np.random.default_rng(radius).integers(0, 6, (23, 31)).astype(np.float64)
+
+    E = local_entropy.get_entropy_image(gray, convert_to_gray=False, radius=radius)
+
+    assert E.shape == gray.shape and E.dtype == np.float64
+    assert np.allclose(E, loop_entropy_image(gray, radius), rtol=0, atol=1e-10)
+
+
+def test_entropy_image_batch_matches_loop():
+    # Random colors have more distinct values than a row of windows holds, which numbers the symbols per row
+    frames = np.random.default_rng(0).integers(0, 256, (3, 20, 17, 3)).astype(np.uint8)
+
+    E = local_entropy.get_entropy_image(frames)
+
+    assert E.shape == (3, 20, 17)
+    for frame, frame_entropy in zip(frames, E):
+        assert np.allclose(frame_entropy, loop_entropy_image(local_entropy.rgb2gray(frame), 5), rtol=0, atol=1e-10)
+
+
+def test_entropy_image_keeps_dtype():
+    gray = np.random.default_rng(1).integers(0, 4, (12, 15)).astype(np.uint8)
+
+    E = local_entropy.get_entropy_image(gray, convert_to_gray=False, radius=3)
+
+    assert E.dtype == np.uint8
+    assert E.tolist() == loop_entropy_image(gray, 3).tolist()
+
+
+def test_entropy_image_chunks_rows(monkeypatch):
+    frames = np.random.default_rng(2).integers(0, 8, (2, 16, 16)).astype(np.float64)
+    expected = local_entropy.get_entropy_image(frames, convert_to_gray=False)
+
+    # Only a few rows of histograms fit at once
+    monkeypatch.setattr(local_entropy, "HISTOGRAM_BUDGET", 20)
+
+    assert np.allclose(local_entropy.get_entropy_image(frames, convert_to_gray=False), expected, rtol=0, atol=1e-12)
+
+
+def test_entropy_radius_must_be_positive():
+    with pytest.raises(ValueError):
+        local_entropy.get_entropy_image(np.zeros((4, 4)), convert_to_gray=False, radius=0)
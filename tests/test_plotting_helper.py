@@ -0,0 +1,86 @@
+import matplotlib
+import numpy as np
+import pytest
+from sklearn.metrics import pairwise_distances_argmin
+
+from plotting_utils import plotting_helper
+
+
+def test_polarity_color_args():
+    polarities = np.array([True, False, False, True])
+
+    args = plotting_helper.polarity_color_args(polarities)
+    norm = matplotlib.colors.Normalize(args["vmin"], args["vmax"])
+    colors = args["cmap"](norm(args["c"]))
+
+    assert np.shares_memory(args["c"], polarities)
+    assert colors.tolist() == [list(matplotlib.colors.to_rgba(color)) for color in ["g", "r", "r", "g"]]
+
+
+def make_blobs(rng, centers, n_points=200):
+    centers = np.asarray(centers, dtype=np.float64)
+    return np.concatenate([center + rng.normal(scale=2.0, size=(n_points, 2)) for center in centers])
+
+
+def same_clusters(centers, expected, atol):
+    """Whether every expected center has a found center within atol"""
+    distances = np.linalg.norm(centers[:, np.newaxis] - expected[np.newaxis], axis=2)
+    return sorted(distances.argmin(axis=0).tolist()) == list(range(len(expected))) and distances.min(0).max() < atol
+
+
+@pytest.mark.parametrize("batch_size", [0, 64])
+def test_find_clusters(batch_size):
+    rng = np.random.default_rng(0)
+    expected = np.array([[20.0, 20.0], [100.0, 30.0], [60.0, 110.0]])
+    points = make_blobs(rng, expected)
+
+    centers, labels = plotting_helper.find_clusters(points, 3, batch_size=batch_size)
+
+    assert same_clusters(centers, expected, atol=2.0)
+    assert (labels == pairwise_distances_argmin(points, centers)).all()
+    assert np.bincount(labels).tolist() == [200, 200, 200]
+
+
+def test_find_clusters_reseeds_empty_clusters():
+    points = np.array([[0.0, 0.0], [0.0, 1.0], [10.0, 0.0], [10.0, 1.0]])
+    # The last center is further from every point than the others, so it starts out empty
+    init_centers = np.array([[0.0, 0.5], [10.0, 0.5], [100.0, 100.0]])
+
+    centers, labels = plotting_helper.find_clusters(points, 3, init_centers=init_centers, max_iter=50)
+
+    assert np.isfinite(centers).all()
+    assert len(np.unique(labels)) == 3
+
+
+def test_find_clusters_stops_at_max_iter():
+    points = np.random.default_rng(1).random((50, 2))
+
+    centers, labels = plotting_helper.find_clusters(points, 4, max_iter=1, tol=0)
+
+    assert centers.shape == (4, 2) and labels.shape == (50,)
+
+
+def test_find_clusters_arguments():
+    with pytest.raises(ValueError):
+        plotting_helper.find_clusters(np.zeros((2, 2)), 3)
+
+    with pytest.raises(ValueError):
+        plotting_helper.find_clusters(np.zeros((5, 2)), 3, init_centers=np.zeros((2, 2)))
+
+
+def test_cluster_windows_warm_start():
+    rng = np.random.default_rng(2)
+    start = np.array([[20.0, 20.0], [100.0, 30.0], [60.0, 110.0]])
+    # The objects drift a little between windows
+    windows = [make_blobs(rng, start + i * 3.0, 100) for i in range(5)]
+
+    results = list(plotting_helper.cluster_windows([np.empty((1, 2))] + windows, 3, batch_size=32))
+
+    assert results[0][0].shape == (0, 2) and results[0][1].tolist() == [-1]
+    for i, (centers, _) in enumerate(results[1:]):
+        assert same_clusters(centers, start + i * 3.0, atol=1.5)
+
+    # Starting from the previous window's centers needs fewer iterations than starting from random points
+    previous = results[-2][0]
+    _, warm_labels = plotting_helper.find_clusters(windows[-1], 3, init_centers=previous, max_iter=1)
+    assert np.bincount(warm_labels).tolist() == [100, 100, 100]
@@ -0,0 +1,121 @@
+import os
+
+import numpy as np
+import pytest
+
+from plotting_utils import get_plotting_data
+from plotting_utils.result_cache import ResultCache, call_counted
+
+
+@pytest.fixture
+def csv_path(tmp_path, write_chunk_csv):
+    path = os.path.join(tmp_path, "chunks.csv")
+    write_chunk_csv(path, [[1, 2, 3], [4, 5, 9], [6, 7, 13], [8, 9, 17]])
+    return path
+
+
+def test_get_or_compute_hits_after_first_call(tmp_path, csv_path):
+    cache = ResultCache(os.path.join(tmp_path, "cache"))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"counts": np.arange(5)}
+
+    first = cache.get_or_compute(csv_path, "counts", {"window": 500}, compute)
+    second = cache.get_or_compute(csv_path, "counts", {"window": 500}, compute)
+
+    assert len(calls) == 1
+    assert first["counts"].tolist() == second["counts"].tolist() == [0, 1, 2, 3, 4]
+    assert cache.counters == {"hits": 1, "misses": 1, "evictions": 0}
+
+
+def test_key_depends_on_function_params_and_source(tmp_path, csv_path):
+    cache = ResultCache(os.path.join(tmp_path, "cache"))
+    key = cache.key(csv_path, "counts", {"window": 500})
+
+    assert key == cache.key(csv_path, "counts", {"window": 500})
+    assert key != cache.key(csv_path, "counts", {"window": 1000})
+    assert key != cache.key(csv_path, "variance", {"window": 500})
+
+    with open(csv_path, "a") as f:
+        f.write("\n10,11,21")
+
+    assert key != cache.key(csv_path, "counts", {"window": 500})
+
+
+def test_content_hash_survives_copies(tmp_path, csv_path):
+    cache = ResultCache(os.path.join(tmp_path, "cache"), hash_contents=True)
+    copy_path = os.path.join(tmp_path, "copy.csv")
+    with open(csv_path) as src, open(copy_path, "w") as dst:
+        dst.write(src.read())
+
+    assert cache.key(csv_path, "counts", {}) == cache.key(copy_path, "counts", {})
+
+
+def test_least_recently_used_entries_evicted(tmp_path):
+    cache_dir = os.path.join(tmp_path, "cache")
+    entry = {"counts": np.zeros(1000)}
+    cache = ResultCache(cache_dir)
+    cache.put("size", entry)
+    entry_size = os.path.getsize(cache.entry_path("size"))
+    cache.clear()
+
+    cache = ResultCache(cache_dir, max_bytes=2 * entry_size)
+    cache.put("a", entry)
+    os.utime(cache.entry_path("a"), ns=(1, 1))
+    cache.put("b", entry)
+    os.utime(cache.entry_path("b"), ns=(2, 2))
+
+    # Reading a makes b the least recently used entry
+    assert cache.get("a") is not None
+    cache.put("c", entry)
+
+    assert cache.evictions == 1
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_unreadable_entry_is_a_miss(tmp_path):
+    cache = ResultCache(os.path.join(tmp_path, "cache"))
+    os.makedirs(cache.cache_dir)
+    with open(cache.entry_path("broken"), "w") as f:
+        f.write("not an npz file")
+
+    assert cache.get("broken") is None
+    assert cache.misses == 1
+
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        ResultCache(max_bytes=0)
+
+
+def test_read_chunk_data_cached(tmp_path, csv_path, monkeypatch):
+    cache = ResultCache(os.path.join(tmp_path, "cache"))
+    expected = get_plotting_data.read_chunk_data(csv_path, 500, 2, True)
+
+    get_plotting_data.read_chunk_data(csv_path, 500, 2, True, cache)
+
+    def fail_read(*args, **kwargs):
+        raise AssertionError("CSV should not be read again")
+
+    monkeypatch.setattr(get_plotting_data, "read_aedat_csv", fail_read)
+    d = get_plotting_data.read_chunk_data(csv_path, 500, 2, True, cache)
+
+    assert cache.counters == {"hits": 1, "misses": 1, "evictions": 0}
+    assert d.file_name == csv_path
+    assert np.array_equal(d.y_on, expected.y_on)
+    assert np.array_equal(d.y_off, expected.y_off)
+    assert np.array_equal(d.y_all, expected.y_all)
+    assert np.array_equal(d.time_windows, expected.time_windows)
+
+
+def test_call_counted(tmp_path, csv_path):
+    cache = ResultCache(os.path.join(tmp_path, "cache"))
+    cache.misses = 5
+
+    _, counters = call_counted(cache, get_plotting_data.read_chunk_data, csv_path, 500, cache=cache)
+
+    assert counters == {"hits": 0, "misses": 1, "evictions": 0}
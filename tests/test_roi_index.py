@@ -0,0 +1,63 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from plotting_utils.event_store import EventStore
+from plotting_utils.get_plotting_data import DataStorage, SpatialCsvData
+from plotting_utils.roi_index import RoiIndex
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = os.path.join(tmp_path, "OnOff-X-Y-Timestamp.csv")
+    shutil.copy("tests/test_data/OnOff-X-Y-Timestamp.csv", path)
+    return path
+
+
+def in_area(x_positions, y_positions, pixel_x, pixel_y, area_size):
+    check_x = np.abs(x_positions.astype(np.int64) - pixel_x)
+    check_y = np.abs(y_positions.astype(np.int64) - pixel_y)
+    return np.flatnonzero((check_x < area_size) & (check_y < area_size))
+
+
+@pytest.mark.parametrize(
+    "pixel_x, pixel_y, area_size", [(10, 10, 1), (10, 10, 3), (0, 127, 5), (250, 3, 8), (999, 999, 9999), (5, 5, 0)]
+)
+def test_query_matches_full_scan(pixel_x, pixel_y, area_size):
+    rng = np.random.default_rng(0)
+    x_positions = rng.integers(0, 20, 5000).astype(np.uint8)
+    x_positions[:100] = rng.integers(240, 256, 100)
+    y_positions = rng.integers(0, 129, 5000).astype(np.uint8)
+    index = RoiIndex.build(x_positions, y_positions)
+
+    expected = in_area(x_positions, y_positions, pixel_x, pixel_y, area_size)
+    assert index.query(pixel_x, pixel_y, area_size).tolist() == expected.tolist()
+
+    window = index.query(pixel_x, pixel_y, area_size, start=1234, end=4321)
+    assert window.tolist() == expected[(expected >= 1234) & (expected < 4321)].tolist()
+
+
+def test_index_saved_in_store(csv_path):
+    events = SpatialCsvData.from_event_store(csv_path, DataStorage.BOOL, area=(86, 37, 3))
+    store = EventStore.open(csv_path)
+
+    assert store is not None
+    assert RoiIndex.open(store) is not None
+    assert events.x_positions.tolist() == [86]
+    assert events.timestamps.tolist() == [6]
+
+
+@pytest.mark.parametrize("time_limit, skip_rows, start_time", [(1, 0, 0), (0.000008, 2, 0), (0.000005, 0, 0.00001)])
+def test_area_matches_full_read(csv_path, time_limit, skip_rows, start_time):
+    full = SpatialCsvData.from_event_store(csv_path, DataStorage.BOOL, time_limit, skip_rows, start_time=start_time)
+    area = SpatialCsvData.from_event_store(
+        csv_path, DataStorage.BOOL, time_limit, skip_rows, start_time=start_time, area=(80, 70, 20)
+    )
+    kept = in_area(full.x_positions, full.y_positions, 80, 70, 20)
+
+    assert area.first_timestamp == full.first_timestamp
+    assert area.timestamps.tolist() == full.timestamps[kept].tolist()
+    assert area.polarities.tolist() == full.polarities[kept].tolist()
+    assert area.y_positions.tolist() == full.y_positions[kept].tolist()
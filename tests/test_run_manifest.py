@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+from plotting_utils.run_manifest import RunManifest
+
+PARAMS = {"reconstructionWindow": 500, "logValues": False}
+
+
+@pytest.fixture
+def files(tmp_path):
+    csv_path = os.path.join(tmp_path, "chunks.csv")
+    artifact_path = os.path.join(tmp_path, "chunksDots.png")
+
+    for path in (csv_path, artifact_path):
+        with open(path, "w") as f:
+            f.write("On Count,Off Count,All Count\n1,2,3")
+
+    return csv_path, artifact_path
+
+
+def test_recorded_file_is_current_after_reload(tmp_path, files):
+    csv_path, artifact_path = files
+    manifest_path = os.path.join(tmp_path, "results", "manifest.json")
+
+    manifest = RunManifest.load(manifest_path)
+    assert not manifest.is_current(csv_path, PARAMS)
+
+    manifest.record(csv_path, PARAMS, {"dots": artifact_path})
+    manifest.save()
+
+    manifest = RunManifest.load(manifest_path)
+    assert manifest.is_current(csv_path, PARAMS)
+    assert manifest.artifacts(csv_path) == {"dots": artifact_path}
+    assert not manifest.is_current(csv_path, {**PARAMS, "logValues": True})
+
+
+def test_changed_file_is_not_current(files):
+    csv_path, artifact_path = files
+    manifest = RunManifest("manifest.json")
+    manifest.record(csv_path, PARAMS, {"dots": artifact_path})
+
+    with open(csv_path, "a") as f:
+        f.write("\n4,5,9")
+
+    assert not manifest.is_current(csv_path, PARAMS)
+
+
+def test_missing_artifact_is_not_current(files):
+    csv_path, artifact_path = files
+    manifest = RunManifest("manifest.json")
+    manifest.record(csv_path, PARAMS, {"dots": artifact_path})
+
+    os.remove(artifact_path)
+
+    assert not manifest.is_current(csv_path, PARAMS)
+
+
+def test_prune_removes_deleted_files(tmp_path, files):
+    csv_path, artifact_path = files
+    manifest = RunManifest("manifest.json")
+    manifest.record(csv_path, PARAMS, {})
+    manifest.record(artifact_path, PARAMS, {})
+
+    manifest.prune([csv_path])
+
+    assert list(manifest.entries) == [os.path.abspath(csv_path)]
+
+
+def test_unreadable_manifest_is_empty(tmp_path):
+    manifest_path = os.path.join(tmp_path, "manifest.json")
+    with open(manifest_path, "w") as f:
+        f.write("{")
+
+    assert RunManifest.load(manifest_path).entries == {}
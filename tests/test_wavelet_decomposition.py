@@ -0,0 +1,48 @@
+import cv2
+import numpy as np
+import pytest
+import pywt
+
+import wavelet_decomposition
+
+
+@pytest.mark.parametrize(
+    "band_shape,shape", [((64, 64), (128, 128)), ((5, 7), (9, 13)), ((21, 1), (129, 17)), ((65, 33), (7, 128))]
+)
+def test_upsample_nearest_matches_cv2(band_shape, shape):
+    bands = np.random.default_rng(0).random((2, 3) + band_shape)
+
+    upsampled = wavelet_decomposition.upsample_nearest(bands, shape)
+
+    assert upsampled.shape == (2, 3) + shape
+    for band, upsampled_band in zip(bands.reshape((-1,) + band_shape), upsampled.reshape((-1,) + shape)):
+        assert np.array_equal(upsampled_band, cv2.resize(band, shape[::-1], interpolation=cv2.INTER_NEAREST))
+
+
+@pytest.mark.parametrize("levels", [1, 2, 3])
+def test_detail_bands(levels):
+    frames = np.random.default_rng(1).integers(0, 256, (2, 37, 50)).astype(np.uint8)
+
+    bands = wavelet_decomposition.detail_bands(frames, "db1", levels)
+
+    assert bands.shape == (2, levels, 3, 37, 50)
+    for frame, frame_bands in zip(frames, bands):
+        coefficients = pywt.wavedec2(frame, "db1", level=levels)
+        for level, level_bands in enumerate(frame_bands):
+            # wavedec2 lists the coarsest level first, detail_bands the finest
+            for band, expected in zip(level_bands, coefficients[levels - level]):
+                assert np.array_equal(band, cv2.resize(expected, (50, 37), interpolation=cv2.INTER_NEAREST))
+
+
+def test_detail_bands_first_level_matches_dwt2():
+    frame = np.random.default_rng(2).integers(0, 256, (31, 44)).astype(np.uint8)
+
+    bands = wavelet_decomposition.detail_bands(frame[np.newaxis])[0, 0]
+
+    for band, expected in zip(bands, wavelet_decomposition.wavelet_decomposition(frame, "db1")[1:]):
+        assert np.array_equal(band, cv2.resize(expected, (44, 31), interpolation=cv2.INTER_NEAREST))
+
+
+def test_detail_bands_needs_a_level():
+    with pytest.raises(ValueError):
+        wavelet_decomposition.detail_bands(np.zeros((1, 8, 8)), levels=0)